@@ -1,27 +1,27 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import datetime
-import plotly.express as px
+from datetime import datetime, timedelta
 from pathlib import Path
+import importlib.util
 import json
 import os
+import time
 from dotenv import load_dotenv
 
 # 조건부 임포트 - 웹캠/화상 기능 필요한 라이브러리
-try:
-    from streamlit_webrtc import webrtc_streamer
-    import cv2
-    webrtc_available = True
-except ImportError:
-    webrtc_available = False
+# 설치 여부만 확인하고 실제 임포트는 화상 상담 화면에서 수행 (OpenCV 로딩이 느림)
+webrtc_available = all(importlib.util.find_spec(name) is not None for name in ("streamlit_webrtc", "cv2"))
 
-from PIL import Image
 import random
 
-# 환경 변수 로드
+# 환경 변수 로드 - 아래 모듈들은 임포트할 때 설정(환경 변수)을 읽으므로 먼저 불러와야 .env 값이 적용됨
 load_dotenv()
 
+# plotly/pandas/OpenCV/PIL 등 무거운 라이브러리를 쓰는 모듈은 해당 화면에서만 임포트
+import metrics
+from auth import hash_password, needs_rehash, verify_password
+from storage import FEED_ORDERS, MEAL_LOCATIONS, MEAL_TYPES, get_store
+from write_queue import WriteQueueFull, get_write_queue
+
 # 페이지 설정
 st.set_page_config(
     page_title="혼밥메이트 - 혼밥 관리 시스템",
@@ -63,6 +63,17 @@ st.markdown("""
 # 데이터 저장 경로
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
+IMAGE_DIR = DATA_DIR / "images"
+
+# 저널 기반 저장소 (프로세스 전체에서 공유)
+store = get_store(DATA_DIR)
+
+# 기록/사진 저장을 처리하는 백그라운드 쓰기 대기열
+writer = get_write_queue(store)
+
+# 관리자 성능 패널/Prometheus 내보내기에 캐시 적중률과 대기열 상태 포함
+metrics.register_source("store_cache", store.stats)
+metrics.register_source("write_queue", writer.metrics)
 
 # 사용자 데이터 초기화
 def init_user_data():
@@ -71,12 +82,22 @@ def init_user_data():
             json.dump([], f, ensure_ascii=False, indent=2)
 
 def load_users():
-    with open(DATA_DIR / "users.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    return store.load("users")
 
 def save_users(users):
-    with open(DATA_DIR / "users.json", "w", encoding="utf-8") as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    store.save("users", users)
+
+def add_user(user):
+    return store.create_user(user)
+
+def upgrade_password(user, password):
+    # 평문이나 예전 설정으로 저장된 비밀번호를 로그인에 성공한 비밀번호의 새 해시로 교체
+    # 로그인마다 사용자 목록을 다시 쓰지 않도록 쓰기 대기열에서 모아서 한 번에 저장
+    try:
+        return writer.submit_update("users", user["id"], {"password": hash_password(password)})
+    except WriteQueueFull:
+        # 교체하지 못해도 로그인은 그대로 진행 (다음 로그인 때 다시 시도)
+        return None
 
 # 기본 데이터 구조
 def init_data():
@@ -88,20 +109,70 @@ def init_data():
             json.dump([], f, ensure_ascii=False, indent=2)
 
 def load_meals():
-    with open(DATA_DIR / "meals.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    # 전체 기록은 컬럼형(RecordColumns)으로 반환, dict 목록이 필요하면 .to_records()
+    return store.load_columns("meals")
 
 def save_meals(meals):
-    with open(DATA_DIR / "meals.json", "w", encoding="utf-8") as f:
-        json.dump(meals, f, ensure_ascii=False, indent=2)
+    store.save("meals", meals)
+
+def add_meal(meal):
+    # 백그라운드 쓰기 대기열에 넣고 저장 완료를 알려주는 Future를 반환
+    return track_write(writer.submit_record("meals", meal))
 
 def load_emotions():
-    with open(DATA_DIR / "emotions.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    # 전체 기록은 컬럼형(RecordColumns)으로 반환, dict 목록이 필요하면 .to_records()
+    return store.load_columns("emotions")
 
 def save_emotions(emotions):
-    with open(DATA_DIR / "emotions.json", "w", encoding="utf-8") as f:
-        json.dump(emotions, f, ensure_ascii=False, indent=2)
+    store.save("emotions", emotions)
+
+def add_emotion(emotion):
+    return track_write(writer.submit_record("emotions", emotion))
+
+def add_post(post):
+    # 작성자가 바로 자기 글을 볼 수 있도록 쓰기 대기열을 거치지 않고 저장
+    return store.append("posts", post)
+
+def like_post(post_id, user_id):
+    return store.like_post({"post_id": post_id, "user_id": user_id, "created_at": datetime.now().isoformat()})
+
+def track_write(future):
+    if "pending_writes" not in st.session_state:
+        st.session_state.pending_writes = []
+    st.session_state.pending_writes.append(future)
+    return future
+
+def check_pending_writes():
+    # 이전에 제출한 기록 중 백그라운드 저장에 실패한 것이 있으면 알림
+    remaining = []
+    for future in st.session_state.get("pending_writes", []):
+        if not future.done():
+            remaining.append(future)
+        elif future.exception() is not None:
+            st.error(f"기록을 저장하지 못했습니다. 다시 시도해주세요. ({future.exception()})")
+    st.session_state.pending_writes = remaining
+
+def show_metrics_panel():
+    # 관리자(ADMIN_USERS)에게만 보이는 성능 지표
+    registry = metrics.registry
+    with st.sidebar.expander("성능 지표"):
+        registry.profiler_enabled = st.checkbox(
+            "느린 실행 프로파일링",
+            value=registry.profiler_enabled,
+            key="profiler_enabled",
+            help=f"{metrics.PROFILE_SLOW_MS:.0f}ms 이상 걸린 실행의 호출 스택을 {metrics.PROFILE_DIR}에 저장합니다."
+        )
+        timers = [
+            {key: round(value, 2) if isinstance(value, float) else value for key, value in row.items()}
+            for row in registry.timers()
+        ]
+        st.dataframe(timers, hide_index=True)
+        for name, value in registry.counters().items():
+            st.write(f"- {name}: {value:,}")
+        for source, values in registry.sources().items():
+            if "hit_rate" in values:
+                st.write(f"- {source} 적중률: {values['hit_rate']:.1%}")
+        st.download_button("Prometheus 형식으로 받기", registry.to_prometheus(), file_name="metrics.prom")
 
 # 로그인 페이지
 def login_page():
@@ -113,12 +184,13 @@ def login_page():
         submitted = st.form_submit_button("로그인")
         
         if submitted:
-            users = load_users()
-            for user in users:
-                if user["username"] == username and user["password"] == password:
-                    st.session_state.user_id = user["id"]
-                    st.session_state.username = user["username"]
-                    return True
+            user = store.find_user(username)
+            if user is not None and verify_password(password, user["password"]):
+                if needs_rehash(user["password"]):
+                    upgrade_password(user, password)
+                st.session_state.user_id = user["id"]
+                st.session_state.username = user["username"]
+                return True
             st.error("아이디 또는 비밀번호가 일치하지 않습니다.")
     return False
 
@@ -139,21 +211,21 @@ def register_page():
                 st.error("비밀번호가 일치하지 않습니다.")
                 return False
                 
-            users = load_users()
-            if any(user["username"] == username for user in users):
+            if store.find_user(username) is not None:
                 st.error("이미 존재하는 아이디입니다.")
                 return False
                 
             new_user = {
-                "id": len(users) + 1,
                 "username": username,
-                "password": password,
+                "password": hash_password(password),
                 "email": email,
                 "created_at": datetime.now().isoformat()
             }
             
-            users.append(new_user)
-            save_users(users)
+            # 동시에 같은 아이디로 가입하는 경우를 대비해 저장 시점에 다시 확인
+            if add_user(new_user) is None:
+                st.error("이미 존재하는 아이디입니다.")
+                return False
             st.success("회원가입이 완료되었습니다!")
             return True
     return False
@@ -169,62 +241,6 @@ def get_random_emotional_image():
     ]
     return random.choice(images)
 
-# 음식 인식 및 분석을 위한 함수 추가
-def analyze_food_image(image):
-    """
-    OpenCV를 사용하여 음식 이미지를 분석하고 음식 종류와 영양소 정보를 반환합니다.
-    실제 상용 시스템에서는 ML 모델을 사용하지만, 여기서는 이미지 특성을 기반으로 단순 분류합니다.
-    """
-    if cv2 is not None:
-        # PIL 이미지를 OpenCV 형식으로 변환
-        img_array = np.array(image)
-        img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        
-        # 이미지 특성 추출을 위한 처리
-        avg_color = np.mean(img_cv, axis=(0, 1))
-        hsv_img = cv2.cvtColor(img_cv, cv2.COLOR_BGR2HSV)
-        avg_hsv = np.mean(hsv_img, axis=(0, 1))
-        
-        # 색상 기반 단순 분류 
-        # 실제 프로젝트에서는 CNN 등의 ML 모델을 사용해야 함
-        h_value = avg_hsv[0]
-        s_value = avg_hsv[1]
-        v_value = avg_hsv[2]
-        
-        # 간단한 색상 기반 분류
-        foods = [
-            {"name": "샐러드", "calories": 120, "protein": 5, "carbs": 15, "fat": 3},
-            {"name": "구운 고기", "calories": 350, "protein": 35, "carbs": 0, "fat": 22},
-            {"name": "파스타", "calories": 380, "protein": 12, "carbs": 70, "fat": 10},
-            {"name": "국/찌개", "calories": 250, "protein": 18, "carbs": 20, "fat": 12},
-            {"name": "김밥/초밥", "calories": 320, "protein": 10, "carbs": 60, "fat": 8},
-            {"name": "과일", "calories": 100, "protein": 1, "carbs": 25, "fat": 0}
-        ]
-        
-        # 색상, 채도, 명도를 기반으로 음식 종류 결정
-        # 실제 구현에서는 더 정교한 알고리즘이 필요함
-        if 20 <= h_value <= 40 and s_value > 100:  # 갈색/노란색 계열
-            if v_value > 150:
-                return foods[2]  # 파스타
-            else:
-                return foods[1]  # 구운 고기
-        elif h_value < 20 and s_value < 80:  # 붉은색 계열, 낮은 채도
-            return foods[3]  # 국/찌개
-        elif 40 <= h_value <= 80:  # 녹색/황색 계열
-            if s_value > 100:
-                return foods[0]  # 샐러드
-            else:
-                return foods[5]  # 과일
-        elif 0 <= h_value <= 30 and 60 <= s_value <= 150:
-            return foods[4]  # 김밥/초밥
-        else:
-            # 위의 조건에 맞지 않으면 랜덤하게 음식 선택
-            idx = int(h_value) % len(foods)
-            return foods[idx]
-    
-    # OpenCV를 사용할 수 없는 경우
-    return None
-
 # 메인 페이지
 def main():
     if "user_id" not in st.session_state:
@@ -242,12 +258,16 @@ def main():
                 st.rerun()
     else:
         st.title(f"🍽️ 혼밥메이트 - 환영합니다, {st.session_state.username}님!")
+        check_pending_writes()
         
         # 로그아웃 버튼
         if st.sidebar.button("로그아웃"):
             st.session_state.user_id = None
             st.rerun()
         
+        if st.session_state.username in metrics.ADMIN_USERS:
+            show_metrics_panel()
+        
         # 사이드바 메뉴
         menu = st.sidebar.selectbox(
             "메뉴 선택",
@@ -282,19 +302,20 @@ def show_home():
     # 오늘의 통계
     col1, col2, col3 = st.columns(3)
     
+    # 사용자/날짜별로 미리 집계된 값을 조회 (전체 기록을 훑지 않음)
+    user_id = st.session_state.user_id
+    today_stats = store.daily_stats(user_id, datetime.now().strftime("%Y-%m-%d"))
+    user_stats = store.user_stats(user_id)
+    
     with col1:
-        meals = load_meals()
-        today = datetime.now().date()
-        today_meals = len([m for m in meals if datetime.strptime(m['date'], '%Y-%m-%d').date() == today])
-        st.metric(label="오늘의 식사", value=f"{today_meals}회")
+        st.metric(label="오늘의 식사", value=f"{today_stats['meal_count']}회")
     
     with col2:
-        emotions = load_emotions()
-        today_emotions = len([e for e in emotions if datetime.strptime(e['date'], '%Y-%m-%d').date() == today])
-        st.metric(label="오늘의 감정 기록", value=f"{today_emotions}회")
+        st.metric(label="오늘의 감정 기록", value=f"{today_stats['emotion_count']}회")
     
     with col3:
-        avg_mood = np.mean([e['mood'] for e in emotions]) if emotions else 0
+        mood_count = user_stats['mood_count']
+        avg_mood = user_stats['mood_sum'] / mood_count if mood_count else 0
         st.metric(label="평균 기분 점수", value=f"{avg_mood:.1f}/5.0")
 
 def show_meal_record():
@@ -305,19 +326,34 @@ def show_meal_record():
     
     # 분석 결과 저장용 변수
     food_analysis = None
+    photo_info = None
     
     # 미리보기 및 분석 정보 표시
     if meal_photo is not None:
-        # 이미지 표시 (use_column_width 대신 use_container_width 사용)
-        image = Image.open(meal_photo)
-        st.image(image, caption="업로드된 식사 사진", use_container_width=True)
+        from food_analysis import analyze_food_bytes, get_analysis_cache, opencv_available
+        from image_store import ingest_photo
+
+        # 업로드 시점에 원본/표시용/썸네일 저장 (같은 사진은 한 번만 저장됨)
+        photo_bytes = meal_photo.getvalue()
+        try:
+            photo_info = ingest_photo(photo_bytes, IMAGE_DIR, writer=writer, track=track_write)
+        except WriteQueueFull as e:
+            st.error(str(e))
+    
+    if photo_info is not None:
+        # 원본 대신 압축된 표시용 이미지를 보여줌 (use_column_width 대신 use_container_width 사용)
+        # 아직 저장 대기 중이면 대기열에 있는 내용을 그대로 사용
+        display_path = IMAGE_DIR / photo_info["display_path"]
+        display_image = writer.pending_file(display_path) or str(display_path)
+        st.image(display_image, caption="업로드된 식사 사진", use_container_width=True)
         
         # 음식 분석 결과
-        if webrtc_available and cv2 is not None:
+        if opencv_available:
             st.subheader("음식 분석 결과")
             
-            # 음식 인식 실행
-            food_analysis = analyze_food_image(image)
+            # 음식 인식 실행 (같은 사진은 해시로 캐시된 결과를 재사용)
+            analysis_cache = get_analysis_cache(IMAGE_DIR / "analysis_cache")
+            food_analysis = analyze_food_bytes(photo_bytes, cache=analysis_cache, key=photo_info["photo_hash"])
             
             if food_analysis:
                 # 인식된 음식 정보 표시
@@ -363,12 +399,13 @@ def show_meal_record():
         col1, col2 = st.columns(2)
         
         with col1:
-            meal_type = st.selectbox("식사 유형", ["아침", "점심", "저녁", "간식"])
+            meal_type = st.selectbox("식사 유형", MEAL_TYPES)
             meal_time = st.time_input("식사 시간")
             meal_date = st.date_input("날짜")
             
         with col2:
-            meal_location = st.selectbox("식사 장소", ["집", "외식", "배달"])
+            meal_location = st.selectbox("식사 장소", MEAL_LOCATIONS)
+            companion = st.radio("함께 먹은 사람", ["혼자", "함께"], horizontal=True)
             mood = st.slider("식사 시 기분", 1, 5, 3)
             
         meal_content = st.text_area("식사 내용")
@@ -377,15 +414,15 @@ def show_meal_record():
         
         if submitted:
             meal_data = {
-                "id": len(load_meals()) + 1,
                 "user_id": st.session_state.user_id,
                 "type": meal_type,
                 "time": meal_time.strftime("%H:%M"),
                 "date": meal_date.strftime("%Y-%m-%d"),
                 "location": meal_location,
+                "alone": companion == "혼자",
                 "mood": mood,
                 "content": meal_content,
-                "has_photo": meal_photo is not None,
+                "has_photo": photo_info is not None,
                 "created_at": datetime.now().isoformat()
             }
             
@@ -397,63 +434,136 @@ def show_meal_record():
                 meal_data["carbs"] = food_analysis["carbs"]
                 meal_data["fat"] = food_analysis["fat"]
             
-            # 이미지 저장 (옵션)
-            if meal_photo is not None:
-                # 이미지 폴더 생성
-                img_dir = DATA_DIR / "images"
-                img_dir.mkdir(exist_ok=True)
-                
-                # 이미지 저장
-                img_path = f"meal_{meal_data['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.jpg"
-                img_full_path = img_dir / img_path
-                
-                with open(img_full_path, "wb") as f:
-                    f.write(meal_photo.getbuffer())
-                
-                meal_data["photo_path"] = str(img_path)
-            
-            meals = load_meals()
-            meals.append(meal_data)
-            save_meals(meals)
+            # 이미지 경로 (파일은 업로드 시점에 저장 대기열에 들어감)
+            if photo_info is not None:
+                meal_data.update(photo_info)
             
-            st.success("식사가 성공적으로 기록되었습니다! 🎉")
+            try:
+                add_meal(meal_data)
+            except WriteQueueFull as e:
+                st.error(str(e))
+            else:
+                st.success("식사가 성공적으로 기록되었습니다! 🎉")
+    
+    # 카메라 실시간 인식 (켜져 있는 동안 결과를 계속 갱신하므로 화면 맨 아래에 둠)
+    if webrtc_available and st.toggle("카메라로 실시간 음식 인식"):
+        show_live_recognition()
+
+def show_live_recognition():
+    from streamlit_webrtc import webrtc_streamer
+    from live_recognition import LIVE_TARGET_FPS, LiveFoodRecognizer
+    
+    # 영상 콜백은 별도 스레드에서 호출되므로 세션마다 인식기 하나를 만들어 넘김
+    if "live_recognizer" not in st.session_state:
+        st.session_state.live_recognizer = LiveFoodRecognizer()
+    recognizer = st.session_state.live_recognizer
+    
+    ctx = webrtc_streamer(
+        key="food_live",
+        video_frame_callback=recognizer.recv,
+        media_stream_constraints={"video": True, "audio": False},
+        async_processing=True
+    )
+    
+    result_box = st.empty()
+    # 카메라가 켜져 있는 동안 도는 반복은 재실행 시간에 포함하지 않음 (화면 그리기는 여기서 끝남)
+    if ctx.state.playing:
+        metrics.end_rerun()
+    # 다른 위젯을 조작하면 스크립트가 다시 실행되면서 반복이 자동으로 멈춤
+    while ctx.state.playing:
+        prediction = recognizer.prediction()
+        stats = recognizer.stats()
+        with result_box.container():
+            if prediction:
+                st.success(f"인식된 음식: {prediction['name']} ({prediction['confidence']:.0%})")
+                st.write(f"예상 칼로리 {prediction['calories']} kcal · 단백질 {prediction['protein']}g · "
+                         f"탄수화물 {prediction['carbs']}g · 지방 {prediction['fat']}g")
+            else:
+                st.info("음식을 카메라에 비춰주세요.")
+            st.caption(
+                f"영상 {stats['stream_fps']:.0f} fps · 프레임 처리 p95 {stats['callback_p95_ms']:.1f}ms "
+                f"(한도 {1000 / LIVE_TARGET_FPS:.0f}ms) · 분석 p50 {stats['analysis_p50_ms']:.1f}ms, "
+                f"{stats['analysis_interval_ms']:.0f}ms마다 · 건너뜀 {stats['skipped']} / 버림 {stats['dropped']}"
+            )
+        time.sleep(0.5)
 
 def show_nutrition_analysis():
+    from history_archive import get_archive
+    from nutrition_analytics import get_user_nutrition_report
+
     st.header("영양 분석")
     
-    # 영양소 데이터 시각화
-    nutrition_data = {
-        "단백질": 30,
-        "지방": 20,
-        "탄수화물": 50
-    }
+    # 분석 기간 (None이면 전체 기간)
+    periods = {"전체 기간": None, "최근 30일": 30, "최근 90일": 90, "최근 1년": 365}
+    period = st.selectbox("분석 기간", list(periods))
+    start = None
+    if periods[period] is not None:
+        start = (datetime.now() - timedelta(days=periods[period] - 1)).strftime("%Y-%m-%d")
     
-    # 영양소 파이 차트
-    fig = px.pie(
-        values=list(nutrition_data.values()),
-        names=list(nutrition_data.keys()),
-        title="영양소 비율"
-    )
-    st.plotly_chart(fig)
+    # 내보낸 아카이브(archive.py export)가 있으면 지난 기록은 메모리 매핑한 파일에서 읽음
+    archive = get_archive()
     
-    # 영양소 상세 정보
-    st.subheader("영양소 상세 정보")
-    for nutrient, percentage in nutrition_data.items():
-        st.write(f"- {nutrient}: {percentage}%")
+    # 현재 사용자의 식사 기록만 분석 (새 기록이 생길 때까지 결과 재사용)
+    with metrics.timed("nutrition_report"):
+        report = get_user_nutrition_report(store, st.session_state.user_id, start=start, archive=archive)
+    if report is None:
+        st.info("아직 식사 기록이 없습니다. 식사를 기록하면 영양 분석 결과를 볼 수 있습니다.")
+        return
     
-    # 식사 패턴 분석
-    st.subheader("식사 패턴 분석")
-    meals = load_meals()
-    if meals:
-        df = pd.DataFrame(meals)
-        df['date'] = pd.to_datetime(df['date'])
-        daily_meals = df.groupby('date').size()
-        
-        fig = px.line(
-            daily_meals,
-            title="일별 식사 횟수"
+    show_nutrition_charts(report)
+    if archive is not None:
+        st.caption(f"{archive.complete_before[:7]} 이전 기록은 {archive.manifest['exported_at'][:10]}에 내보낸 아카이브 기준입니다.")
+
+@metrics.instrument("nutrition_charts")
+def show_nutrition_charts(report):
+    import plotly.express as px
+
+    # 영양소 파이 차트 (칼로리 기준 비율)
+    macro_names = {"protein": "단백질", "fat": "지방", "carbs": "탄수화물"}
+    if report["macro_ratio"] is not None:
+        macro_ratio = report["macro_ratio"].rename(index=macro_names)
+        fig = px.pie(
+            values=macro_ratio.values,
+            names=macro_ratio.index,
+            title="영양소 비율"
         )
         st.plotly_chart(fig)
+        
+        # 영양소 상세 정보
+        st.subheader("영양소 상세 정보")
+        macro_grams = report["macro_grams"].rename(index=macro_names)
+        for nutrient, percentage in macro_ratio.items():
+            st.write(f"- {nutrient}: {percentage:.0f}% ({macro_grams[nutrient]:.0f}g)")
+        st.caption(f"사진 분석 결과가 있는 식사 {report['analyzed_count']}회 / 전체 {report['meal_count']}회 기준")
+    else:
+        st.info("사진으로 분석된 식사가 없어 영양소 비율을 계산할 수 없습니다.")
+    
+    # 식사 패턴 분석
+    st.subheader("식사 패턴 분석")
+    daily_meals = report["daily"]["count"].rename("식사 횟수")
+    fig = px.line(
+        daily_meals,
+        title="일별 식사 횟수"
+    )
+    st.plotly_chart(fig)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(report["weekly"]["count"].rename("식사 횟수"), title="주별 식사 횟수")
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        fig = px.line(report["rolling"]["calories"].rename("칼로리"), title="칼로리 7일 이동 평균")
+        st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        by_type = report["by_type"]
+        fig = px.pie(values=by_type.values, names=by_type.index, title="식사 유형별 비율")
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        by_location = report["by_location"]
+        fig = px.pie(values=by_location.values, names=by_location.index, title="식사 장소별 비율")
+        st.plotly_chart(fig, use_container_width=True)
 
 def show_emotional_management():
     st.header("정서 관리")
@@ -468,7 +578,6 @@ def show_emotional_management():
         
         if submitted:
             emotion_data = {
-                "id": len(load_emotions()) + 1,
                 "user_id": st.session_state.user_id,
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "mood": mood,
@@ -476,11 +585,15 @@ def show_emotional_management():
                 "created_at": datetime.now().isoformat()
             }
             
-            emotions = load_emotions()
-            emotions.append(emotion_data)
-            save_emotions(emotions)
-            
-            st.success("감정이 성공적으로 기록되었습니다! 🎉")
+            try:
+                add_emotion(emotion_data)
+            except WriteQueueFull as e:
+                st.error(str(e))
+            else:
+                st.success("감정이 성공적으로 기록되었습니다! 🎉")
+    
+    # 식사/감정 기록의 기분을 함께 분석
+    show_mood_insights()
     
     # 정서 안정성 이미지
     st.subheader("오늘의 마음 상태")
@@ -490,6 +603,7 @@ def show_emotional_management():
     # 화상 통화 기능
     st.subheader("화상 상담")
     if webrtc_available:
+        from streamlit_webrtc import webrtc_streamer
         webrtc_streamer(
             key="emotion_chat",
             video_frame_callback=None
@@ -511,19 +625,145 @@ def show_emotional_management():
         if st.button(activity):
             st.success(f"{activity}를 시작해보세요!")
 
+def mood_chart(values, mark, x, y, color=None, y_domain=None):
+    # st.line_chart/bar_chart는 pandas/altair 변환에 수십~수백 ms가 걸려 값 목록으로 Vega-Lite 차트를 바로 그림
+    encoding = {
+        "x": {"field": x, "type": "ordinal", "sort": None},
+        "y": {"field": y, "type": "quantitative", "scale": {"domain": y_domain} if y_domain else {}},
+    }
+    if color:
+        encoding["color"] = {"field": color, "type": "nominal"}
+    st.vega_lite_chart({"data": {"values": values}, "mark": mark, "encoding": encoding}, use_container_width=True)
+
+@metrics.instrument("mood_insights")
+def show_mood_insights():
+    st.subheader("기분 분석")
+    periods = {"주별": "week", "월별": "month"}
+    period = periods[st.radio("집계 단위", list(periods), horizontal=True, key="mood_period")]
+    unit = "주" if period == "week" else "달"
+    
+    # 기록 전체가 아니라 저장소가 증분으로 유지하는 주/월별 집계만 분석하므로 기록이 많아도 바로 계산됨
+    insights = store.mood_rollup(st.session_state.user_id).insights(period)
+    if insights is None or insights["mood"] is None:
+        st.info("식사나 감정을 기록하면 기분 분석 결과를 볼 수 있습니다.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        trend = insights["trend"]
+        st.metric("평균 기분", f"{insights['mood']:.1f}/5.0",
+                  delta=f"{trend:+.2f}/{unit} (최근 추세)" if trend is not None else None)
+    with col2:
+        solo_ratio = insights["recent_solo_ratio"]
+        st.metric("최근 혼밥 비율", f"{solo_ratio:.0%}" if solo_ratio is not None else "-")
+    with col3:
+        solo_mood, together_mood = insights["solo_mood"], insights["together_mood"]
+        st.metric("혼자 먹을 때 기분", f"{solo_mood:.1f}" if solo_mood is not None else "-",
+                  delta=f"{solo_mood - together_mood:+.1f} (함께 먹을 때 대비)"
+                  if solo_mood is not None and together_mood is not None else None)
+    
+    # 기간별 기분 추이 (값이 없는 기간은 건너뜀)
+    series = insights["series"]
+    mood_values = [
+        {"기간": label, "기분": value, "기록": kind}
+        for kind, key in (("식사 중 기분", "meal_mood"), ("감정 일기 기분", "diary_mood"))
+        for label, value in zip(series["labels"], series[key].tolist())
+        if value == value
+    ]
+    mood_chart(mood_values, {"type": "line", "point": True}, "기간", "기분", color="기록", y_domain=[1, 5])
+    if insights["recent_solo_ratio"] is not None:
+        solo_values = [
+            {"기간": label, "혼밥 비율": value}
+            for label, value in zip(series["labels"], series["solo_ratio"].tolist())
+            if value == value
+        ]
+        mood_chart(solo_values, "bar", "기간", "혼밥 비율", y_domain=[0, 1])
+    
+    col1, col2 = st.columns(2)
+    for column, title, field, means in ((col1, "식사 유형별 기분", "유형", insights["by_type"]),
+                                        (col2, "식사 장소별 기분", "장소", insights["by_location"])):
+        values = [{field: name, "평균 기분": value} for name, value in means.items() if value is not None]
+        if values:
+            with column:
+                st.caption(title)
+                mood_chart(values, "bar", field, "평균 기분", y_domain=[0, 5])
+    
+    # 상관계수가 뚜렷한 경우에만 안내
+    messages = []
+    correlations = insights["correlations"]
+    r = correlations["solo_ratio_mood"]
+    if r is not None and r <= -0.3:
+        messages.append(f"혼자 먹은 식사가 많은 {unit}에는 기분이 낮은 편입니다 (상관계수 {r:.2f}). 함께 식사할 약속을 잡아보세요.")
+    elif r is not None and r >= 0.3:
+        messages.append(f"혼자 먹은 식사가 많은 {unit}에도 기분이 좋은 편입니다 (상관계수 {r:.2f}).")
+    r = correlations["meal_mood_diary_mood"]
+    if r is not None and r >= 0.3:
+        messages.append(f"식사할 때의 기분과 감정 일기의 기분이 함께 움직입니다 (상관계수 {r:.2f}). 식사 시간이 하루 기분에 영향을 주고 있어요.")
+    type_means = {name: value for name, value in insights["by_type"].items() if value is not None}
+    if len(type_means) > 1:
+        best = max(type_means, key=type_means.get)
+        messages.append(f"{best} 식사 때 기분이 가장 좋습니다 (평균 {type_means[best]:.1f}점).")
+    for message in messages:
+        st.info(message)
+
 def show_community():
     st.header("커뮤니티")
     
-    # 게시글 목록
-    st.subheader("최근 게시글")
-    posts = [
-        {"title": "오늘의 혼밥", "author": "사용자1", "likes": 5},
-        {"title": "맛있는 레시피 공유", "author": "사용자2", "likes": 3}
-    ]
+    # 글쓰기
+    with st.form("community_post", clear_on_submit=True):
+        title = st.text_input("제목")
+        content = st.text_area("내용")
+        
+        submitted = st.form_submit_button("게시하기")
+        
+        if submitted:
+            if not title.strip():
+                st.error("제목을 입력해주세요.")
+            else:
+                add_post({
+                    "user_id": st.session_state.user_id,
+                    "author": st.session_state.username,
+                    "title": title.strip(),
+                    "content": content,
+                    "created_at": datetime.now().isoformat()
+                })
+                # 새 글이 보이도록 첫 페이지로 이동
+                st.session_state.feed_cursors = [None]
+                st.success("게시글이 등록되었습니다! 🎉")
     
+    # 게시글 목록 - 정렬 기준이 바뀌면 첫 페이지부터
+    sort_labels = {"recent": "최신순", "popular": "좋아요순"}
+    order = st.radio("정렬", FEED_ORDERS, format_func=sort_labels.get, horizontal=True)
+    if st.session_state.get("feed_order") != order or "feed_cursors" not in st.session_state:
+        st.session_state.feed_order = order
+        st.session_state.feed_cursors = [None]
+    
+    # 지나온 페이지의 커서를 쌓아두고 이전/다음 페이지로 이동
+    cursors = st.session_state.feed_cursors
+    posts, next_cursor = store.feed(order, cursors[-1])
+    if not posts:
+        st.info("아직 게시글이 없습니다. 첫 글을 남겨보세요!")
+    
+    liked = store.liked_posts(st.session_state.user_id, [post["id"] for post in posts])
     for post in posts:
-        with st.expander(f"{post['title']} - {post['author']} (좋아요: {post['likes']})"):
-            st.write("게시글 내용...")
+        with st.expander(f"{post['title']} - {post.get('author', '')} (좋아요: {post['likes']})"):
+            st.write(post.get("content", ""))
+            st.caption(post.get("created_at", "")[:16].replace("T", " "))
+            if st.button("👍 좋아요", key=f"like_{post['id']}", disabled=post["id"] in liked):
+                like_post(post["id"], st.session_state.user_id)
+                st.rerun()
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("이전", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"{len(cursors)} 페이지")
+    with col3:
+        if st.button("다음", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
 def show_settings():
     st.header("설정")
@@ -542,6 +782,8 @@ def show_settings():
     target_weight = st.number_input("목표 체중(kg)", min_value=30.0, max_value=200.0, step=0.1)
 
 if __name__ == "__main__":
-    init_data()
-    init_user_data()
-    main() 
+    # 스크립트 한 번의 실행(rerun) 전체 시간을 기록
+    with metrics.track_rerun():
+        init_data()
+        init_user_data()
+        main() 
@@ -0,0 +1,64 @@
+"""
+식사/감정 기록을 분석용 Parquet/Arrow 파일로 내보내거나 다시 불러옵니다.
+
+    python archive.py export [--data-dir data] [--out data/archive] [--format parquet,arrow]
+    python archive.py import [--data-dir data] [--archive data/archive] [--format arrow]
+
+내보낸 파일은 <out>/<형식>/<meals|emotions>/month=YYYY-MM/user_bucket=NN/part-0.<형식> 구조입니다.
+pandas.read_parquet("data/archive/parquet/meals") 처럼 디렉토리째 읽을 수 있습니다.
+앱의 영양 분석 화면은 <out>/manifest.json이 있으면 지난달까지의 기록을 Arrow 파일에서 읽습니다.
+import는 저장소의 기존 식사/감정 기록을 아카이브 내용으로 덮어씁니다.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from history_archive import (
+    ARCHIVE_DIR,
+    ARCHIVE_FORMATS,
+    ARCHIVE_USER_BUCKETS,
+    export_archive,
+    import_archive,
+    pyarrow_available,
+)
+from storage import get_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "import"), help="export: 내보내기, import: 불러오기")
+    parser.add_argument("--data-dir", default="data", help="데이터 디렉토리 (기본값: data)")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default=None,
+                        help="저장소 백엔드 (기본값: STORAGE_BACKEND 환경 변수, 없으면 json)")
+    parser.add_argument("--archive", "--out", dest="archive", default=str(ARCHIVE_DIR),
+                        help=f"아카이브 디렉토리 (기본값: {ARCHIVE_DIR})")
+    parser.add_argument("--format", default=None,
+                        help="export: 쓸 형식 (기본값: parquet,arrow), import: 읽을 형식 (기본값: arrow가 있으면 arrow)")
+    parser.add_argument("--buckets", type=int, default=ARCHIVE_USER_BUCKETS,
+                        help=f"사용자 파티션 수 (기본값: {ARCHIVE_USER_BUCKETS})")
+    args = parser.parse_args()
+
+    if not pyarrow_available:
+        parser.error("아카이브를 사용하려면 pyarrow 패키지가 필요합니다. pip install pyarrow")
+    formats = tuple(args.format.split(",")) if args.format else None
+    if formats and any(fmt not in ARCHIVE_FORMATS for fmt in formats):
+        parser.error(f"지원하는 형식: {', '.join(ARCHIVE_FORMATS)}")
+
+    # 새 환경으로 불러올 때는 데이터 디렉토리가 아직 없을 수 있음
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    store = get_store(args.data_dir, args.backend)
+    start = time.perf_counter()
+    if args.command == "export":
+        counts = export_archive(store, args.archive, formats or ARCHIVE_FORMATS, args.buckets)
+    else:
+        if formats and len(formats) > 1:
+            parser.error("import는 한 가지 형식만 읽습니다.")
+        counts = import_archive(store, args.archive, formats[0] if formats else None)
+    elapsed = time.perf_counter() - start
+    for name, count in counts.items():
+        print(f"{name}: {count}건")
+    print(f"{args.archive}: {args.command} 완료 ({elapsed:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
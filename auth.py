@@ -0,0 +1,58 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+
+# PBKDF2 반복 횟수 (값이 클수록 안전하지만 로그인/가입이 느려짐)
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+
+_ALGORITHM = "pbkdf2_sha256"
+
+
+def _pbkdf2(password, salt, iterations):
+    # hashlib.pbkdf2_hmac은 계산 중 GIL을 놓으므로 세션 스레드에서 바로 호출해도 다른 세션이 멈추지 않음
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def hash_password(password, iterations=None):
+    """
+    솔트를 붙인 PBKDF2-SHA256 해시를 '알고리즘$반복횟수$솔트$해시' 형식의 문자열로 반환합니다.
+    """
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = secrets.token_bytes(16)
+    digest = _pbkdf2(password, salt, iterations)
+    return "$".join([
+        _ALGORITHM,
+        str(iterations),
+        base64.b64encode(salt).decode("ascii"),
+        base64.b64encode(digest).decode("ascii"),
+    ])
+
+
+def verify_password(password, stored):
+    # 저장된 값에 기록된 반복 횟수를 그대로 사용하므로 설정을 바꿔도 기존 계정은 로그인 가능
+    if not stored.startswith(_ALGORITHM + "$"):
+        # 해시 도입 이전에 평문으로 저장된 계정
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    try:
+        _, iterations, salt, digest = stored.split("$")
+        expected = base64.b64decode(digest, validate=True)
+        salt = base64.b64decode(salt, validate=True)
+        iterations = int(iterations)
+    except ValueError:
+        # 형식이 깨진 해시는 일치하지 않는 것으로 처리 (binascii.Error도 ValueError)
+        return False
+    if iterations <= 0:
+        return False
+    return hmac.compare_digest(_pbkdf2(password, salt, iterations), expected)
+
+
+def needs_rehash(stored):
+    """평문이거나 현재 설정보다 반복 횟수가 적은 해시면 True - 로그인에 성공했을 때 새 해시로 바꿔 저장합니다."""
+    if not stored.startswith(_ALGORITHM + "$"):
+        return True
+    try:
+        return int(stored.split("$")[1]) < PASSWORD_HASH_ITERATIONS
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,174 @@
+"""
+사진은 있지만 음식 분석 결과(food_type/calories 등)가 없는 식사 기록을 일괄 분석합니다.
+
+    python batch_analyze.py [--data-dir data] [--workers N] [--batch-size N]
+
+분석 결과는 먼저 체크포인트 파일(JSON Lines)에 한 줄씩 기록되고,
+일정 개수마다 식사 기록에 한 번에 반영됩니다. 중간에 중단되더라도 다시 실행하면
+체크포인트에 남은 결과를 먼저 반영한 뒤 남은 사진만 이어서 분석합니다.
+분석에 실패한 사진도 체크포인트에 실패로 기록되어 다시 실행할 때 건너뜁니다.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from pathlib import Path
+
+from food_analysis import get_classifier, load_analysis_array, opencv_available
+from storage import get_store
+
+NUTRITION_FIELDS = ("calories", "protein", "carbs", "fat")
+
+
+def _analyze_paths(jobs):
+    # 작업 프로세스에서 실행되므로 결과만 가볍게 돌려줌 (분류 모델은 프로세스당 한 번만 읽음)
+    results, loaded, arrays = [], [], []
+    for meal_id, path in jobs:
+        try:
+            arrays.append(load_analysis_array(path))
+        except Exception as e:  # 손상된 파일 등은 건너뛰고 계속 진행
+            results.append((meal_id, None, str(e)))
+        else:
+            loaded.append(meal_id)
+    try:
+        predictions = get_classifier().predict_batch(arrays)
+    except Exception:
+        # 배치 중 한 장 때문에 전체가 실패할 수 있으므로 한 장씩 다시 분류해 실패한 사진만 골라냄
+        for meal_id, array in zip(loaded, arrays):
+            try:
+                results.append((meal_id, get_classifier().predict_batch([array])[0], None))
+            except Exception as e:
+                results.append((meal_id, None, str(e)))
+    else:
+        results.extend((meal_id, result, None) for meal_id, result in zip(loaded, predictions))
+    return results
+
+
+def _to_fields(result):
+    fields = {"food_type": result["name"]}
+    fields.update((key, result[key]) for key in NUTRITION_FIELDS)
+    return fields
+
+
+def _read_checkpoint(path):
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry["id"]] = entry.get("fields")
+    return done
+
+
+def pending_meals(meals, image_dir, skip_ids=()):
+    for meal in meals:
+        if not meal.get("has_photo") or "food_type" in meal or meal["id"] in skip_ids:
+            continue
+        photo_path = meal.get("photo_path")
+        if photo_path and (image_dir / photo_path).exists():
+            yield meal["id"], image_dir / photo_path
+
+
+def run(data_dir, workers=None, max_in_flight=None, flush_every=500, checkpoint=None, batch_size=16):
+    data_dir = Path(data_dir)
+    image_dir = data_dir / "images"
+    checkpoint = Path(checkpoint) if checkpoint else data_dir / "batch_analyze.checkpoint.jsonl"
+    store = get_store(data_dir)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * batch_size * 2
+
+    # 이전 실행에서 분석만 끝나고 반영되지 못한 결과를 먼저 반영
+    done = _read_checkpoint(checkpoint)
+    failed = {meal_id for meal_id, fields in done.items() if fields is None}
+    unflushed = {meal_id: fields for meal_id, fields in done.items() if fields is not None}
+
+    def flush():
+        if unflushed:
+            store.update_many("meals", unflushed)
+            unflushed.clear()
+
+    flush()
+    jobs = pending_meals(store.load("meals"), image_dir, skip_ids=failed)
+
+    processed = 0
+    start = time.perf_counter()
+    with open(checkpoint, "a", encoding="utf-8") as log, ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        batches = {}
+        exhausted = False
+        while in_flight or not exhausted:
+            # 동시에 처리 중인 사진 수를 제한해 메모리 사용량을 일정하게 유지
+            while not exhausted and len(in_flight) * batch_size < max_in_flight:
+                batch = list(islice(jobs, batch_size))
+                if not batch:
+                    exhausted = True
+                    break
+                future = pool.submit(_analyze_paths, batch)
+                batches[future] = batch
+                in_flight.add(future)
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = batches.pop(future)
+                try:
+                    results = future.result()
+                except BrokenProcessPool:
+                    # 작업 프로세스가 죽으면 풀을 더 쓸 수 없음 - 지금까지의 결과는 체크포인트에 있으므로 다시 실행하면 이어서 진행
+                    log.flush()
+                    raise
+                except Exception as e:
+                    # 결과를 돌려받지 못한 배치(결과 직렬화 실패 등)는 배치 전체를 실패로 기록
+                    results = [(meal_id, None, f"{type(e).__name__}: {e}") for meal_id, _ in batch]
+                for meal_id, result, error in results:
+                    fields = _to_fields(result) if result else None
+                    entry = {"id": meal_id, "fields": fields}
+                    if error:
+                        print(f"식사 {meal_id}: 분석 실패 ({error})")
+                        entry["error"] = error
+                    log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    if fields:
+                        unflushed[meal_id] = fields
+                    processed += 1
+            log.flush()
+            if len(unflushed) >= flush_every:
+                flush()
+                elapsed = time.perf_counter() - start
+                print(f"{processed}장 처리 ({processed / elapsed:.1f}장/초)")
+        flush()
+
+    elapsed = time.perf_counter() - start
+    # 모든 결과가 반영되었으므로 체크포인트는 필요 없음
+    checkpoint.unlink(missing_ok=True)
+    return processed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data", help="데이터 디렉토리 (기본값: data)")
+    parser.add_argument("--workers", type=int, default=None, help="작업 프로세스 수 (기본값: CPU 코어 수)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="동시에 처리 중인 최대 사진 수 (기본값: 작업 프로세스 수 x 배치 크기 x 2)")
+    parser.add_argument("--batch-size", type=int, default=16, help="작업 하나에 묶어 분류할 사진 수 (기본값: 16)")
+    parser.add_argument("--flush-every", type=int, default=500, help="몇 장마다 식사 기록에 반영할지 (기본값: 500)")
+    parser.add_argument("--checkpoint", default=None, help="체크포인트 파일 경로")
+    args = parser.parse_args()
+
+    if not opencv_available:
+        parser.error("음식 분석에는 OpenCV(cv2) 패키지가 필요합니다. pip install opencv-python")
+
+    processed, elapsed = run(
+        args.data_dir, args.workers, args.max_in_flight, args.flush_every, args.checkpoint, args.batch_size
+    )
+    rate = processed / elapsed if elapsed else 0.0
+    print(f"완료: {processed}장, {elapsed:.1f}초 ({rate:.1f}장/초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+음식 분류기(heuristic, centroid)의 정확도와 처리량을 비교하는 벤치마크입니다.
+
+    python benchmarks/bench_classifiers.py                 # 합성 라벨 사진 사용
+    python benchmarks/bench_classifiers.py --labels DIR    # DIR/<음식 이름>/*.jpg 사용
+
+사진을 라벨별로 나눠 일부(--test-every 번째마다 하나)를 시험용으로 떼어 두고,
+나머지로 centroid 모델을 만든 뒤 두 분류기의 시험용 사진 정확도를 비교합니다.
+처리량은 분류만(축소된 배열 입력)과 디코딩 포함(analyze_food_images) 두 가지를 배치 크기별로 측정합니다.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_analysis import (  # noqa: E402
+    FOODS,
+    CentroidClassifier,
+    HeuristicClassifier,
+    analyze_food_images,
+    load_analysis_array,
+)
+
+# 음식 종류별 대표 HSV 값 (OpenCV 기준 H: 0-179)
+REFERENCE_HSV = {
+    "파스타": (30, 180, 210),
+    "구운 고기": (28, 170, 100),
+    "국/찌개": (8, 50, 150),
+    "샐러드": (60, 180, 150),
+    "과일": (60, 70, 200),
+    "김밥/초밥": (10, 120, 140),
+}
+
+
+def make_labeled_images(out_dir, per_label=40, size=(640, 480), seed=0):
+    # 대표 색상을 중심으로 색상/채도/명도를 흔들고, 다른 색 얼룩(접시, 곁들임)을 섞은 사진
+    rng = np.random.default_rng(seed)
+    width, height = size
+    images = {}
+    for label, (h, s, v) in REFERENCE_HSV.items():
+        folder = Path(out_dir) / label.replace("/", "_")
+        folder.mkdir(parents=True, exist_ok=True)
+        images[label] = []
+        for i in range(per_label):
+            hsv = np.empty((height, width, 3), dtype=np.int16)
+            hsv[...] = (h + rng.integers(-6, 7), s + rng.integers(-40, 41), v + rng.integers(-40, 41))
+            hsv += rng.integers(-8, 9, size=hsv.shape, dtype=np.int16)
+            for _ in range(4):
+                y, x = rng.integers(0, height - 120), rng.integers(0, width - 120)
+                hsv[y:y + 120, x:x + 120] = (rng.integers(0, 180), rng.integers(0, 60), rng.integers(180, 256))
+            hsv = np.clip(hsv, 0, 255).astype(np.uint8)
+            hsv[..., 0] = np.minimum(hsv[..., 0], 179)
+            path = folder / f"{i:03d}.jpg"
+            Image.fromarray(cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)).save(path, quality=85)
+            images[label].append(path)
+    return images
+
+
+def read_labeled_images(label_dir):
+    images = {}
+    for folder in sorted(Path(label_dir).iterdir()):
+        if folder.is_dir():
+            images[folder.name.replace("_", "/")] = sorted(
+                p for p in folder.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+            )
+    return images
+
+
+def split(images, test_every):
+    train, test = {}, []
+    for label, paths in images.items():
+        train[label] = [p for i, p in enumerate(paths) if i % test_every]
+        test.extend((p, label) for i, p in enumerate(paths) if not i % test_every)
+    return train, test
+
+
+def accuracy(classifier, arrays, labels):
+    predictions = classifier.predict_batch(arrays)
+    return sum(p["name"] == label for p, label in zip(predictions, labels)) / len(labels)
+
+
+def throughput(fn, items, batch_size, repeat=3):
+    # 초당 처리한 이미지 수 (반복 중 가장 빠른 값)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(items), batch_size):
+            fn(items[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", help="라벨별 사진 폴더")
+    parser.add_argument("--per-label", type=int, default=40, help="합성 사진 라벨당 개수 (기본값: 40)")
+    parser.add_argument("--test-every", type=int, default=4, help="몇 장마다 한 장을 시험용으로 쓸지 (기본값: 4)")
+    parser.add_argument("--batch-sizes", default="1,8,32", help="처리량을 측정할 배치 크기 (기본값: 1,8,32)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = read_labeled_images(args.labels) if args.labels else make_labeled_images(tmp, args.per_label)
+        train, test = split(images, args.test_every)
+        known = {food["name"] for food in FOODS}
+        test = [(p, label) for p, label in test if label in known]
+        if not test:
+            parser.error("시험용 사진이 없습니다.")
+
+        start = time.perf_counter()
+        centroid = CentroidClassifier.fit(train)
+        fit_s = time.perf_counter() - start
+        classifiers = {"heuristic": HeuristicClassifier(), "centroid": centroid}
+
+        paths = [p for p, _ in test]
+        labels = [label for _, label in test]
+        arrays = [load_analysis_array(p) for p in paths]
+        batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+        print(f"학습 {sum(map(len, train.values()))}장, 시험 {len(test)}장, 라벨 {len(train)}개, 모델 생성 {fit_s:.2f}초")
+        header = "".join(f"{f'분류 b={b}':>14}" for b in batch_sizes) + "".join(f"{f'전체 b={b}':>14}" for b in batch_sizes)
+        print(f"{'분류기':<12}{'정확도':>8}{header}   (이미지/초)")
+        for name, classifier in classifiers.items():
+            row = f"{name:<12}{accuracy(classifier, arrays, labels):>8.1%}"
+            for b in batch_sizes:
+                row += f"{throughput(classifier.predict_batch, arrays, b):>14.0f}"
+            for b in batch_sizes:
+                row += f"{throughput(lambda batch: analyze_food_images(batch, classifier), paths, b, repeat=1):>14.0f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
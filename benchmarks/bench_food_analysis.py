@@ -0,0 +1,126 @@
+"""
+analyze_food_image의 원본 해상도 경로와 빠른(축소) 경로를 비교하는 벤치마크입니다.
+
+    python benchmarks/bench_food_analysis.py                # 합성 기준 이미지 사용
+    python benchmarks/bench_food_analysis.py --images DIR   # 실제 사진 폴더 사용
+
+각 경로의 이미지당 지연 시간, 최대 메모리 증가량(Linux peak RSS 기준, 그 외에는 tracemalloc),
+두 경로의 분류 결과 일치 여부를 출력합니다. 결과가 하나라도 다르면 종료 코드 1을 반환합니다.
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_analysis import analyze_food_image  # noqa: E402
+
+# 음식 종류별 대표 HSV 값 (OpenCV 기준 H: 0-179)
+REFERENCE_HSV = {
+    "파스타": (30, 180, 210),
+    "구운 고기": (28, 170, 100),
+    "국/찌개": (8, 50, 150),
+    "샐러드": (60, 180, 150),
+    "과일": (60, 70, 200),
+    "김밥/초밥": (10, 120, 140),
+}
+
+
+def make_reference_images(out_dir, size=(4032, 3024), seed=0):
+    # 휴대폰 사진 크기의 JPEG를 대표 색상 + 노이즈 + 얼룩으로 합성
+    rng = np.random.default_rng(seed)
+    width, height = size
+    paths = []
+    for i, (h, s, v) in enumerate(REFERENCE_HSV.values()):
+        hsv = np.empty((height, width, 3), dtype=np.int16)
+        hsv[..., 0] = h
+        hsv[..., 1] = s
+        hsv[..., 2] = v
+        hsv += rng.integers(-6, 7, size=hsv.shape, dtype=np.int16)
+        for _ in range(20):
+            y, x = rng.integers(0, height - 200), rng.integers(0, width - 200)
+            hsv[y:y + 200, x:x + 200, 2] -= 20
+        hsv = np.clip(hsv, 0, 255).astype(np.uint8)
+        hsv[..., 0] = np.minimum(hsv[..., 0], 179)
+        rgb = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+        path = Path(out_dir) / f"reference_{i}.jpg"
+        Image.fromarray(rgb).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def _read_status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _measure(paths, fast, repeat):
+    # Linux에서는 clear_refs로 peak RSS(VmHWM)를 초기화해 경로별로 따로 측정
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        baseline = _read_status_kb("VmRSS")
+        use_proc = True
+    except OSError:
+        tracemalloc.start()
+        use_proc = False
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [analyze_food_image(Image.open(p), fast=fast) for p in paths]
+    elapsed = time.perf_counter() - start
+
+    if use_proc:
+        peak_mb = (_read_status_kb("VmHWM") - baseline) / 1024
+    else:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return elapsed, [r["name"] for r in results], peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="기준 이미지 폴더 (jpg/jpeg/png)")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (기본값: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        else:
+            paths = make_reference_images(tmp)
+        if not paths:
+            parser.error("분석할 이미지가 없습니다.")
+
+        # 빠른 경로를 먼저 측정해야 원본 경로가 남긴 메모리의 영향을 받지 않음
+        measured = {}
+        for fast in (True, False):
+            measured[fast] = _measure(paths, fast, args.repeat)
+
+    count = len(paths) * args.repeat
+    print(f"이미지 {len(paths)}장 x {args.repeat}회")
+    print(f"{'경로':<8}{'ms/이미지':>12}{'peak MB':>12}")
+    for fast, label in ((False, "원본"), (True, "빠른")):
+        elapsed, _, peak_mb = measured[fast]
+        print(f"{label:<8}{elapsed / count * 1000:>12.1f}{peak_mb:>12.1f}")
+
+    full_names, fast_names = measured[False][1], measured[True][1]
+    mismatches = [(p.name, a, b) for p, a, b in zip(paths, full_names, fast_names) if a != b]
+    print(f"분류 일치: {len(paths) - len(mismatches)}/{len(paths)}")
+    for name, full_name, fast_name in mismatches:
+        print(f"  {name}: 원본={full_name}, 빠른={fast_name}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+app.py를 처음 불러올 때(스트림릿 콜드 스타트) 걸리는 임포트 시간을 측정하는 벤치마크입니다.
+
+    python benchmarks/bench_import_time.py              # 5회 측정 후 중앙값 출력
+    python benchmarks/bench_import_time.py --runs 10 --json result.json
+
+매 회 새 인터프리터에서 `python -X importtime -c "import app"`를 실행해
+app 모듈의 누적 임포트 시간, 오래 걸린 모듈 목록, 시작 시점에 불러온 무거운 라이브러리를 출력합니다.
+무거운 라이브러리는 해당 화면을 처음 열 때만 임포트되어야 하므로, 하나라도 불러오면 종료 코드 1을 반환합니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 첫 화면(로그인)에는 필요 없는 라이브러리 (plotly 본체는 streamlit이 직접 불러오므로 express만 확인)
+HEAVY_MODULES = ("plotly.express", "pandas", "cv2", "streamlit_webrtc", "PIL", "numpy")
+
+
+def _parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package" 형식의 줄을 (이름, 깊이, 누적 us)로 변환
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(cumulative)))
+    return entries
+
+
+def measure_once(module="app"):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    # app.py가 현재 디렉토리에 data/를 만들기 때문에 임시 디렉토리에서 실행
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    entries = _parse_importtime(proc.stderr)
+    loaded = {name for name, _, _ in entries}
+    module_us = next(us for name, depth, us in entries if name == module and depth == 0)
+    return {
+        "wall_ms": wall_ms,
+        "module_ms": module_us / 1000,
+        "heavy_loaded": sorted(name for name in HEAVY_MODULES if name in loaded),
+        "top": sorted(((us / 1000, name) for name, depth, us in entries if depth <= 1), reverse=True)[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="측정 횟수 (기본값: 5)")
+    parser.add_argument("--module", default="app", help="측정할 모듈 (기본값: app)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.module) for _ in range(args.runs)]
+    result = {
+        "module": args.module,
+        "runs": args.runs,
+        "wall_ms_median": statistics.median(r["wall_ms"] for r in runs),
+        "module_ms_median": statistics.median(r["module_ms"] for r in runs),
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+    }
+
+    print(f"{args.module} 임포트 {args.runs}회 중앙값")
+    print(f"  인터프리터 포함 전체: {result['wall_ms_median']:.1f} ms")
+    print(f"  {args.module} 누적 임포트: {result['module_ms_median']:.1f} ms")
+    print("오래 걸린 모듈 (마지막 실행 기준)")
+    for ms, name in runs[-1]["top"]:
+        print(f"  {ms:>8.1f} ms  {name}")
+    print(f"시작 시 불러온 무거운 라이브러리: {', '.join(result['heavy_loaded']) or '없음'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if result["heavy_loaded"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
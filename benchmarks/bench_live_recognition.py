@@ -0,0 +1,99 @@
+"""
+LiveFoodRecognizer가 30fps 카메라 영상을 따라가는지 확인하는 벤치마크입니다.
+
+    python benchmarks/bench_live_recognition.py [--seconds 5] [--fps 30] [--width 1280 --height 720]
+
+합성 프레임을 목표 FPS 간격으로 콜백에 넘기고, 콜백 처리 시간(p50/p95), 실제로 유지된 FPS,
+분석/건너뜀/버림 횟수, 다수결 결과를 출력합니다.
+PyAV(av)가 설치되어 있으면 실제 av.VideoFrame을, 없으면 OpenCV로 축소하는 대체 프레임을 사용합니다.
+콜백 p95가 프레임 한도를 넘거나 유지된 FPS가 목표의 95%에 못 미치면 종료 코드 1을 반환합니다.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from live_recognition import LIVE_TARGET_FPS, LiveFoodRecognizer  # noqa: E402
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+class _ArrayFrame:
+    # av.VideoFrame 중 LiveFoodRecognizer가 쓰는 부분만 흉내냄
+    def __init__(self, rgb):
+        self.rgb = rgb
+        self.height, self.width = rgb.shape[:2]
+
+    def reformat(self, width, height, format):
+        return _ArrayFrame(cv2.resize(self.rgb, (width, height), interpolation=cv2.INTER_AREA))
+
+    def to_ndarray(self):
+        return self.rgb
+
+
+def make_frames(width, height, count=30, seed=0):
+    # 파스타 색(HSV 30, 180, 210) 바탕에 노이즈를 섞은 프레임
+    rng = np.random.default_rng(seed)
+    hsv = np.empty((height, width, 3), dtype=np.uint8)
+    hsv[...] = (30, 180, 210)
+    frames = []
+    for _ in range(count):
+        noisy = np.clip(hsv.astype(np.int16) + rng.integers(-8, 9, size=hsv.shape, dtype=np.int16), 0, 255)
+        rgb = cv2.cvtColor(noisy.astype(np.uint8), cv2.COLOR_HSV2RGB)
+        if av is not None:
+            frames.append(av.VideoFrame.from_ndarray(cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420), format="yuv420p"))
+        else:
+            frames.append(_ArrayFrame(rgb))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="측정 시간(초) (기본값: 5)")
+    parser.add_argument("--fps", type=float, default=LIVE_TARGET_FPS, help=f"영상 FPS (기본값: {LIVE_TARGET_FPS})")
+    parser.add_argument("--width", type=int, default=1280, help="프레임 너비 (기본값: 1280)")
+    parser.add_argument("--height", type=int, default=720, help="프레임 높이 (기본값: 720)")
+    args = parser.parse_args()
+
+    frames = make_frames(args.width, args.height)
+    recognizer = LiveFoodRecognizer()
+    interval = 1.0 / args.fps
+    total = int(args.seconds * args.fps)
+
+    start = time.perf_counter()
+    for i in range(total):
+        # 카메라처럼 정해진 시각에 프레임이 도착 (콜백이 늦으면 다음 프레임도 늦어짐)
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        recognizer.recv(frames[i % len(frames)])
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+
+    stats = recognizer.stats()
+    prediction = recognizer.prediction()
+    budget_ms = 1000 / args.fps
+    achieved_fps = total / elapsed
+
+    print(f"프레임 {args.width}x{args.height}, {'PyAV' if av is not None else 'OpenCV 대체 프레임'}, {args.seconds:.0f}초")
+    print(f"유지된 FPS: {achieved_fps:.1f} / {args.fps:.0f}")
+    print(f"콜백 처리 시간: p50 {stats['callback_p50_ms']:.2f}ms, p95 {stats['callback_p95_ms']:.2f}ms (한도 {budget_ms:.1f}ms)")
+    print(f"분석 시간: p50 {stats['analysis_p50_ms']:.2f}ms, p95 {stats['analysis_p95_ms']:.2f}ms")
+    print(f"분석 {stats['analyzed']}회, 건너뜀 {stats['skipped']}, 버림 {stats['dropped']}")
+    if prediction:
+        print(f"인식 결과: {prediction['name']} ({prediction['confidence']:.0%})")
+
+    ok = stats["callback_p95_ms"] <= budget_ms and achieved_fps >= args.fps * 0.95
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
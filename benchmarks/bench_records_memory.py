@@ -0,0 +1,104 @@
+"""
+식사 기록 전체를 dict 목록으로 읽을 때와 컬럼형(RecordColumns)으로 읽을 때의 메모리/시간을 비교합니다.
+
+    python benchmarks/bench_records_memory.py                    # 1m 규모 가상 데이터를 만들어 측정
+    python benchmarks/bench_records_memory.py --data-dir DIR     # synthetic_data.py로 만든 JSON 데이터 사용
+
+방식마다 새 인터프리터에서 한 번씩 읽고, 읽기 전후 상주 메모리(RSS) 차이와 읽는 데 걸린 시간을 출력합니다.
+  dicts         JournalStore.load(): JSON 파싱 후 dict 목록 (기존 방식)
+  columns-json  JournalStore.load_columns(): JSON 파싱 후 컬럼형으로 변환하고 .columns.npz 저장 (첫 실행)
+  columns-npz   JournalStore.load_columns(): 저장된 .columns.npz를 읽음 (이후 실행)
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+MODES = ("dicts", "columns-json", "columns-npz")
+
+
+def rss_bytes():
+    # 현재 상주 메모리 (리눅스가 아니면 최대 상주 메모리로 대신함)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, AttributeError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_worker(mode, data_dir, name):
+    import numpy  # noqa: F401  (라이브러리 자체 메모리는 비교에서 제외)
+
+    import records  # noqa: F401
+    from storage import JournalStore
+
+    store = JournalStore(data_dir)
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    loaded = store.load(name) if mode == "dicts" else store.load_columns(name)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    print(json.dumps({"mode": mode, "count": len(loaded), "seconds": elapsed, "rss_bytes": rss_bytes() - before}))
+
+
+def measure(mode, data_dir, name):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", mode, "--data-dir", str(data_dir), "--name", name],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="JSON 백엔드 데이터 디렉토리 (없으면 가상 데이터를 만듦)")
+    parser.add_argument("--scale", default="1m", help="가상 데이터 규모 (기본값: 1m)")
+    parser.add_argument("--name", choices=("meals", "emotions"), default="meals", help="측정할 기록 (기본값: meals)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.data_dir, args.name)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(args.data_dir or tmp)
+        if not args.data_dir:
+            from synthetic_data import write_dataset
+
+            start = time.perf_counter()
+            write_dataset(data_dir, args.scale, "json")
+            print(f"가상 데이터 {args.scale} 생성 ({time.perf_counter() - start:.1f}초)")
+        # 첫 변환 비용을 측정하도록 이전에 저장된 컬럼형 스냅샷은 지움
+        (data_dir / f"{args.name}.columns.npz").unlink(missing_ok=True)
+        results = [measure(mode, data_dir, args.name) for mode in MODES]
+
+    baseline = results[0]
+    print(f"{args.name} {baseline['count']:,}건")
+    print(f"{'방식':<14}{'시간(초)':>10}{'RSS(MB)':>10}{'시간 비':>9}{'메모리 비':>10}")
+    for result in results:
+        print(
+            f"{result['mode']:<14}{result['seconds']:>10.2f}{result['rss_bytes'] / 2**20:>10.1f}"
+            f"{baseline['seconds'] / result['seconds']:>8.1f}x"
+            f"{baseline['rss_bytes'] / max(result['rss_bytes'], 1):>9.1f}x"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
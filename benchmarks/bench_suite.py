@@ -0,0 +1,284 @@
+"""
+저장소/분석 함수와 각 화면의 실행 시간을 한 번에 측정하는 벤치마크 모음입니다.
+
+    python benchmarks/bench_suite.py [--scale 1k|100k|1m] [--backend json|sqlite] [--json OUT]
+    python benchmarks/bench_suite.py --compare BASE.json NEW.json [--threshold 1.2]
+
+임시 디렉토리에 가상 데이터(synthetic_data.py)를 만든 뒤 다음을 측정합니다.
+- app: Streamlit AppTest로 각 화면의 첫 실행과 재실행(rerun) 시간
+- storage: load_*/save_*/조회/집계 함수
+- analysis: 음식 사진 분석, 사진 저장, 영양 분석
+
+결과를 JSON으로 저장해 두면 --compare로 두 커밋의 결과를 비교할 수 있습니다.
+중앙값이 threshold배 이상 느려진 항목이 있으면 종료 코드 1을 반환합니다. 네트워크 없이 실행됩니다.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic_data import SCALES, make_photo, write_dataset  # noqa: E402
+
+PAGES = ["홈", "식사 기록", "영양 분석", "정서 관리", "커뮤니티", "설정"]
+
+
+def timeit(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "max_ms": max(times),
+    }
+
+
+def _fresh_store(data_dir, backend):
+    # get_store가 공유하는 객체 대신 캐시가 비어 있는 저장소를 새로 만듦
+    from storage import CachedStore, JournalStore, SqliteStore
+
+    if backend == "sqlite":
+        return CachedStore(SqliteStore(data_dir / "app.db"))
+    return CachedStore(JournalStore(data_dir))
+
+
+def bench_pages(work_dir, user, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    # app.py는 현재 디렉토리의 data/를 사용
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=600)
+        results = {"app.login.first": timeit(at.run, 1)}
+        results["app.login.rerun"] = timeit(at.run, repeat)
+
+        at.session_state["user_id"] = user["id"]
+        at.session_state["username"] = user["username"]
+        at.run()
+        for page in PAGES:
+            select = at.sidebar.selectbox[0]
+            # 첫 실행에는 지연 임포트와 캐시 생성 시간이 포함됨
+            results[f"app.{page}.first"] = timeit(lambda: select.set_value(page).run(), 1)
+            results[f"app.{page}.rerun"] = timeit(at.run, repeat)
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+    finally:
+        os.chdir(old_cwd)
+    return results
+
+
+def bench_storage(data_dir, backend, user_id, repeat):
+    from storage import get_store
+
+    store = get_store(data_dir, backend)
+    today = datetime.now().strftime("%Y-%m-%d")
+    results = {}
+
+    for name in ("users", "meals", "emotions"):
+        results[f"storage.load_{name}.cold"] = timeit(lambda: _fresh_store(data_dir, backend).load(name), repeat)
+        results[f"storage.load_{name}.warm"] = timeit(lambda: store.load(name), repeat)
+    for name in ("meals", "emotions"):
+        # 첫 측정은 컬럼형 스냅샷(.columns.npz)을 만드는 비용, 이후는 스냅샷을 읽는 비용
+        results[f"storage.load_columns_{name}.cold"] = timeit(
+            lambda: _fresh_store(data_dir, backend).load_columns(name), repeat
+        )
+        results[f"storage.load_columns_{name}.warm"] = timeit(lambda: store.load_columns(name), repeat)
+    results["storage.find_meals.cold"] = timeit(lambda: _fresh_store(data_dir, backend).find("meals", user_id), repeat)
+    results["storage.find_meals.warm"] = timeit(lambda: store.find("meals", user_id), repeat)
+    results["storage.find_user.warm"] = timeit(lambda: store.find_user(f"user{user_id}"), repeat)
+    results["storage.daily_stats.warm"] = timeit(lambda: store.daily_stats(user_id, today), repeat)
+    results["storage.user_stats.warm"] = timeit(lambda: store.user_stats(user_id), repeat)
+    # 커뮤니티 첫 페이지와 그 다음 페이지 (cold는 JSON 백엔드의 경우 게시글 색인 생성 포함)
+    for order in ("recent", "popular"):
+        results[f"storage.feed_{order}.cold"] = timeit(lambda: _fresh_store(data_dir, backend).feed(order), repeat)
+        results[f"storage.feed_{order}.warm"] = timeit(lambda: store.feed(order), repeat)
+        next_cursor = store.feed(order)[1]
+        results[f"storage.feed_{order}.page2"] = timeit(lambda: store.feed(order, next_cursor), repeat)
+
+    # 쓰기는 데이터를 바꾸므로 조회 측정이 끝난 뒤에 실행
+    for name in ("meals", "emotions"):
+        records = store.load(name)
+        results[f"storage.save_{name}"] = timeit(lambda: store.save(name, records), repeat)
+    # 가상 데이터에 없는 사용자(id 0)가 누르므로 매번 실제로 기록됨
+    post_ids = iter(range(1, repeat + 1))
+    results["storage.like_post"] = timeit(lambda: store.like_post({"post_id": next(post_ids), "user_id": 0}), repeat)
+    meal = {"user_id": user_id, "type": "점심", "time": "12:00", "date": today, "location": "집", "mood": 3}
+    results["storage.append_meal"] = timeit(lambda: store.append("meals", dict(meal)), repeat)
+    results["storage.append_many_meals.100"] = timeit(
+        lambda: store.append_many("meals", [dict(meal) for _ in range(100)]), repeat
+    )
+    return results
+
+
+def bench_analysis(data_dir, backend, user_id, repeat):
+    from food_analysis import AnalysisCache, analyze_food_bytes, analyze_food_image, opencv_available
+    from image_store import ingest_photo
+    from mood_analytics import MoodRollup, analyze_rollup
+    from history_archive import export_archive, get_archive, pyarrow_available
+    from nutrition_analytics import analyze_meal_frame, build_meal_frame, build_user_meal_frame, get_user_nutrition_report
+    from storage import get_store
+
+    store = get_store(data_dir, backend)
+    meals = store.find("meals", user_id)
+    all_meals = store.load("meals")
+    results = {
+        "analysis.build_meal_frame.user": timeit(lambda: build_meal_frame(meals), repeat),
+        "analysis.analyze_meal_frame.user": timeit(lambda: analyze_meal_frame(build_meal_frame(meals)), repeat),
+        "analysis.build_meal_frame.all": timeit(lambda: build_meal_frame(all_meals), repeat),
+        "analysis.nutrition_report.warm": timeit(lambda: get_user_nutrition_report(store, user_id), repeat),
+        "analysis.mood_rollup.build": timeit(
+            lambda: MoodRollup.from_records(meals, store.find("emotions", user_id)), repeat
+        ),
+        "analysis.mood_insights.warm": timeit(lambda: store.mood_rollup(user_id).insights("week"), repeat),
+    }
+    # 새 기록이 추가된 직후처럼 캐시된 결과 없이 집계만으로 분석하는 시간
+    rollup = store.mood_rollup(user_id)
+    for period in ("week", "month"):
+        results[f"analysis.analyze_rollup.{period}"] = timeit(lambda: analyze_rollup(rollup, period), repeat)
+
+    if pyarrow_available:
+        # 과거 기록을 Arrow 아카이브에서 읽는 경우와 저장소 기록(dict)에서 변환하는 경우 비교
+        with tempfile.TemporaryDirectory() as tmp:
+            results["analysis.export_archive"] = timeit(lambda: export_archive(store, Path(tmp) / "archive"), 1)
+            archive = get_archive(Path(tmp) / "archive")
+            results["analysis.user_meal_frame.dicts"] = timeit(lambda: build_user_meal_frame(meals), repeat)
+            results["analysis.user_meal_frame.archive"] = timeit(
+                lambda: build_user_meal_frame(meals, archive=archive, user_id=user_id), repeat
+            )
+
+    rng = random.Random(1)
+    photos = [make_photo(rng) for _ in range(repeat)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pending = iter(photos)
+        results["analysis.ingest_photo"] = timeit(lambda: ingest_photo(next(pending), Path(tmp) / "images"), repeat)
+
+        if opencv_available:
+            sample = photos[0]
+            results["analysis.analyze_food_image.fast"] = timeit(lambda: analyze_food_image(io.BytesIO(sample)), repeat)
+            results["analysis.analyze_food_image.full"] = timeit(
+                lambda: analyze_food_image(Image.open(io.BytesIO(sample)), fast=False), repeat
+            )
+            cache = AnalysisCache(Path(tmp) / "analysis_cache")
+            analyze_food_bytes(sample, cache=cache)
+            results["analysis.analyze_food_bytes.cached"] = timeit(lambda: analyze_food_bytes(sample, cache=cache), repeat)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale, backend, repeat, skip_app=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        data_dir = work_dir / "data"
+        start = time.perf_counter()
+        counts = write_dataset(data_dir, scale, backend)
+        generate_s = time.perf_counter() - start
+
+        # 식사 기록이 가장 많은 사용자를 기준으로 측정
+        from storage import get_store
+
+        store = get_store(data_dir, backend)
+        user_id = Counter(m["user_id"] for m in store.load("meals")).most_common(1)[0][0]
+        user = store.find_user(f"user{user_id}")
+
+        results = {}
+        if not skip_app:
+            os.environ["STORAGE_BACKEND"] = backend
+            results.update(bench_pages(work_dir, user, repeat))
+        results.update(bench_storage(data_dir, backend, user_id, repeat))
+        results.update(bench_analysis(data_dir, backend, user_id, repeat))
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "backend": backend,
+        "counts": counts,
+        "generate_s": generate_s,
+        "results": results,
+    }
+
+
+def compare(base, new, threshold):
+    regressions = []
+    print(f"{'항목':<40}{'기준 ms':>12}{'신규 ms':>12}{'비율':>8}")
+    for name, stats in new["results"].items():
+        if name not in base["results"]:
+            continue
+        before, after = base["results"][name]["median_ms"], stats["median_ms"]
+        ratio = after / before if before else float("inf")
+        mark = " *" if ratio >= threshold else ""
+        print(f"{name:<40}{before:>12.2f}{after:>12.2f}{ratio:>8.2f}{mark}")
+        if mark:
+            regressions.append(name)
+    print(f"{threshold}배 이상 느려진 항목: {len(regressions)}개")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="식사 기록 규모 (기본값: 1k)")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json", help="저장소 백엔드 (기본값: json)")
+    parser.add_argument("--repeat", type=int, default=5, help="항목별 반복 횟수 (기본값: 5)")
+    parser.add_argument("--skip-app", action="store_true", help="AppTest 화면 측정 생략")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="두 결과 파일 비교")
+    parser.add_argument("--threshold", type=float, default=1.2, help="느려졌다고 판단할 비율 (기본값: 1.2)")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        return compare(base, new, args.threshold)
+
+    # AppTest는 스크립트 실행 문맥이 없다는 경고를 매번 출력하므로 숨김
+    import streamlit.logger
+
+    streamlit.logger.set_log_level(logging.ERROR)
+    result = run(args.scale, args.backend, args.repeat, args.skip_app)
+
+    print(f"규모 {args.scale}, 백엔드 {args.backend}, 데이터 생성 {result['generate_s']:.1f}초")
+    print(f"{'항목':<40}{'중앙값 ms':>12}{'최소 ms':>12}")
+    for name, stats in result["results"].items():
+        print(f"{name:<40}{stats['median_ms']:>12.2f}{stats['min_ms']:>12.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
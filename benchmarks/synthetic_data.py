@@ -0,0 +1,179 @@
+"""
+벤치마크용 가상 데이터(사용자, 식사, 감정 기록, 사진, 커뮤니티 게시글/좋아요)를 만듭니다.
+
+    python benchmarks/synthetic_data.py OUT_DIR [--scale 1k|100k|1m] [--backend json|sqlite]
+
+규모는 식사 기록 수 기준이며 감정 기록과 좋아요는 그 절반, 게시글은 1/10, 사용자는 1/100입니다.
+사진은 서로 다른 JPEG 몇 장을 만들어 image_store로 저장한 뒤 사진이 있는 식사 기록에서 돌려 씁니다.
+모든 사용자의 비밀번호는 "password"입니다. 같은 시드로 만든 데이터는 항상 같습니다.
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from auth import hash_password  # noqa: E402
+from food_analysis import FOODS  # noqa: E402
+from image_store import ingest_photo  # noqa: E402
+from storage import MEAL_LOCATIONS, MEAL_TYPES, get_store  # noqa: E402
+
+# 규모별 식사 기록 수
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# 기록이 분포하는 기간(일)과 사진이 있는 식사 비율
+DAYS = 365
+PHOTO_RATIO = 0.1
+# 혼자 먹은 식사 비율
+SOLO_RATIO = 0.6
+
+# 음식 종류별 대표 RGB 색상 (food_analysis의 분류 규칙과 대략 맞춤)
+FOOD_COLORS = [(90, 170, 60), (110, 70, 40), (220, 180, 90), (170, 120, 110), (190, 120, 90), (200, 210, 150)]
+
+
+def scale_counts(meals):
+    return {
+        "users": max(10, meals // 100),
+        "meals": meals,
+        "emotions": meals // 2,
+        "photos": min(50, max(1, meals // 1000)),
+        "posts": meals // 10,
+        "likes": meals // 2,
+    }
+
+
+def make_photo(rng, size=(1600, 1200)):
+    # 대표 색상 바탕에 얼룩을 몇 개 찍은 JPEG
+    r, g, b = rng.choice(FOOD_COLORS)
+    image = Image.new("RGB", size, (r, g, b))
+    for _ in range(8):
+        x, y = rng.randrange(size[0] - 200), rng.randrange(size[1] - 200)
+        shade = rng.randint(-30, 30)
+        image.paste((max(0, r + shade), max(0, g + shade), max(0, b + shade)), (x, y, x + 200, y + 200))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def generate_records(counts, seed=0, photos=()):
+    """
+    앱과 같은 형식의 사용자/식사/감정 기록을 만듭니다.
+    photos에는 ingest_photo가 돌려준 경로 정보 목록을 넘깁니다.
+    """
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=DAYS - 1)
+    created_at = datetime.now().isoformat()
+    # 가입은 벤치마크 대상이 아니므로 반복 횟수를 줄인 해시 하나를 모든 사용자가 공유
+    password = hash_password("password", iterations=1000)
+
+    users = [
+        {"id": i, "username": f"user{i}", "password": password, "created_at": created_at}
+        for i in range(1, counts["users"] + 1)
+    ]
+
+    meals = []
+    for i in range(1, counts["meals"] + 1):
+        day = start + timedelta(days=rng.randrange(DAYS))
+        meal = {
+            "id": i,
+            "user_id": rng.randint(1, counts["users"]),
+            "type": rng.choice(MEAL_TYPES),
+            "time": f"{rng.randrange(6, 23):02d}:{rng.randrange(60):02d}",
+            "date": day.isoformat(),
+            "location": rng.choice(MEAL_LOCATIONS),
+            "alone": rng.random() < SOLO_RATIO,
+            "mood": rng.randint(1, 5),
+            "content": "",
+            "has_photo": bool(photos) and rng.random() < PHOTO_RATIO,
+            "created_at": created_at,
+        }
+        if meal["has_photo"]:
+            meal.update(rng.choice(photos))
+            food = rng.choice(FOODS)
+            meal["food_type"] = food["name"]
+            meal.update((key, food[key]) for key in ("calories", "protein", "carbs", "fat"))
+        meals.append(meal)
+
+    emotions = [
+        {
+            "id": i,
+            "user_id": rng.randint(1, counts["users"]),
+            "date": (start + timedelta(days=rng.randrange(DAYS))).isoformat(),
+            "mood": rng.randint(1, 5),
+            "diary": "",
+            "created_at": created_at,
+        }
+        for i in range(1, counts["emotions"] + 1)
+    ]
+    return users, meals, emotions
+
+
+def generate_posts(counts, seed=0):
+    """커뮤니티 게시글과 좋아요를 만듭니다. 좋아요는 일부 게시글에 몰리도록 치우치게 분포시킵니다."""
+    rng = random.Random(seed)
+    created_at = datetime.now().isoformat()
+    posts = [
+        {
+            "id": i,
+            "user_id": user_id,
+            "author": f"user{user_id}",
+            "title": f"혼밥 이야기 {i}",
+            "content": "",
+            "created_at": created_at,
+        }
+        for i, user_id in enumerate((rng.randint(1, counts["users"]) for _ in range(counts["posts"])), start=1)
+    ]
+
+    likes, seen = [], set()
+    while posts and len(likes) < min(counts["likes"], counts["posts"] * counts["users"] // 2):
+        # 게시글 id를 제곱 분포로 뽑아 앞쪽 게시글일수록 좋아요가 많음
+        key = (int(rng.random() ** 2 * counts["posts"]) + 1, rng.randint(1, counts["users"]))
+        if key not in seen:
+            seen.add(key)
+            likes.append({"id": len(likes) + 1, "post_id": key[0], "user_id": key[1], "created_at": created_at})
+    return posts, likes
+
+
+def write_dataset(data_dir, scale="1k", backend="json", seed=0):
+    """data_dir에 가상 데이터를 저장하고 각 컬렉션의 개수를 반환합니다."""
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    counts = scale_counts(SCALES[scale])
+
+    rng = random.Random(seed)
+    photos = [ingest_photo(make_photo(rng), data_dir / "images") for _ in range(counts["photos"])]
+    users, meals, emotions = generate_records(counts, seed, photos)
+    posts, likes = generate_posts(counts, seed)
+
+    store = get_store(data_dir, backend)
+    store.save("users", users)
+    store.save("meals", meals)
+    store.save("emotions", emotions)
+    store.save("posts", posts)
+    store.save("likes", likes)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir", help="데이터를 저장할 디렉토리")
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="식사 기록 규모 (기본값: 1k)")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json", help="저장소 백엔드 (기본값: json)")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드 (기본값: 0)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = write_dataset(args.out_dir, args.scale, args.backend, args.seed)
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{name} {count:,}" for name, count in counts.items())
+    print(f"{args.out_dir}: {summary} ({elapsed:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+라벨별로 정리한 음식 사진으로 색상 히스토그램 분류 모델(centroid)을 만듭니다.
+
+    python build_food_model.py [--labels data/food_labels] [--out data/food_model.npz]
+
+사진은 <labels>/<음식 이름>/*.jpg 구조로 둡니다. 음식 이름의 '/'는 '_'로 적습니다 (예: 국_찌개).
+만든 모델은 FOOD_CLASSIFIER=centroid 로 실행하면 앱과 batch_analyze.py에서 사용됩니다.
+"""
+import argparse
+import time
+
+from food_analysis import FOOD_MODEL_PATH, CentroidClassifier, opencv_available
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default="data/food_labels", help="라벨별 사진 폴더 (기본값: data/food_labels)")
+    parser.add_argument("--out", default=str(FOOD_MODEL_PATH), help=f"모델 파일 경로 (기본값: {FOOD_MODEL_PATH})")
+    args = parser.parse_args()
+
+    if not opencv_available:
+        parser.error("모델을 만들려면 OpenCV(cv2) 패키지가 필요합니다. pip install opencv-python")
+
+    start = time.perf_counter()
+    model = CentroidClassifier.from_directory(args.labels)
+    model.save(args.out)
+    print(f"{args.out}: 라벨 {len(model.labels)}개 ({', '.join(model.labels)}), {time.perf_counter() - start:.1f}초")
+
+
+if __name__ == "__main__":
+    main()
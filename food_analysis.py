@@ -0,0 +1,341 @@
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+# OpenCV가 없으면 분석 기능은 None을 반환
+# 모듈을 불러오는 데 시간이 오래 걸리므로 설치 여부만 확인하고 실제 임포트는 첫 분석 때 수행
+opencv_available = importlib.util.find_spec("cv2") is not None
+cv2 = None
+
+
+def _load_cv2():
+    global cv2
+    if cv2 is None:
+        import cv2 as module
+        cv2 = module
+    return cv2
+
+
+# 빠른 분석 모드에서 사용하는 긴 변 기준 최대 크기(px)
+ANALYSIS_SIZE = 256
+
+# 음식 분류 방식 - heuristic(색상 규칙, 기본값) 또는 centroid(라벨 사진으로 만든 색상 히스토그램 모델)
+FOOD_CLASSIFIER = os.getenv("FOOD_CLASSIFIER", "heuristic")
+FOOD_MODEL_PATH = Path(os.getenv("FOOD_MODEL_PATH", "data/food_model.npz"))
+
+# 색상 히스토그램 구간 수 (H, S, V)
+HISTOGRAM_BINS = (12, 4, 4)
+
+# 메모리에 보관할 분석 결과 개수
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+
+# 색상 기반 분류 대상 음식과 영양 정보
+FOODS = [
+    {"name": "샐러드", "calories": 120, "protein": 5, "carbs": 15, "fat": 3},
+    {"name": "구운 고기", "calories": 350, "protein": 35, "carbs": 0, "fat": 22},
+    {"name": "파스타", "calories": 380, "protein": 12, "carbs": 70, "fat": 10},
+    {"name": "국/찌개", "calories": 250, "protein": 18, "carbs": 20, "fat": 12},
+    {"name": "김밥/초밥", "calories": 320, "protein": 10, "carbs": 60, "fat": 8},
+    {"name": "과일", "calories": 100, "protein": 1, "carbs": 25, "fat": 0}
+]
+
+FOODS_BY_NAME = {food["name"]: food for food in FOODS}
+
+
+def classify_hsv(h_value, s_value, v_value):
+    """
+    평균 색상(H), 채도(S), 명도(V)를 기반으로 음식 종류를 결정합니다.
+    실제 구현에서는 더 정교한 알고리즘이 필요함
+    """
+    if 20 <= h_value <= 40 and s_value > 100:  # 갈색/노란색 계열
+        if v_value > 150:
+            food = FOODS[2]  # 파스타
+        else:
+            food = FOODS[1]  # 구운 고기
+    elif h_value < 20 and s_value < 80:  # 붉은색 계열, 낮은 채도
+        food = FOODS[3]  # 국/찌개
+    elif 40 <= h_value <= 80:  # 녹색/황색 계열
+        if s_value > 100:
+            food = FOODS[0]  # 샐러드
+        else:
+            food = FOODS[5]  # 과일
+    elif 0 <= h_value <= 30 and 60 <= s_value <= 150:
+        food = FOODS[4]  # 김밥/초밥
+    else:
+        # 위의 조건에 맞지 않으면 색상 값으로 음식 선택
+        food = FOODS[int(h_value) % len(FOODS)]
+    return dict(food)
+
+
+def load_analysis_array(image, size=ANALYSIS_SIZE):
+    """
+    분석용으로 축소한 RGB uint8 배열(연속 메모리)을 반환합니다.
+    아직 디코딩되지 않은 JPEG는 draft를 이용해 디코딩 단계에서부터 작게 읽습니다.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    # JPEG가 아니거나 이미 디코딩된 이미지에서는 아무 효과 없음
+    image.draft("RGB", (size, size))
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGB")
+    factor = max(image.size) // size
+    if factor > 1:
+        # 박스 필터 축소라 평균 색상이 거의 그대로 유지됨
+        image = image.reduce(factor)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+
+
+def _load_full_array(image):
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+    return np.asarray(image.convert("RGB"), dtype=np.uint8)
+
+
+def _mean_hsv(rgb):
+    # RGB -> HSV를 작은 버퍼에서 한 번에 변환하고 평균은 float 임시 배열 없이 계산
+    hsv_img = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    return cv2.mean(hsv_img)[:3]
+
+
+def color_histogram(rgb, bins=HISTOGRAM_BINS):
+    """
+    RGB 배열의 HSV 색상 히스토그램을 합이 1이 되도록 정규화한 뒤 제곱근을 취해 반환합니다.
+    제곱근을 취하면 유클리드 거리가 헬링거 거리가 되어 히스토그램 비교에 더 적합합니다.
+    """
+    hsv_img = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    hist = cv2.calcHist([hsv_img], [0, 1, 2], None, list(bins), [0, 180, 0, 256, 0, 256]).ravel()
+    return np.sqrt(hist / max(hist.sum(), 1.0))
+
+
+class HeuristicClassifier:
+    """평균 색상(HSV) 규칙으로 분류하는 기본 분류기"""
+
+    name = "heuristic"
+    cache_prefix = ""
+
+    def predict_batch(self, arrays):
+        _load_cv2()
+        return [classify_hsv(*_mean_hsv(rgb)) for rgb in arrays]
+
+
+class CentroidClassifier:
+    """
+    라벨별 색상 히스토그램의 평균(중심)과 가장 가까운 라벨로 분류하는 모델입니다.
+    여러 장을 한 번에 넘기면 거리 계산을 행렬 연산 한 번으로 처리합니다.
+    """
+
+    name = "centroid"
+
+    def __init__(self, labels, centroids, bins=HISTOGRAM_BINS):
+        unknown = [label for label in labels if label not in FOODS_BY_NAME]
+        if unknown:
+            raise ValueError(f"영양 정보가 없는 음식 라벨입니다: {', '.join(unknown)}")
+        self.labels = list(labels)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.bins = tuple(bins)
+        self._centroid_norms = (self.centroids ** 2).sum(axis=1)
+        # 모델이 바뀌면 이전 모델의 분석 결과 캐시를 쓰지 않도록 구분자로 사용
+        self.cache_prefix = "centroid-" + hashlib.sha256(self.centroids.tobytes()).hexdigest()[:12] + "-"
+
+    @classmethod
+    def fit(cls, images_by_label, bins=HISTOGRAM_BINS):
+        """{라벨: [이미지 경로 또는 PIL 이미지, ...]}로 모델을 만듭니다."""
+        _load_cv2()
+        labels, centroids = [], []
+        for label, images in sorted(images_by_label.items()):
+            features = [color_histogram(load_analysis_array(image), bins) for image in images]
+            if features:
+                labels.append(label)
+                centroids.append(np.mean(features, axis=0))
+        return cls(labels, centroids, bins)
+
+    @classmethod
+    def from_directory(cls, label_dir, bins=HISTOGRAM_BINS):
+        """
+        label_dir/<라벨>/*.jpg 구조의 사진으로 모델을 만듭니다.
+        폴더 이름에는 '/'를 쓸 수 없으므로 '_'로 적습니다 (예: 국_찌개 -> 국/찌개).
+        """
+        images_by_label = {}
+        for folder in sorted(Path(label_dir).iterdir()):
+            if folder.is_dir():
+                images_by_label[folder.name.replace("_", "/")] = sorted(
+                    p for p in folder.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+                )
+        return cls.fit(images_by_label, bins)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, labels=np.array(self.labels), centroids=self.centroids, bins=np.array(self.bins))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["labels"].tolist(), data["centroids"], data["bins"].tolist())
+
+    def predict_batch(self, arrays):
+        if not arrays:
+            return []
+        _load_cv2()
+        features = np.stack([color_histogram(rgb, self.bins) for rgb in arrays])
+        # |x - c|^2 = |x|^2 - 2x·c + |c|^2 에서 |x|^2은 모든 중심에 같으므로 생략
+        distances = self._centroid_norms[None, :] - 2 * features @ self.centroids.T
+        return [dict(FOODS_BY_NAME[self.labels[i]]) for i in distances.argmin(axis=1)]
+
+
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_classifier(kind=None, model_path=None):
+    """
+    설정된 분류기를 반환합니다. 모델은 프로세스당 한 번만 읽어 모든 세션이 함께 사용합니다.
+    centroid 모델 파일이 없으면 기본 분류기를 사용합니다.
+    """
+    kind = kind or FOOD_CLASSIFIER
+    model_path = Path(model_path or FOOD_MODEL_PATH)
+    key = (kind, str(model_path.resolve()))
+    with _classifiers_lock:
+        if key not in _classifiers:
+            if kind == "centroid" and model_path.exists():
+                _classifiers[key] = CentroidClassifier.load(model_path)
+            elif kind in ("centroid", "heuristic"):
+                _classifiers[key] = HeuristicClassifier()
+            else:
+                raise ValueError(f"지원하지 않는 음식 분류기입니다: {kind}")
+        return _classifiers[key]
+
+
+@metrics.instrument("analyze_food_image")
+def analyze_food_image(image, fast=True, classifier=None):
+    """
+    OpenCV를 사용하여 음식 이미지를 분석하고 음식 종류와 영양소 정보를 반환합니다.
+    fast=True 이면 축소된 이미지로 분석하고, False 이면 원본 해상도 전체를 사용합니다.
+    classifier를 넘기지 않으면 설정된 분류기(get_classifier)를 사용합니다.
+    """
+    if not opencv_available:
+        # OpenCV를 사용할 수 없는 경우
+        return None
+    array = load_analysis_array(image) if fast else _load_full_array(image)
+    return (classifier or get_classifier()).predict_batch([array])[0]
+
+
+def analyze_food_images(images, classifier=None):
+    """여러 장의 이미지를 축소한 뒤 분류기에 한 번에 넘겨 분석합니다."""
+    if not opencv_available:
+        return [None] * len(images)
+    arrays = [load_analysis_array(image) for image in images]
+    return (classifier or get_classifier()).predict_batch(arrays)
+
+
+def analyze_food_array(rgb):
+    """
+    이미 축소된 RGB uint8 배열(카메라 프레임 등)을 분석합니다.
+    디코딩/축소 단계가 없으므로 실시간 인식처럼 같은 작업을 반복할 때 사용합니다.
+    """
+    if not opencv_available:
+        return None
+    return get_classifier().predict_batch([rgb])[0]
+
+
+class AnalysisCache:
+    """
+    업로드 파일 내용의 SHA-256 해시를 키로 음식 분석 결과를 보관합니다.
+    메모리(LRU)에서 먼저 찾고, 없으면 디스크(<cache_dir>/<해시>.json)에서 찾습니다.
+    """
+
+    def __init__(self, cache_dir, max_entries=ANALYSIS_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        path = self.cache_dir / f"{key}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_analysis_cache(cache_dir):
+    # 저장소와 마찬가지로 세션 간에 공유되도록 모듈 단위로 보관
+    key = str(Path(cache_dir).resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = AnalysisCache(cache_dir)
+            metrics.register_source("analysis_cache", _caches[key].stats)
+        return _caches[key]
+
+
+def analyze_food_bytes(data, cache=None, key=None):
+    """
+    업로드된 파일 내용(bytes)을 분석합니다.
+    cache가 주어지면 같은 내용의 사진은 디코딩과 OpenCV 처리 없이 저장된 결과를 돌려줍니다.
+    key에 이미 계산한 SHA-256 해시를 넘기면 다시 계산하지 않습니다.
+    """
+    if cache is None or not opencv_available:
+        return analyze_food_image(io.BytesIO(data))
+    key = get_classifier().cache_prefix + (key or hashlib.sha256(data).hexdigest())
+    result = cache.get(key)
+    if result is None:
+        result = analyze_food_image(io.BytesIO(data))
+        cache.put(key, result)
+    return dict(result)
@@ -0,0 +1,495 @@
+import importlib.util
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import metrics
+
+# pyarrow가 없으면 내보내기/가져오기와 아카이브 조회를 사용할 수 없음 (앱은 저장소만 사용)
+pyarrow_available = importlib.util.find_spec("pyarrow") is not None
+pa = None
+pq = None
+
+
+def _load_pyarrow():
+    global pa, pq
+    if pa is None:
+        import pyarrow as module
+        import pyarrow.parquet as parquet
+        pa, pq = module, parquet
+    return pa
+
+
+# 내보낸 파일을 저장하는 디렉토리
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "data/archive"))
+
+# 사용자 파티션 수 - 사용자마다 파일을 만들면 작은 파일이 너무 많아지므로 user_id % 개수로 묶음
+ARCHIVE_USER_BUCKETS = int(os.getenv("ARCHIVE_USER_BUCKETS", "16"))
+
+# 내보낼 때 한 번에 dict로 바꿔 Arrow로 변환하는 기록 수
+ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", "50000"))
+
+ARCHIVE_NAMES = ("meals", "emotions")
+
+# 날짜나 사용자 id가 없거나 형식이 다른 예전 기록을 모아두는 파티션 (앱은 읽지 않고 import에만 사용)
+UNKNOWN_MONTH = "unknown"
+ARCHIVE_FORMATS = ("parquet", "arrow")
+
+# 스키마에 없는 필드는 잃어버리지 않도록 JSON 문자열로 extra 컬럼에 보관
+EXTRA_FIELD = "extra"
+
+
+def archive_schema(name):
+    """meals/emotions 파일의 컬럼 타입. 범주형 값은 사전 인코딩(dictionary)으로 저장합니다."""
+    pa = _load_pyarrow()
+    category = pa.dictionary(pa.int8(), pa.string())
+    if name == "meals":
+        fields = [
+            ("id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("date", pa.date32()),
+            ("time", pa.string()),
+            ("type", category),
+            ("location", category),
+            ("alone", pa.bool_()),
+            ("mood", pa.int8()),
+            ("content", pa.string()),
+            ("has_photo", pa.bool_()),
+            ("food_type", pa.dictionary(pa.int16(), pa.string())),
+            ("calories", pa.float32()),
+            ("protein", pa.float32()),
+            ("carbs", pa.float32()),
+            ("fat", pa.float32()),
+            ("photo_hash", pa.string()),
+            ("photo_path", pa.string()),
+            ("display_path", pa.string()),
+            ("thumb_path", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ]
+    elif name == "emotions":
+        fields = [
+            ("id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("date", pa.date32()),
+            ("mood", pa.int8()),
+            ("diary", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ]
+    else:
+        raise ValueError(f"내보낼 수 없는 기록입니다: {name}")
+    return pa.schema(fields + [(EXTRA_FIELD, pa.string())])
+
+
+def _parse_iso(value, parse):
+    # 다시 문자열로 만들었을 때 원래 값과 같은 경우만 변환 (아니면 None)
+    try:
+        parsed = parse(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.isoformat() == value else None
+
+
+def _column_value(pa, data_type, value):
+    """기록의 값을 컬럼에 넣을 값으로 바꿉니다. 컬럼 타입으로 표현하지 못하면 None을 반환합니다."""
+    if pa.types.is_date32(data_type):
+        return _parse_iso(value, date.fromisoformat)
+    if pa.types.is_timestamp(data_type):
+        parsed = _parse_iso(value, datetime.fromisoformat)
+        return parsed if parsed is not None and parsed.tzinfo is None else None
+    if pa.types.is_boolean(data_type):
+        return value if isinstance(value, bool) else None
+    if pa.types.is_integer(data_type):
+        bits = data_type.bit_width - 1
+        valid = isinstance(value, int) and not isinstance(value, bool) and -(2 ** bits) <= value < 2 ** bits
+        return value if valid else None
+    if pa.types.is_floating(data_type):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    return value if isinstance(value, str) else None
+
+
+def _float_from_column(value):
+    # 영양 정보는 정수로 기록되는 경우가 많아 float32로 저장했다가 되돌릴 때 정수 값은 정수로 복원
+    return int(value) if value is not None and value.is_integer() else value
+
+
+def _plain_types(pa, data_type):
+    # 변환 없이 그대로 컬럼에 넣을 수 있는 값의 타입 (날짜/시각은 항상 문자열을 변환)
+    if pa.types.is_boolean(data_type):
+        return {bool}
+    if pa.types.is_integer(data_type):
+        return {int}
+    if pa.types.is_floating(data_type):
+        return {int, float}
+    if pa.types.is_date32(data_type) or pa.types.is_timestamp(data_type):
+        return set()
+    return {str}
+
+
+def _to_column(pa, data_type, values):
+    """
+    한 필드의 값 목록을 Arrow 배열로 바꿉니다. (배열, 원래 값을 extra에 보관해야 하는 행 번호 목록)을 반환합니다.
+    대부분은 값의 타입이 모두 맞으므로 타입 종류를 한 번에 확인해 값마다 검사하지 않는 빠른 경로를 탐
+    """
+    kept = []
+    column = None
+    if set(map(type, values)) - {type(None)} <= _plain_types(pa, data_type):
+        try:
+            column = pa.array(values, type=data_type)
+        except (pa.ArrowInvalid, OverflowError):
+            # int8 범위를 넘는 값 등은 아래에서 값마다 확인
+            column = None
+    if column is None:
+        # 날짜/시각과 범주 값은 반복되는 경우가 많아 한 번 변환한 결과를 재사용
+        cache = {}
+        converted = []
+        for i, value in enumerate(values):
+            if value is None:
+                converted.append(None)
+                continue
+            if type(value) is str and value in cache:
+                result = cache[value]
+            else:
+                result = _column_value(pa, data_type, value)
+                if type(value) is str:
+                    cache[value] = result
+            if result is None:
+                kept.append(i)
+            converted.append(result)
+        values = converted
+        column = pa.array(values, type=data_type)
+    if pa.types.is_floating(data_type):
+        import numpy as np
+
+        # float32로 줄였다가 되돌렸을 때 값이나 타입(정수/실수)이 바뀌는 값은 원래 값을 보관
+        original = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        stored = column.to_numpy(zero_copy_only=False).astype(np.float64)
+        changed = set(np.flatnonzero(~np.isnan(original) & (stored != original)).tolist())
+        changed.update(
+            i for i, value in enumerate(values)
+            if (type(value) is float and value.is_integer()) or (type(value) is int and not -2 ** 24 <= value <= 2 ** 24)
+        )
+        kept = sorted(set(kept) | changed)
+    return column, kept
+
+
+def records_to_table(name, records):
+    """
+    기록(dict 목록)을 archive_schema 형식의 Arrow 테이블로 변환합니다.
+    스키마에 없는 필드와 컬럼 타입으로 그대로 되돌릴 수 없는 값(형식이 다른 날짜, float32로 줄이면 바뀌는 영양 정보 등)은
+    원래 값을 extra 컬럼에 보관하므로 table_to_records가 원래 기록을 그대로 돌려줍니다.
+    """
+    pa = _load_pyarrow()
+    schema = archive_schema(name)
+    known = set(schema.names)
+    extras = [
+        {} if known.issuperset(record) else {key: value for key, value in record.items() if key not in known}
+        for record in records
+    ]
+    columns = []
+    for field in schema:
+        if field.name == EXTRA_FIELD:
+            continue
+        values = [record.get(field.name) for record in records]
+        column, kept = _to_column(pa, field.type, values)
+        for i in kept:
+            extras[i][field.name] = values[i]
+        columns.append(column)
+    for record, extra in zip(records, extras):
+        if None in record.values():
+            # 키는 있고 값이 null인 경우는 키가 없는 경우와 구분해 보관
+            extra.update((key, None) for key, value in record.items() if value is None)
+    columns.append(pa.array(
+        [json.dumps(extra, ensure_ascii=False) if extra else None for extra in extras], type=pa.string()
+    ))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def table_to_records(table):
+    """records_to_table의 반대 - 값이 없는 필드는 원래 기록처럼 키 자체를 생략합니다."""
+    pa = _load_pyarrow()
+    # 행마다 타입을 확인하지 않도록 컬럼 단위로 파이썬 값으로 바꾼 뒤 행으로 묶음
+    names, columns = [], []
+    for field in table.schema:
+        column = table.column(field.name)
+        if pa.types.is_date32(field.type):
+            values = column.cast(pa.string()).to_pylist()
+        elif pa.types.is_timestamp(field.type):
+            values = [value.isoformat() if value is not None else None for value in column.to_pylist()]
+        elif pa.types.is_dictionary(field.type):
+            # 사전의 문자열을 코드로 찾아 쓰면 같은 값은 같은 문자열 객체를 공유
+            values = []
+            for chunk in column.chunks:
+                dictionary = chunk.dictionary.to_pylist()
+                values.extend(dictionary[i] if i is not None else None for i in chunk.indices.to_pylist())
+        elif pa.types.is_floating(field.type):
+            values = [_float_from_column(value) for value in column.to_pylist()]
+        else:
+            values = column.to_pylist()
+        names.append(field.name)
+        columns.append(values)
+
+    records = []
+    for row in zip(*columns):
+        record = {name: value for name, value in zip(names, row) if value is not None}
+        extra = record.pop(EXTRA_FIELD, None)
+        if extra:
+            record.update(json.loads(extra))
+        records.append(record)
+    return records
+
+
+def _partition_dir(root, fmt, name, month, bucket):
+    # Hive 형식 경로라 pandas/pyarrow.dataset으로 디렉토리째 읽으면 month, user_bucket 컬럼이 붙음
+    return Path(root) / fmt / name / f"month={month}" / f"user_bucket={bucket:02d}"
+
+
+def _partitions(columns, buckets):
+    """
+    컬럼형 기록(RecordColumns)을 (월, 사용자 버킷)으로 나눠 (월, 버킷, 행 번호 배열)을 차례로 반환합니다.
+    행은 사용자, id 순으로 정렬됩니다 - Parquet 통계로 사용자 필터를 건너뛸 수 있고, Arrow는 사용자마다 배치 하나가 됨.
+    """
+    import numpy as np
+
+    from records import MISSING
+
+    days, user_ids = columns.column("date"), columns.column("user_id")
+    known = (days != MISSING["date"]) & (user_ids != MISSING["int64"])
+    months = np.where(known, days, 0).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    bucket_ids = np.where(known, user_ids % buckets, 0)
+    order = np.lexsort((columns.column("id"), user_ids, bucket_ids, months, ~known))
+    keys = (~known[order], months[order], bucket_ids[order])
+    changed = np.zeros(len(order), dtype=bool)
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changed).tolist()
+    for start, end in zip([0] + starts, starts + [len(order)]):
+        if not len(order):
+            break
+        row = order[start]
+        if not known[row]:
+            yield UNKNOWN_MONTH, 0, order[start:end]
+        else:
+            yield str(np.datetime64(int(months[row]), "M")), int(bucket_ids[row]), order[start:end]
+
+
+def _partition_table(name, columns, rows):
+    # dict로 바꾸는 기록은 ARCHIVE_BATCH_ROWS개씩만 (Arrow 메모리는 파티션 크기만큼)
+    pa = _load_pyarrow()
+    tables = [
+        records_to_table(name, columns.to_records(rows[start:start + ARCHIVE_BATCH_ROWS]))
+        for start in range(0, len(rows), ARCHIVE_BATCH_ROWS)
+    ]
+    return pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+
+
+def _write_partition(root, formats, name, month, bucket, table):
+    pa = _load_pyarrow()
+    if "parquet" in formats:
+        path = _partition_dir(root, "parquet", name, month, bucket) / "part-0.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, path, compression="zstd")
+        metrics.add("archive_bytes_written", path.stat().st_size)
+    if "arrow" in formats:
+        # 정렬된 user_id가 바뀌는 위치에서 잘라 사용자마다 배치 하나 (slice는 복사 없음)
+        whole = table.combine_chunks().to_batches()[0]
+        user_ids = table.column("user_id").to_pylist()
+        starts = [0] + [i for i in range(1, len(user_ids)) if user_ids[i] != user_ids[i - 1]]
+        user_batches = {str(user_ids[start]): i for i, start in enumerate(starts)}
+        batches = [whole.slice(start, end - start) for start, end in zip(starts, starts[1:] + [len(user_ids)])]
+        # 사용자 id -> 배치 번호 색인을 스키마 메타데이터에 넣어 조회 시 해당 배치만 읽음
+        schema = table.schema.with_metadata({"user_batches": json.dumps(user_batches)})
+        path = _partition_dir(root, "arrow", name, month, bucket) / "part-0.arrow"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+        metrics.add("archive_bytes_written", path.stat().st_size)
+
+
+def export_archive(store, out_dir=ARCHIVE_DIR, formats=ARCHIVE_FORMATS, buckets=ARCHIVE_USER_BUCKETS):
+    """
+    식사/감정 기록을 (월, 사용자 버킷)별 Parquet/Arrow 파일로 내보내고 기록 수를 반환합니다.
+    저장소의 컬럼형 기록에서 파티션 하나씩 ARCHIVE_BATCH_ROWS개 단위로 변환해서 쓰므로
+    dict 기록은 한 묶음만, Arrow 메모리는 가장 큰 파티션 크기만큼만 사용합니다.
+    날짜나 사용자 id를 알 수 없는 기록은 month=unknown 파티션에 넣습니다.
+    임시 디렉토리에 모두 쓴 뒤 교체하므로 읽는 쪽은 항상 완성된 아카이브만 봅니다.
+    """
+    _load_pyarrow()
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    # 이번 달 기록은 앞으로 더 늘어나므로 앱은 지난달까지만 아카이브에서 읽음
+    exported_at = datetime.now()
+    counts = {}
+    max_ids = {}
+    for name in ARCHIVE_NAMES:
+        columns = store.load_columns(name)
+        for month, bucket, rows in _partitions(columns, buckets):
+            _write_partition(tmp_dir, formats, name, month, bucket, _partition_table(name, columns, rows))
+        counts[name] = len(columns)
+        # id가 정수가 아닌 기록은 배열에서 MISSING(최솟값)이므로 0과 비교해 제외
+        max_ids[name] = max(int(columns.column("id").max(initial=0)), 0)
+
+    manifest = {
+        "exported_at": exported_at.isoformat(),
+        "complete_before": exported_at.strftime("%Y-%m-01"),
+        "user_buckets": buckets,
+        "formats": list(formats),
+        "counts": counts,
+        # 이 id보다 큰 기록은 내보낸 뒤에 추가된 것 (날짜가 지난달 이전이어도 저장소에서 읽어야 함)
+        "max_ids": max_ids,
+    }
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old_dir = out_dir.with_name(f"{out_dir.name}.old-{os.getpid()}")
+    if out_dir.exists():
+        out_dir.rename(old_dir)
+    tmp_dir.rename(out_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return counts
+
+
+def _partition_files(root, fmt, name):
+    suffix = ".parquet" if fmt == "parquet" else ".arrow"
+    return sorted((Path(root) / fmt / name).glob(f"month=*/user_bucket=*/*{suffix}"))
+
+
+def read_archive_table(root, name, fmt=None):
+    """아카이브의 한 종류 전체를 하나의 Arrow 테이블로 읽습니다."""
+    pa = _load_pyarrow()
+    fmt = fmt or _available_format(root)
+    tables = []
+    for path in _partition_files(root, fmt, name):
+        if fmt == "parquet":
+            tables.append(pq.read_table(path, memory_map=True))
+        else:
+            tables.append(pa.ipc.open_file(pa.memory_map(str(path))).read_all())
+    if not tables:
+        return archive_schema(name).empty_table()
+    return pa.concat_tables([table.replace_schema_metadata(None) for table in tables])
+
+
+def _available_format(root):
+    with open(Path(root) / "manifest.json", encoding="utf-8") as f:
+        formats = json.load(f)["formats"]
+    # 메모리 매핑으로 바로 읽을 수 있는 Arrow를 우선 사용
+    return "arrow" if "arrow" in formats else formats[0]
+
+
+def import_archive(store, archive_dir=ARCHIVE_DIR, fmt=None):
+    """
+    아카이브의 기록을 저장소로 한 번에 불러옵니다. 대상 기록의 기존 내용은 덮어씁니다.
+    """
+    counts = {}
+    for name in ARCHIVE_NAMES:
+        table = read_archive_table(archive_dir, name, fmt)
+        records = sorted(table_to_records(table), key=lambda r: r.get("id", 0))
+        store.save(name, records)
+        counts[name] = len(records)
+    return counts
+
+
+class HistoryArchive:
+    """
+    앱에서 과거 기록을 읽기 위한 아카이브 핸들입니다.
+    Arrow 파일은 메모리 매핑으로 열고 사용자 색인으로 해당 사용자의 배치만 꺼내므로
+    JSON을 파싱하거나 다른 사용자의 기록을 읽지 않습니다.
+    내보낸 파일은 바뀌지 않으므로 한 번 연 파일과 색인은 계속 재사용합니다.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        with open(self.root / "manifest.json", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.complete_before = self.manifest["complete_before"]
+        self.exported_at = self.manifest["exported_at"]
+        # 이전 버전에서 내보낸 아카이브에는 없음 - 이후 추가된 기록을 구분할 수 없으므로 앱은 사용하지 않음
+        self.max_ids = self.manifest.get("max_ids")
+        self.buckets = self.manifest["user_buckets"]
+        self.format = _available_format(self.root)
+        self._lock = threading.Lock()
+        self._months = {}
+        self._readers = {}
+
+    def _archived_months(self, name):
+        # 앱이 읽을 수 있는 (complete_before 이전) 달 목록
+        if name not in self._months:
+            months = sorted(path.name[len("month="):] for path in (self.root / self.format / name).glob("month=*"))
+            self._months[name] = [
+                month for month in months if month != UNKNOWN_MONTH and month + "-01" < self.complete_before
+            ]
+        return self._months[name]
+
+    def _reader(self, name, month, bucket):
+        # (Arrow 파일 reader, 사용자 id -> 배치 번호) - 파일이 없으면 None
+        key = (name, month, bucket)
+        if key not in self._readers:
+            path = _partition_dir(self.root, "arrow", name, month, bucket) / "part-0.arrow"
+            reader = None
+            if path.exists():
+                reader = pa.ipc.open_file(pa.memory_map(str(path)))
+                reader = (reader, json.loads(reader.schema.metadata[b"user_batches"]))
+            self._readers[key] = reader
+        return self._readers[key]
+
+    def read_user(self, name, user_id, start=None, end=None, recent=(), replaced_ids=()):
+        """
+        complete_before 이전 달 중 [start, end] 기간(YYYY-MM-DD, 양 끝 포함)이 걸친 달의 기록을 반환합니다.
+        반환된 테이블은 파일을 메모리 매핑한 버퍼를 그대로 참조합니다.
+        recent에 아카이브 이후의 기록(dict 목록)을 넘기면 같은 스키마로 변환해 뒤에 붙입니다.
+        replaced_ids의 기록은 내보낸 뒤 바뀐 것이므로 아카이브에서 읽은 쪽을 제외합니다 (새 내용은 recent로 넘김).
+        """
+        pa = _load_pyarrow()
+        bucket = user_id % self.buckets
+        first, last = (start or "")[:7], (end or "9999-12")[:7]
+        tables = []
+        with metrics.timed(f"archive_read_{name}"), self._lock:
+            for month in self._archived_months(name):
+                if month < first or month > last:
+                    continue
+                if self.format == "arrow":
+                    entry = self._reader(name, month, bucket)
+                    if entry is not None and str(user_id) in entry[1]:
+                        tables.append(pa.Table.from_batches([entry[0].get_batch(entry[1][str(user_id)])]))
+                    continue
+                path = _partition_dir(self.root, "parquet", name, month, bucket) / "part-0.parquet"
+                if path.exists():
+                    tables.append(pq.read_table(path, filters=[("user_id", "=", user_id)], memory_map=True))
+        if tables and replaced_ids:
+            import pyarrow.compute as pc
+
+            replaced = pa.array(sorted(replaced_ids), type=pa.int64())
+            tables = [table.filter(pc.invert(pc.is_in(table["id"], value_set=replaced))) for table in tables]
+        if recent:
+            tables.append(records_to_table(name, recent))
+        if not tables:
+            return archive_schema(name).empty_table()
+        return pa.concat_tables([table.replace_schema_metadata(None) for table in tables])
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(root=ARCHIVE_DIR):
+    """
+    내보낸 아카이브가 있으면 HistoryArchive를, 없거나 pyarrow가 없으면 None을 반환합니다.
+    다시 내보내면(manifest 변경) 새로 엽니다.
+    """
+    manifest_path = Path(root) / "manifest.json"
+    if not pyarrow_available or not manifest_path.exists():
+        return None
+    token = manifest_path.stat().st_mtime_ns
+    with _archives_lock:
+        entry = _archives.get(str(root))
+        if entry is None or entry[0] != token:
+            entry = (token, HistoryArchive(root))
+            _archives[str(root)] = entry
+        return entry[1]
@@ -0,0 +1,74 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# 화면 표시용 이미지와 썸네일의 긴 변 기준 최대 크기(px)
+DISPLAY_SIZE = 1280
+THUMBNAIL_SIZE = 320
+JPEG_QUALITY = 85
+
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode_jpeg(image, size):
+    image = image.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def ingest_photo(data, image_dir, writer=None, track=None):
+    """
+    업로드된 사진을 내용 해시 기준으로 저장하고 경로 정보를 반환합니다.
+    - originals/<해시>.<원본 확장자> : 원본 (같은 사진은 한 번만 저장)
+    - display/<해시>.jpg : 화면 표시용 압축본
+    - thumbs/<해시>.jpg : 목록용 썸네일
+    반환되는 경로는 모두 image_dir 기준 상대 경로입니다.
+    writer(WriteBehindQueue)를 넘기면 파일 저장은 백그라운드 쓰기 대기열에서 처리됩니다.
+    이때 track을 넘기면 대기열에 넣은 파일마다 저장 결과 Future로 호출합니다.
+    대기열이 가득 차면 WriteQueueFull이 발생합니다.
+    """
+    image_dir = Path(image_dir)
+    if writer is None:
+        exists, write = Path.exists, _write_atomic
+    else:
+        exists = lambda path: path.exists() or writer.pending_file(path) is not None
+
+        def write(path, content):
+            future = writer.submit_file(path, content)
+            if track is not None:
+                track(future)
+    photo_hash = hashlib.sha256(data).hexdigest()
+    display_path = Path("display") / f"{photo_hash}.jpg"
+    thumb_path = Path("thumbs") / f"{photo_hash}.jpg"
+
+    image = Image.open(io.BytesIO(data))
+    original_path = Path("originals") / f"{photo_hash}.{_EXTENSIONS.get(image.format, 'bin')}"
+    if not exists(image_dir / original_path):
+        write(image_dir / original_path, data)
+
+    if not exists(image_dir / display_path) or not exists(image_dir / thumb_path):
+        # 표시용 크기 이상으로는 디코딩할 필요가 없으므로 JPEG는 축소 디코딩
+        image.draft("RGB", (DISPLAY_SIZE, DISPLAY_SIZE))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        write(image_dir / display_path, _encode_jpeg(image, DISPLAY_SIZE))
+        write(image_dir / thumb_path, _encode_jpeg(image, THUMBNAIL_SIZE))
+
+    return {
+        "photo_hash": photo_hash,
+        "photo_path": original_path.as_posix(),
+        "display_path": display_path.as_posix(),
+        "thumb_path": thumb_path.as_posix(),
+    }
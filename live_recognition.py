@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import metrics
+from food_analysis import FOODS_BY_NAME, analyze_food_array
+
+# 영상 목표 FPS - 프레임 콜백은 프레임당 1000/LIVE_TARGET_FPS ms 안에 끝나야 함
+LIVE_TARGET_FPS = 30
+
+# 분석용으로 축소할 프레임의 긴 변 크기(px)
+LIVE_ANALYSIS_SIZE = int(os.getenv("LIVE_ANALYSIS_SIZE", "160"))
+
+# 인식 결과를 다수결로 정할 최근 분석 결과 개수
+LIVE_SMOOTHING_WINDOW = int(os.getenv("LIVE_SMOOTHING_WINDOW", "15"))
+
+# 초당 최대 분석 횟수 - 음식은 거의 움직이지 않으므로 모든 프레임을 분석할 필요가 없음
+LIVE_MAX_ANALYSIS_FPS = float(os.getenv("LIVE_MAX_ANALYSIS_FPS", "10"))
+
+# 이 시간(초) 동안 프레임이 없으면 분석 스레드 종료 (다음 프레임이 오면 다시 시작)
+LIVE_IDLE_TIMEOUT = float(os.getenv("LIVE_IDLE_TIMEOUT", "30"))
+
+def _ema(previous, value, alpha=0.2):
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+def _downscale(frame, size):
+    # av.VideoFrame.reformat은 swscale(C)로 축소와 RGB 변환을 한 번에 처리
+    scale = min(1.0, size / max(frame.width, frame.height))
+    width = max(2, int(frame.width * scale) // 2 * 2)
+    height = max(2, int(frame.height * scale) // 2 * 2)
+    return frame.reformat(width=width, height=height, format="rgb24").to_ndarray()
+
+
+class LiveFoodRecognizer:
+    """
+    streamlit-webrtc의 video_frame_callback으로 넘겨 카메라 영상에서 음식을 실시간으로 인식합니다.
+    - 콜백은 분석할 프레임을 축소해서 넘겨두기만 하고 바로 반환하므로 영상 FPS가 떨어지지 않음
+    - 분석은 별도 스레드에서 가장 최근 프레임 하나만 처리 (밀린 프레임은 버림)
+    - 분석 간격은 측정한 분석 시간에 맞춰 자동으로 늘어남
+    - 최근 분석 결과를 다수결로 묶어 결과가 프레임마다 흔들리지 않게 함
+    """
+
+    def __init__(self, size=LIVE_ANALYSIS_SIZE, window=LIVE_SMOOTHING_WINDOW, max_analysis_fps=LIVE_MAX_ANALYSIS_FPS):
+        self.size = size
+        self.min_interval = 1.0 / max_analysis_fps
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        self._pending = None
+        self._recent = deque(maxlen=window)
+        self._thread = None
+        self._last_frame_at = None
+        self._next_submit_at = 0.0
+        self._frame_interval = None
+        self._analysis_time = None
+        self._callback_timer = metrics.Timer()
+        self._analysis_timer = metrics.Timer()
+        self.frames = 0
+        self.analyzed = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def _ensure_worker(self):
+        # 잠금을 잡은 상태에서 호출
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="live-food-recognizer", daemon=True)
+            self._thread.start()
+
+    def _submit_interval(self):
+        # 분석 한 번에 걸리는 시간보다 자주 넘기면 작업이 쌓이기만 하므로 여유를 두고 간격을 늘림
+        if self._analysis_time is None:
+            return self.min_interval
+        return max(self.min_interval, self._analysis_time * 1.5)
+
+    def recv(self, frame):
+        start = time.perf_counter()
+        with self._lock:
+            self.frames += 1
+            if self._last_frame_at is not None:
+                self._frame_interval = _ema(self._frame_interval, start - self._last_frame_at)
+            self._last_frame_at = start
+            submit = start >= self._next_submit_at
+            if submit:
+                self._next_submit_at = start + self._submit_interval()
+            else:
+                self.skipped += 1
+
+        if submit:
+            small = _downscale(frame, self.size)
+            with self._lock:
+                if self._pending is not None:
+                    # 분석 스레드가 아직 이전 프레임을 가져가지 못함 - 최신 프레임으로 교체
+                    self.dropped += 1
+                self._pending = small
+                self._ensure_worker()
+                self._frame_ready.notify()
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._callback_timer.observe(elapsed)
+        metrics.observe("live_frame_callback", elapsed)
+        return frame
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._frame_ready.wait(LIVE_IDLE_TIMEOUT)
+                if self._pending is None:
+                    self._thread = None
+                    return
+                rgb, self._pending = self._pending, None
+
+            start = time.perf_counter()
+            result = analyze_food_array(rgb)
+            elapsed = time.perf_counter() - start
+            metrics.observe("live_analysis", elapsed)
+            with self._lock:
+                self._analysis_time = _ema(self._analysis_time, elapsed)
+                self._analysis_timer.observe(elapsed)
+                self.analyzed += 1
+                if result is not None:
+                    self._recent.append(result["name"])
+
+    def prediction(self):
+        """최근 분석 결과 중 가장 많이 나온 음식과 그 비율(confidence)을 반환합니다."""
+        with self._lock:
+            names = list(self._recent)
+        if not names:
+            return None
+        name, votes = Counter(names).most_common(1)[0]
+        return dict(FOODS_BY_NAME[name], confidence=votes / len(names))
+
+    def stats(self):
+        with self._lock:
+            callback = self._callback_timer.quantiles()
+            analysis = self._analysis_timer.quantiles()
+            interval = self._frame_interval
+            return {
+                "frames": self.frames,
+                "analyzed": self.analyzed,
+                "skipped": self.skipped,
+                "dropped": self.dropped,
+                "stream_fps": 1.0 / interval if interval else 0.0,
+                "analysis_interval_ms": self._submit_interval() * 1000,
+                "callback_p50_ms": callback[0.5] * 1000,
+                "callback_p95_ms": callback[0.95] * 1000,
+                "analysis_p50_ms": analysis[0.5] * 1000,
+                "analysis_p95_ms": analysis[0.95] * 1000,
+            }
@@ -0,0 +1,269 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+# 항목별로 지연 시간 분포 계산에 사용할 최근 측정값 개수
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))
+
+# 성능 패널을 볼 수 있는 사용자 아이디 (쉼표로 구분)
+ADMIN_USERS = {name.strip() for name in os.getenv("ADMIN_USERS", "").split(",") if name.strip()}
+
+# 설정하면 재실행이 끝날 때마다(최소 간격 METRICS_EXPORT_INTERVAL초) Prometheus 텍스트 파일로 내보냄
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH", "")
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", "15"))
+
+# 샘플링 프로파일러 - 재실행이 PROFILE_SLOW_MS보다 오래 걸리면 수집한 스택을 PROFILE_DIR에 저장
+PROFILE_SLOW_RERUNS = os.getenv("PROFILE_SLOW_RERUNS", "0") == "1"
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "data/profiles"))
+
+PROMETHEUS_PREFIX = "honbabmate"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Timer:
+    """호출 횟수/누적 시간과 최근 METRICS_WINDOW개의 측정값을 보관합니다."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    """
+    프로세스 전체에서 공유하는 지연 시간/카운터 모음입니다.
+    캐시 적중률처럼 다른 객체가 이미 세고 있는 값은 stats() 함수를 등록해 두고 조회할 때 읽어옵니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = Counter()
+        self._sources = {}
+        self._last_export = 0.0
+        self.profiler_enabled = PROFILE_SLOW_RERUNS
+
+    def observe(self, name, seconds):
+        with self._lock:
+            if name not in self._timers:
+                self._timers[name] = Timer()
+            self._timers[name].observe(seconds)
+
+    def add(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def register_source(self, name, stats):
+        # stats: 숫자 값을 담은 dict를 돌려주는 함수 (같은 이름으로 다시 등록하면 교체)
+        with self._lock:
+            self._sources[name] = stats
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timers(self):
+        with self._lock:
+            timers = list(self._timers.items())
+        rows = []
+        for name, timer in sorted(timers):
+            quantiles = timer.quantiles()
+            rows.append({
+                "name": name,
+                "count": timer.count,
+                "p50_ms": quantiles[0.5] * 1000,
+                "p95_ms": quantiles[0.95] * 1000,
+                "p99_ms": quantiles[0.99] * 1000,
+                "max_ms": timer.max * 1000,
+                "total_s": timer.total,
+            })
+        return rows
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def sources(self):
+        with self._lock:
+            sources = list(self._sources.items())
+        result = {}
+        for name, stats in sources:
+            values = {key: value for key, value in stats().items() if isinstance(value, (int, float))}
+            hits = values.get("hits", 0) + values.get("disk_hits", 0)
+            if "misses" in values:
+                total = hits + values["misses"]
+                values["hit_rate"] = hits / total if total else 0.0
+            result[name] = values
+        return result
+
+    def to_prometheus(self):
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f"# HELP {p}_latency_seconds 구간별 실행 시간",
+            f"# TYPE {p}_latency_seconds summary",
+        ]
+        with self._lock:
+            timers = sorted(self._timers.items())
+            for name, timer in timers:
+                for q, value in timer.quantiles().items():
+                    lines.append(f'{p}_latency_seconds{{name="{name}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{p}_latency_seconds_sum{{name="{name}"}} {timer.total:.6f}')
+                lines.append(f'{p}_latency_seconds_count{{name="{name}"}} {timer.count}')
+            counters = sorted(self._counters.items())
+        for name, value in counters:
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for source, values in sorted(self.sources().items()):
+            for key, value in sorted(values.items()):
+                lines.append(f"# TYPE {p}_{source}_{key} gauge")
+                lines.append(f"{p}_{source}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        # node_exporter textfile collector가 쓰다 만 파일을 읽지 않도록 rename으로 교체
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._last_export = time.monotonic()
+
+    def maybe_export(self):
+        if not METRICS_EXPORT_PATH:
+            return
+        with self._lock:
+            due = time.monotonic() - self._last_export >= METRICS_EXPORT_INTERVAL
+        if due:
+            self.export_prometheus(METRICS_EXPORT_PATH)
+
+
+class SamplingProfiler:
+    """
+    별도 스레드에서 대상 스레드의 호출 스택을 일정 간격으로 읽어 횟수를 셉니다.
+    결과는 flamegraph.pl / speedscope에서 바로 읽을 수 있는 collapsed stack 형식으로 저장합니다.
+    """
+
+    def __init__(self, thread_id=None, interval_ms=PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def write_folded(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+registry = MetricsRegistry()
+observe = registry.observe
+add = registry.add
+timed = registry.timed
+register_source = registry.register_source
+
+# 스레드마다 진행 중인 재실행 측정을 끝내는 함수 (Streamlit 세션의 스크립트는 각자의 스레드에서 실행됨)
+_current_rerun = threading.local()
+
+
+def instrument(name):
+    """함수 실행 시간을 name 항목으로 기록하는 데코레이터"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def track_rerun(name="rerun"):
+    """
+    Streamlit 스크립트 한 번의 실행을 측정합니다.
+    프로파일러가 켜져 있으면 실행 중 스택을 수집하고, 느린 실행만 파일로 남깁니다.
+    """
+    profiler = SamplingProfiler().start() if registry.profiler_enabled else None
+    start = time.perf_counter()
+    finished = False
+
+    def finish():
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        elapsed = time.perf_counter() - start
+        registry.observe(name, elapsed)
+        if profiler is not None:
+            profiler.stop()
+            if elapsed * 1000 >= PROFILE_SLOW_MS:
+                registry.add("slow_reruns")
+                stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+                profiler.write_folded(PROFILE_DIR / f"{name}-{stamp}-{elapsed * 1000:.0f}ms.folded")
+        registry.maybe_export()
+
+    _current_rerun.finish = finish
+    try:
+        yield
+    finally:
+        _current_rerun.finish = None
+        finish()
+
+
+def end_rerun():
+    """
+    진행 중인 track_rerun() 측정을 지금 끝냅니다.
+    화면 갱신을 기다리며 계속 도는 반복처럼 재실행 시간에 넣으면 안 되는 구간 앞에서 호출합니다.
+    """
+    finish = getattr(_current_rerun, "finish", None)
+    if finish is not None:
+        finish()
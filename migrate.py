@@ -0,0 +1,18 @@
+import argparse
+
+from storage import migrate_json_to_sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="data/*.json 기록을 SQLite 데이터베이스로 옮깁니다.")
+    parser.add_argument("--data-dir", default="data", help="JSON 데이터 디렉토리 (기본값: data)")
+    parser.add_argument("--db", default=None, help="SQLite 파일 경로 (기본값: <data-dir>/app.db)")
+    args = parser.parse_args()
+
+    counts = migrate_json_to_sqlite(args.data_dir, args.db)
+    for name, count in counts.items():
+        print(f"{name}: {count}건 이전 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from storage import MEAL_LOCATIONS, MEAL_TYPES
+
+# 집계 단위: 주(월요일 시작), 월
+ROLLUP_PERIODS = ("week", "month")
+
+# 추세(기울기)를 계산할 최근 기간 수와 화면에 그릴 최대 기간 수
+TREND_PERIODS = {"week": 12, "month": 6}
+CHART_PERIODS = {"week": int(os.getenv("MOOD_CHART_WEEKS", "52")), "month": int(os.getenv("MOOD_CHART_MONTHS", "24"))}
+
+# 상관계수를 계산하려면 이만큼의 기간에 값이 있어야 함
+MIN_CORRELATION_PERIODS = 4
+
+# 기간 하나의 집계 값 (열 순서)
+# - meal_*: 식사 기록 수, 기분이 있는 식사 수/기분 합계
+# - emotion_*: 감정 기록(일기) 기분 수/합계
+# - solo_known: 혼자/함께 여부가 있는 식사 수, solo_count: 그중 혼자 먹은 식사 수
+# - solo_mood_*, together_mood_*: 혼자/함께 먹은 식사의 기분 수/합계
+# - type_*, location_*: 식사 유형/장소별 기분 수/합계
+COLUMNS = (
+    ["meal_count", "meal_mood_count", "meal_mood_sum", "emotion_mood_count", "emotion_mood_sum",
+     "solo_known", "solo_count", "solo_mood_count", "solo_mood_sum", "together_mood_count", "together_mood_sum"]
+    + [f"type_{kind}_{t}" for t in MEAL_TYPES for kind in ("count", "sum")]
+    + [f"location_{kind}_{loc}" for loc in MEAL_LOCATIONS for kind in ("count", "sum")]
+)
+COLUMN = {name: i for i, name in enumerate(COLUMNS)}
+
+
+@lru_cache(maxsize=4096)
+def _period_keys(value):
+    # "YYYY-MM-DD" -> (주 번호, 월 번호), 형식이 다르면 None
+    try:
+        day = date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # 0001-01-01이 월요일이므로 (서수 - 1) // 7 은 월요일에 시작하는 주 번호
+    return (day.toordinal() - 1) // 7, day.year * 12 + day.month - 1
+
+
+def period_label(period, key):
+    if period == "week":
+        return date.fromordinal(key * 7 + 1).isoformat()
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def _mood(value):
+    # 기분 점수가 없거나 숫자가 아니면 NaN
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def _alone(value):
+    # 혼자 1, 함께 0, 알 수 없음 -1
+    return int(value) if isinstance(value, bool) else -1
+
+
+class MoodRollup:
+    """
+    한 사용자의 주별/월별 기분 집계입니다. 식사 기록의 기분과 감정 일기의 기분을 함께 모읍니다.
+    기록은 add()로 증분 반영되며 분석은 기록 수가 아니라 기간 수에 비례하는 배열 연산만 합니다.
+    """
+
+    def __init__(self):
+        self.rows = {period: {} for period in ROLLUP_PERIODS}
+        self.data = {period: np.zeros((0, len(COLUMNS))) for period in ROLLUP_PERIODS}
+        self.version = 0
+        self._insights = {}
+
+    @classmethod
+    def from_records(cls, meals, emotions):
+        rollup = cls()
+        rollup.add("meals", meals)
+        rollup.add("emotions", emotions)
+        return rollup
+
+    def _row(self, period, key):
+        rows = self.rows[period]
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = len(rows)
+            data = self.data[period]
+            if row >= len(data):
+                grown = np.zeros((max(16, len(data) * 2), len(COLUMNS)))
+                grown[:len(data)] = data
+                self.data[period] = grown
+        return row
+
+    def add(self, name, records):
+        """식사(meals) 또는 감정(emotions) 기록을 집계에 더합니다."""
+        keys = [_period_keys(record.get("date")) for record in records]
+        if None in keys:
+            # 날짜가 없거나 형식이 다른 기록은 기간을 알 수 없으므로 제외
+            records = [record for record, key in zip(records, keys) if key is not None]
+            keys = [key for key in keys if key is not None]
+        if not records:
+            return
+
+        # 기록별 값을 배열로 만든 뒤 열마다 (기록별 더할 값)을 모아 기간별로 한 번에 더함
+        moods = np.array([_mood(record.get("mood")) for record in records])
+        has_mood = ~np.isnan(moods)
+        moods[~has_mood] = 0
+        if name == "meals":
+            updates = [("meal_count", np.ones(len(records))), ("meal_mood_count", has_mood), ("meal_mood_sum", moods)]
+            for prefix, field, choices in (("type", "type", MEAL_TYPES), ("location", "location", MEAL_LOCATIONS)):
+                values = np.array([record.get(field) for record in records], dtype=object)
+                for choice in choices:
+                    matched = (values == choice) & has_mood
+                    updates += [(f"{prefix}_count_{choice}", matched), (f"{prefix}_sum_{choice}", moods * matched)]
+            # 혼자/함께 여부가 없는 예전 기록은 혼밥 비율 계산에서 제외
+            alone = np.array([_alone(record.get("alone")) for record in records])
+            solo, together = alone == 1, alone == 0
+            updates += [
+                ("solo_known", alone >= 0),
+                ("solo_count", solo),
+                ("solo_mood_count", solo & has_mood),
+                ("solo_mood_sum", moods * solo),
+                ("together_mood_count", together & has_mood),
+                ("together_mood_sum", moods * together),
+            ]
+        else:
+            updates = [("emotion_mood_count", has_mood), ("emotion_mood_sum", moods)]
+
+        for i, period in enumerate(ROLLUP_PERIODS):
+            rows = np.array([self._row(period, key[i]) for key in keys])
+            data = self.data[period]
+            for column, weights in updates:
+                data[:, COLUMN[column]] += np.bincount(rows, weights=weights, minlength=len(data))
+        self.version += 1
+
+    def insights(self, period="week"):
+        """기간별 기분 추이, 추세, 상관관계, 유형/장소/혼밥별 평균 기분을 반환합니다. 결과는 다음 add() 전까지 재사용합니다."""
+        entry = self._insights.get(period)
+        if entry is None or entry[0] != self.version:
+            entry = self._insights[period] = (self.version, analyze_rollup(self, period))
+        return entry[1]
+
+
+def _ratio(numerator, denominator):
+    out = np.full(np.shape(numerator), np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def _slope(x, y):
+    # 값이 있는 기간만으로 최소제곱 직선의 기울기 (기간 하나당 변화량)
+    valid = ~np.isnan(y)
+    if valid.sum() < 2 or np.ptp(x[valid]) == 0:
+        return None
+    return float(np.polyfit(x[valid], y[valid], 1)[0])
+
+
+def _correlation(x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if valid.sum() < MIN_CORRELATION_PERIODS:
+        return None
+    x, y = x[valid], y[valid]
+    if x.std() == 0 or y.std() == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def analyze_rollup(rollup, period="week"):
+    """
+    MoodRollup의 한 기간 단위(week/month)를 분석합니다. 기록이 없으면 None을 반환합니다.
+    모든 계산은 (기간 수 x 집계 열) 배열에 대한 벡터 연산입니다.
+    """
+    rows = rollup.rows[period]
+    if not rows:
+        return None
+    keys = np.fromiter(rows.keys(), dtype=np.int64, count=len(rows))
+    order = np.argsort(keys)
+    keys = keys[order]
+    data = rollup.data[period][np.fromiter(rows.values(), dtype=np.int64, count=len(rows))[order]]
+    col = lambda name: data[:, COLUMN[name]]
+
+    meal_mood = _ratio(col("meal_mood_sum"), col("meal_mood_count"))
+    diary_mood = _ratio(col("emotion_mood_sum"), col("emotion_mood_count"))
+    mood = _ratio(col("meal_mood_sum") + col("emotion_mood_sum"), col("meal_mood_count") + col("emotion_mood_count"))
+    solo_ratio = _ratio(col("solo_count"), col("solo_known"))
+
+    recent = slice(-TREND_PERIODS[period], None)
+    totals = data.sum(axis=0)
+    total = lambda name: totals[COLUMN[name]]
+    mean = lambda prefix, value: (
+        float(total(f"{prefix}_sum_{value}") / total(f"{prefix}_count_{value}"))
+        if total(f"{prefix}_count_{value}") else None
+    )
+    overall = lambda prefix: (
+        float(total(f"{prefix}_mood_sum") / total(f"{prefix}_mood_count")) if total(f"{prefix}_mood_count") else None
+    )
+    recent_solo = data[recent, COLUMN["solo_known"]].sum()
+    mood_count = total("meal_mood_count") + total("emotion_mood_count")
+
+    chart = slice(-CHART_PERIODS[period], None)
+    return {
+        "period": period,
+        "periods": len(keys),
+        "series": {
+            "labels": [period_label(period, key) for key in keys[chart].tolist()],
+            "mood": mood[chart],
+            "meal_mood": meal_mood[chart],
+            "diary_mood": diary_mood[chart],
+            "solo_ratio": solo_ratio[chart],
+        },
+        "mood": float((total("meal_mood_sum") + total("emotion_mood_sum")) / mood_count) if mood_count else None,
+        "trend": _slope(keys[recent].astype(np.float64), mood[recent]),
+        "recent_solo_ratio": float(data[recent, COLUMN["solo_count"]].sum() / recent_solo) if recent_solo else None,
+        "solo_mood": overall("solo"),
+        "together_mood": overall("together"),
+        "by_type": {t: mean("type", t) for t in MEAL_TYPES},
+        "by_location": {loc: mean("location", loc) for loc in MEAL_LOCATIONS},
+        "correlations": {
+            # 혼밥 비율이 높은 기간에 기분이 어떤지, 식사 중 기분과 일기 기분이 같이 움직이는지
+            "solo_ratio_mood": _correlation(solo_ratio, mood),
+            "solo_ratio_diary_mood": _correlation(solo_ratio, diary_mood),
+            "meal_mood_diary_mood": _correlation(meal_mood, diary_mood),
+            "meal_count_diary_mood": _correlation(col("meal_count"), diary_mood),
+        },
+    }
@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 식사 기록 화면의 선택지와 같은 순서로 범주형 컬럼을 만듦
+from storage import MEAL_LOCATIONS, MEAL_TYPES
+
+# 탄수화물/단백질 1g = 4kcal, 지방 1g = 9kcal
+MACRO_KCAL_PER_GRAM = {"protein": 4, "carbs": 4, "fat": 9}
+
+# 분석 결과를 보관할 사용자 수
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "64"))
+
+# 주간 추세를 볼 때 이동 평균 기간(일)
+ROLLING_DAYS = 7
+
+# 식사 기록이 이보다 많은 사용자만 아카이브에서 과거 기록을 읽음
+# (기록이 적으면 파일 여러 개를 여는 것보다 dict 목록을 바로 변환하는 편이 빠름)
+ARCHIVE_MIN_MEALS = int(os.getenv("ARCHIVE_MIN_MEALS", "5000"))
+
+
+def _column(meals, key, dtype, default):
+    return np.fromiter((m.get(key, default) for m in meals), dtype=dtype, count=len(meals))
+
+
+def build_meal_frame(meals):
+    """
+    식사 기록(dict 목록)을 타입이 지정된 컬럼형 DataFrame으로 변환합니다.
+    유형/장소/음식 종류는 범주형, 영양소는 float32(없으면 NaN), 날짜는 datetime64로 저장합니다.
+    """
+    return pd.DataFrame({
+        "date": pd.to_datetime([m["date"] for m in meals], format="%Y-%m-%d"),
+        "type": pd.Categorical([m.get("type") for m in meals], categories=MEAL_TYPES),
+        "location": pd.Categorical([m.get("location") for m in meals], categories=MEAL_LOCATIONS),
+        "food_type": pd.Categorical([m.get("food_type") for m in meals]),
+        "mood": _column(meals, "mood", np.int8, 0),
+        "calories": _column(meals, "calories", np.float32, np.nan),
+        "protein": _column(meals, "protein", np.float32, np.nan),
+        "carbs": _column(meals, "carbs", np.float32, np.nan),
+        "fat": _column(meals, "fat", np.float32, np.nan),
+    })
+
+
+def build_meal_frame_from_table(table):
+    """
+    아카이브(history_archive)에서 읽은 Arrow 테이블을 build_meal_frame과 같은 형식으로 변환합니다.
+    컬럼 단위로 변환하므로 기록을 dict로 만들지 않습니다.
+    """
+    columns = ["date", "type", "location", "food_type", "mood", "calories", "protein", "carbs", "fat"]
+    frame = table.select(columns).to_pandas(date_as_object=False)
+    frame["date"] = frame["date"].astype("datetime64[ns]")
+    frame["type"] = pd.Categorical(frame["type"], categories=MEAL_TYPES)
+    frame["location"] = pd.Categorical(frame["location"], categories=MEAL_LOCATIONS)
+    frame["mood"] = frame["mood"].fillna(0).astype(np.int8)
+    return frame
+
+
+def build_user_meal_frame(meals, start=None, end=None, archive=None, user_id=None):
+    """
+    [start, end] 기간(YYYY-MM-DD 문자열, None이면 제한 없음)의 식사 DataFrame을 만듭니다.
+    아카이브가 있으면 아카이브가 완결된 달까지는 메모리 매핑한 파일에서 읽고,
+    그 이후 기록과 내보낸 뒤 추가/수정된 기록(지난 날짜로 남긴 식사, 사진 분석 결과 등)만
+    저장소의 기록(meals)에서 변환합니다.
+    """
+    if len(meals) < ARCHIVE_MIN_MEALS or (archive is not None and archive.max_ids is None):
+        archive = None
+    meals = [m for m in meals if (start is None or m["date"] >= start) and (end is None or m["date"] <= end)]
+    if archive is None:
+        return build_meal_frame(meals)
+    watermark = archive.max_ids.get("meals", 0)
+    recent = [
+        m for m in meals
+        if m["date"] >= archive.complete_before
+        or m.get("id", 0) > watermark
+        or m.get("updated_at", "") > archive.exported_at
+    ]
+    replaced = [m["id"] for m in recent if m["date"] < archive.complete_before and m.get("id", 0) <= watermark]
+    frame = build_meal_frame_from_table(archive.read_user("meals", user_id, start, end, recent, replaced))
+    # 아카이브는 달 단위로 읽으므로 기간 양 끝의 달에서 범위 밖 기록을 제외
+    if start is not None:
+        frame = frame[frame["date"] >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame["date"] <= pd.Timestamp(end)]
+    return frame.reset_index(drop=True)
+
+
+def analyze_meal_frame(frame):
+    """
+    사용자의 식사 DataFrame에서 영양/식사 패턴 통계를 계산합니다.
+    모든 계산은 pandas/NumPy 벡터 연산으로 처리됩니다.
+    """
+    macros = list(MACRO_KCAL_PER_GRAM)
+    macro_grams = frame[macros].sum()
+    macro_kcal = macro_grams * pd.Series(MACRO_KCAL_PER_GRAM)
+    total_kcal = macro_kcal.sum()
+    macro_ratio = macro_kcal / total_kcal * 100 if total_kcal > 0 else None
+
+    # 기록이 없는 날도 0으로 채워야 주간/이동 평균이 올바르게 계산됨
+    daily = frame.groupby("date").agg(count=("type", "size"), calories=("calories", "sum"))
+    daily = daily.asfreq("D", fill_value=0)
+    weekly = daily.resample("W-MON", label="left", closed="left").sum()
+    rolling = daily.rolling(ROLLING_DAYS, min_periods=1).mean()
+
+    return {
+        "meal_count": len(frame),
+        "analyzed_count": int(frame["calories"].notna().sum()),
+        "macro_grams": macro_grams,
+        "macro_ratio": macro_ratio,
+        "daily": daily,
+        "weekly": weekly,
+        "rolling": rolling,
+        "by_type": frame["type"].value_counts(sort=False),
+        "by_location": frame["location"].value_counts(sort=False),
+        "by_food": frame["food_type"].value_counts(),
+    }
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_user_nutrition_report(store, user_id, start=None, end=None, archive=None):
+    """
+    사용자의 [start, end] 기간 식사 기록 분석 결과를 반환합니다. 기록이 없으면 None을 반환합니다.
+    저장소는 사용자가 새 기록을 남길 때까지 같은 목록 객체를 돌려주므로,
+    목록과 아카이브가 그대로이면 이전 분석 결과를 재사용합니다.
+    """
+    meals = store.find("meals", user_id)
+    key = (user_id, start, end)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] is meals and entry[1] is archive:
+            _cache.move_to_end(key)
+            return entry[2]
+    frame = build_user_meal_frame(meals, start, end, archive, user_id)
+    report = analyze_meal_frame(frame) if len(frame) else None
+    with _cache_lock:
+        _cache[key] = (meals, archive, report)
+        _cache.move_to_end(key)
+        while len(_cache) > ANALYTICS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return report
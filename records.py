@@ -0,0 +1,456 @@
+import json
+import os
+import warnings
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import metrics
+from storage import MEAL_LOCATIONS, MEAL_TYPES
+
+# 필드 종류별 저장 방식 (없는 값은 MISSING 값으로 표시)
+# - int64/int8: 정수
+# - date: 1970-01-01부터의 일 수 (int32)
+# - time: "HH:MM"을 자정부터의 분으로 (int16)
+# - category: 값 목록(Vocabulary)의 코드 (int16), 같은 값은 문자열 객체 하나를 공유
+# - bool: 0/1 (int8)
+# - float32: 영양 정보 (없으면 NaN)
+# - timestamp: ISO 시각을 1970-01-01부터의 마이크로초로 (int64)
+# - text: 자유 입력 문자열 (파이썬 list)
+SCHEMAS = {
+    "meals": (
+        ("id", "int64"),
+        ("user_id", "int64"),
+        ("type", "category"),
+        ("time", "time"),
+        ("date", "date"),
+        ("location", "category"),
+        ("alone", "bool"),
+        ("mood", "int8"),
+        ("content", "text"),
+        ("has_photo", "bool"),
+        ("created_at", "timestamp"),
+        ("food_type", "category"),
+        ("calories", "float32"),
+        ("protein", "float32"),
+        ("carbs", "float32"),
+        ("fat", "float32"),
+        ("photo_hash", "text"),
+        ("photo_path", "text"),
+        ("display_path", "text"),
+        ("thumb_path", "text"),
+    ),
+    "emotions": (
+        ("id", "int64"),
+        ("user_id", "int64"),
+        ("date", "date"),
+        ("mood", "int8"),
+        ("diary", "text"),
+        ("created_at", "timestamp"),
+    ),
+}
+
+# 코드가 실행마다 달라지지 않도록 선택지가 정해진 범주는 미리 등록
+CATEGORY_VALUES = {"type": MEAL_TYPES, "location": MEAL_LOCATIONS}
+
+DTYPES = {
+    "int64": np.int64,
+    "int8": np.int8,
+    "date": np.int32,
+    "time": np.int16,
+    "category": np.int16,
+    "bool": np.int8,
+    "float32": np.float32,
+    "timestamp": np.int64,
+}
+MISSING = {
+    "int64": np.iinfo(np.int64).min,
+    "int8": np.iinfo(np.int8).min,
+    "date": np.iinfo(np.int32).min,
+    "time": -1,
+    "category": -1,
+    "bool": -1,
+    "float32": np.nan,
+    "timestamp": np.iinfo(np.int64).min,
+}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_date(value):
+    day = date.fromisoformat(value)
+    # "2024-1-5"처럼 다시 만들었을 때 원래 문자열과 다른 값은 그대로 보관
+    return day.toordinal() - EPOCH_ORDINAL if day.isoformat() == value else None
+
+
+def _encode_time(value):
+    hours, minutes = value.split(":")
+    encoded = int(hours) * 60 + int(minutes)
+    return encoded if f"{encoded // 60:02d}:{encoded % 60:02d}" == value else None
+
+
+def _encode_timestamp(value):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return None
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _decode_date(day):
+    return date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+def _decode_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _decode_timestamp(micros):
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+# numpy datetime64로 한 번에 변환할 수 있는 종류와 단위
+DATETIME_UNITS = {"date": "D", "timestamp": "us"}
+
+ENCODERS = {"date": _encode_date, "time": _encode_time, "timestamp": _encode_timestamp}
+DECODERS = {"date": _decode_date, "time": _decode_time, "timestamp": _decode_timestamp}
+
+
+class Vocabulary:
+    """범주형 값 <-> 코드. 처음 보는 값은 뒤에 추가됩니다."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class RecordColumns:
+    """
+    식사/감정 기록을 필드별 배열(struct-of-arrays)로 보관합니다.
+    기록마다 dict와 문자열을 만드는 대신 숫자 배열과 공유 문자열 목록만 사용하므로
+    같은 기록을 dict 목록으로 들고 있을 때보다 메모리를 훨씬 적게 씁니다.
+    스키마에 없는 필드나 원래 모양으로 되돌릴 수 없는 값은 extras에 그대로 보관해
+    to_records()가 원래 JSON 기록과 같은 값을 돌려줍니다.
+    """
+
+    def __init__(self, name, capacity=0):
+        self.name = name
+        self.schema = SCHEMAS[name]
+        self.size = 0
+        self.arrays = {
+            field: np.full(capacity, MISSING[kind], dtype=DTYPES[kind])
+            for field, kind in self.schema if kind != "text"
+        }
+        self.texts = {field: [] for field, kind in self.schema if kind == "text"}
+        self.vocabularies = {
+            field: Vocabulary(CATEGORY_VALUES.get(field, ())) for field, kind in self.schema if kind == "category"
+        }
+        self.extras = {}
+
+    @classmethod
+    def from_records(cls, name, records):
+        columns = cls(name, len(records))
+        columns.extend(records)
+        return columns
+
+    def __len__(self):
+        return self.size
+
+    def column(self, field):
+        """필드 배열 (text 필드는 list). 반환값은 내부 저장소를 그대로 참조하므로 읽기 전용입니다."""
+        if field in self.texts:
+            return self.texts[field]
+        return self.arrays[field][:self.size]
+
+    def _reserve(self, count):
+        capacity = len(next(iter(self.arrays.values())))
+        if self.size + count <= capacity:
+            return
+        # 기록이 하나씩 추가될 때마다 배열을 다시 만들지 않도록 두 배씩 늘림
+        capacity = max(self.size + count, capacity * 2, 1024)
+        for field, kind in self.schema:
+            if kind == "text":
+                continue
+            grown = np.full(capacity, MISSING[kind], dtype=DTYPES[kind])
+            grown[:self.size] = self.arrays[field][:self.size]
+            self.arrays[field] = grown
+
+    def extend(self, records):
+        """JSON 형식 기록(dict 목록)을 뒤에 추가합니다."""
+        count = len(records)
+        if not count:
+            return
+        self._reserve(count)
+        start = self.size
+        for field, kind in self.schema:
+            values = [record.get(field) for record in records]
+            # 대부분은 타입이 모두 같으므로 값 종류를 한 번에 확인해 빠른 경로를 탐
+            types = set(map(type, values))
+            if kind == "text":
+                if not types <= {str, type(None)}:
+                    for i, value in enumerate(values):
+                        if value is not None and not isinstance(value, str):
+                            self._keep(start + i, field, value)
+                            values[i] = None
+                self.texts[field].extend(values)
+                continue
+            target = self.arrays[field]
+            if kind == "float32":
+                if types <= {int, float, type(None)}:
+                    encoded = np.array(values, dtype=np.float64)
+                else:
+                    encoded = np.array(
+                        [v if isinstance(v, (int, float)) and not isinstance(v, bool) else None for v in values],
+                        dtype=np.float64,
+                    )
+                    for i, value in enumerate(values):
+                        if value is not None and np.isnan(encoded[i]):
+                            self._keep(start + i, field, value)
+                with np.errstate(over="ignore"):
+                    # float32 범위를 넘는 값은 inf가 되어 아래에서 원래 값을 보관함
+                    narrowed = encoded.astype(np.float32)
+                # float32로 줄였을 때 값이 바뀌는 경우만 원래 값을 보관
+                for i in np.flatnonzero(narrowed.astype(np.float64) != encoded).tolist():
+                    if not np.isnan(encoded[i]):
+                        self._keep(start + i, field, values[i])
+                        narrowed[i] = np.nan
+                target[start:start + count] = narrowed
+                continue
+            encoded = self._encode(field, kind, values, start)
+            target[start:start + count] = np.array(encoded, dtype=DTYPES[kind])
+        known = {field for field, _ in self.schema}
+        for i, record in enumerate(records):
+            if not known.issuperset(record):
+                for key, value in record.items():
+                    if key not in known:
+                        self._keep(start + i, key, value)
+            if None in record.values():
+                # 키는 있고 값이 null인 경우는 키가 없는 경우와 구분해 보관
+                for key, value in record.items():
+                    if value is None:
+                        self._keep(start + i, key, None)
+        self.size += count
+
+    def _encode(self, field, kind, values, start):
+        missing = MISSING[kind]
+        if kind in ("int64", "int8", "bool"):
+            # 정수/불리언은 대부분 타입이 맞으므로 한 번에 변환하고, 아닌 값만 따로 확인
+            expected = bool if kind == "bool" else int
+            if set(map(type, values)) == {expected}:
+                encoded = np.array(values, dtype=np.int64)
+                limits = np.iinfo(DTYPES[kind])
+                if kind == "bool" or ((encoded > limits.min) & (encoded <= limits.max)).all():
+                    return encoded
+            limits = np.iinfo(DTYPES[kind])
+            encoded = []
+            for i, value in enumerate(values):
+                if value is None:
+                    encoded.append(missing)
+                elif type(value) is expected and (kind == "bool" or limits.min < value <= limits.max):
+                    encoded.append(int(value))
+                else:
+                    self._keep(start + i, field, value)
+                    encoded.append(missing)
+            return encoded
+        if kind in DATETIME_UNITS and set(map(type, values)) == {str}:
+            encoded = self._encode_datetimes(field, kind, values, start)
+            if encoded is not None:
+                return encoded
+        encode = self.vocabularies[field].code if kind == "category" else ENCODERS[kind]
+        # 날짜/시각/범주는 반복되는 값이 많아 한 번 변환한 값을 재사용 (캐시에는 문자열만 들어감)
+        cache = {}
+        encoded = []
+        append = encoded.append
+        for i, value in enumerate(values):
+            if value is None:
+                append(missing)
+                continue
+            code = cache.get(value) if type(value) is str else None
+            if code is None:
+                try:
+                    code = encode(value) if type(value) is str else None
+                except (TypeError, ValueError):
+                    code = None
+                if code is None:
+                    self._keep(start + i, field, value)
+                    append(missing)
+                    continue
+                cache[value] = code
+            append(code)
+        return encoded
+
+    def _encode_datetimes(self, field, kind, values, start):
+        # numpy로 한 번에 변환한 뒤 문자열로 되돌렸을 때 원래 값과 다른 것만 하나씩 다시 변환
+        # (예: 마이크로초가 0이라 ".000000"이 빠진 시각, 시간대가 붙은 시각)
+        unit = DATETIME_UNITS[kind]
+        try:
+            with warnings.catch_warnings():
+                # 시간대가 붙은 문자열은 아래에서 다시 확인하므로 경고를 띄우지 않음
+                warnings.simplefilter("ignore", DeprecationWarning)
+                parsed = np.array(values, dtype=f"datetime64[{unit}]")
+        except ValueError:
+            return None
+        encoded = parsed.astype(np.int64)
+        mismatched = np.flatnonzero(np.datetime_as_string(parsed, unit=unit) != np.array(values))
+        for i in mismatched.tolist():
+            try:
+                code = ENCODERS[kind](values[i])
+            except (TypeError, ValueError):
+                code = None
+            if code is None:
+                self._keep(start + i, field, values[i])
+                code = MISSING[kind]
+            encoded[i] = code
+        return encoded
+
+    def _keep(self, row, field, value):
+        self.extras.setdefault(row, {})[field] = value
+
+    def rows_for(self, user_id, date=None):
+        """user_id(와 날짜)에 해당하는 행 번호 배열"""
+        mask = self.column("user_id") == user_id
+        if date is not None:
+            try:
+                day = _encode_date(date)
+            except (TypeError, ValueError):
+                day = None
+            if day is None:
+                # 배열로 표현하지 못한 날짜는 extras에만 있음
+                rows = np.flatnonzero(mask).tolist()
+                return np.array([r for r in rows if self.extras.get(r, {}).get("date") == date], dtype=np.int64)
+            mask &= self.column("date") == day
+        return np.flatnonzero(mask)
+
+    def to_records(self, rows=None):
+        """
+        JSON 형식 기록(dict 목록)으로 되돌립니다. rows를 주면 해당 행만 변환합니다.
+        값이 없는 필드는 원래 기록처럼 키 자체를 생략합니다.
+        """
+        if rows is None:
+            rows = np.arange(self.size)
+        rows = np.asarray(rows, dtype=np.int64)
+        names, columns = [], []
+        for field, kind in self.schema:
+            names.append(field)
+            if kind == "text":
+                texts = self.texts[field]
+                columns.append([texts[row] for row in rows.tolist()])
+                continue
+            values = self.arrays[field][rows]
+            if kind == "float32":
+                decoded = values.astype(np.float64).tolist()
+                columns.append([
+                    None if value != value else int(value) if value.is_integer() else value for value in decoded
+                ])
+                continue
+            # 고유한 값만 한 번씩 변환 (같은 날짜/범주 문자열 객체를 여러 기록이 공유)
+            unique, inverse = np.unique(values, return_inverse=True)
+            table = [self._decode(field, kind, value) for value in unique.tolist()]
+            columns.append([table[i] for i in inverse.tolist()])
+
+        records = []
+        extras = self.extras
+        for row, values in zip(rows.tolist(), zip(*columns)):
+            record = {name: value for name, value in zip(names, values) if value is not None}
+            extra = extras.get(row)
+            if extra:
+                record.update(extra)
+            records.append(record)
+        return records
+
+    def _decode(self, field, kind, value):
+        if value == MISSING[kind]:
+            return None
+        if kind == "category":
+            return self.vocabularies[field].values[value]
+        if kind == "bool":
+            return bool(value)
+        if kind in DECODERS:
+            return DECODERS[kind](value)
+        return value
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def group_by_user_date(self):
+        """
+        (user_id, 날짜)별 (기록 수, 기분 합계)를 배열 연산으로 계산합니다.
+        사용자/날짜를 배열로 표현하지 못한 기록과, 감정 기록 중 기분 값이 extras에 있는 기록(범위 밖 정수, 실수 등)은
+        extras의 원래 값으로 따로 셉니다.
+        """
+        user_ids, days = self.column("user_id"), self.column("date")
+        moods = self.column("mood") if "mood" in self.arrays else np.zeros(self.size, dtype=np.int8)
+        moods = np.where(moods == MISSING["int8"], 0, moods).astype(np.int64)
+        valid = (days != MISSING["date"]) & (user_ids != MISSING["int64"])
+        if self.name == "emotions":
+            valid[[row for row, extra in self.extras.items() if "mood" in extra]] = False
+        pairs = np.rec.fromarrays([user_ids[valid], days[valid]], names="user_id,day")
+        unique, inverse = np.unique(pairs, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique)).tolist()
+        mood_sums = np.bincount(inverse, weights=moods[valid], minlength=len(unique)).astype(np.int64).tolist()
+        day_strings = {}
+        groups = {}
+        for (user_id, day), count, mood_sum in zip(unique.tolist(), counts, mood_sums):
+            if day not in day_strings:
+                day_strings[day] = _decode_date(day)
+            groups[(user_id, day_strings[day])] = (count, mood_sum)
+        for record in self.to_records(np.flatnonzero(~valid)):
+            key = (record.get("user_id"), record.get("date"))
+            count, mood_sum = groups.get(key, (0, 0))
+            mood = record.get("mood") if self.name == "emotions" else None
+            groups[key] = (count + 1, mood_sum + (mood if isinstance(mood, (int, float)) else 0))
+        return groups
+
+    def nbytes(self):
+        """배열과 문자열 목록이 차지하는 대략적인 바이트 수"""
+        total = sum(array.nbytes for array in self.arrays.values())
+        for texts in self.texts.values():
+            total += 8 * len(texts) + sum(len(text) for text in texts if text)
+        return total
+
+    def save(self, path, token=None):
+        """
+        바이너리 스냅샷(.npz)으로 저장합니다. token은 원본 파일의 변경 여부 확인용 값입니다.
+        임시 파일에 먼저 쓰고 rename 하므로 읽는 쪽은 항상 완성된 파일만 봅니다.
+        """
+        path = str(path)
+        tmp_path = path + ".tmp.npz"
+        meta = {
+            "name": self.name,
+            "size": self.size,
+            "token": token,
+            "vocabularies": {field: vocabulary.values for field, vocabulary in self.vocabularies.items()},
+            "texts": self.texts,
+            "extras": {str(row): extra for row, extra in self.extras.items()},
+        }
+        arrays = {f"col_{field}": array[:self.size] for field, array in self.arrays.items()}
+        np.savez(tmp_path, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+        metrics.add("storage_bytes_written", os.path.getsize(tmp_path))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, token=None):
+        """save()로 저장한 스냅샷을 읽습니다. token이 저장된 값과 다르면 None을 반환합니다."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].item())
+            if token is not None and meta["token"] != json.loads(json.dumps(token)):
+                return None
+            columns = cls(meta["name"])
+            columns.size = meta["size"]
+            columns.arrays = {field: data[f"col_{field}"] for field in columns.arrays}
+        metrics.add("storage_bytes_read", os.path.getsize(path))
+        columns.texts = meta["texts"]
+        for field, values in meta["vocabularies"].items():
+            columns.vocabularies[field] = Vocabulary(values)
+        columns.extras = {int(row): extra for row, extra in meta["extras"].items()}
+        return columns
@@ -0,0 +1,1399 @@
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # Windows에서는 msvcrt로 파일 잠금
+    fcntl = None
+    import msvcrt
+
+# 저널에 쌓인 레코드 수가 이 값 이상이고 저널 크기가 스냅샷 크기의 COMPACT_RATIO배 이상이면 백그라운드에서 스냅샷으로 압축
+# 압축 한 번에 스냅샷 전체를 다시 쓰므로 스냅샷에 비례해 간격을 늘려야 기록 하나당 압축 비용이 일정하게 유지됨
+COMPACT_THRESHOLD = int(os.getenv("JOURNAL_COMPACT_THRESHOLD", "500"))
+COMPACT_RATIO = float(os.getenv("JOURNAL_COMPACT_RATIO", "0.25"))
+
+# 사용자별 조회 결과를 최대 몇 개까지 메모리에 보관할지
+CACHE_MAX_SLICES = int(os.getenv("CACHE_MAX_SLICES", "256"))
+
+# 다른 프로세스의 변경을 확인하기 위해 파일 mtime을 다시 확인하는 최소 간격(초)
+CACHE_STAT_INTERVAL = float(os.getenv("CACHE_STAT_INTERVAL", "1.0"))
+
+# 식사 기록의 유형/장소 선택지 (기록 화면과 분석에서 같은 순서로 사용)
+MEAL_TYPES = ["아침", "점심", "저녁", "간식"]
+MEAL_LOCATIONS = ["집", "외식", "배달"]
+
+# 커뮤니티 게시판 한 페이지의 게시글 수
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "20"))
+FEED_ORDERS = ("recent", "popular")
+
+# 이 프로세스의 쓰기로 바뀐 파일 토큰을 컬렉션마다 몇 개까지 기억할지
+OWN_TOKEN_HISTORY = 64
+
+# 컬럼형(records.RecordColumns)으로도 읽을 수 있는 컬렉션
+COLUMNAR_NAMES = ("meals", "emotions")
+
+
+def _write_json_atomic(path, records):
+    # 임시 파일에 먼저 기록한 뒤 rename 하므로 중간에 죽어도 기존 파일은 온전히 남음
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # json.dump()는 파이썬 인코더로 조각마다 write하므로 C 인코더를 쓰는 json.dumps()로 한 번에 씀
+        f.write(json.dumps(records, ensure_ascii=False))
+        f.flush()
+        os.fsync(f.fileno())
+        metrics.add("storage_bytes_written", f.tell())
+    os.replace(tmp_path, path)
+
+
+def _file_token(paths):
+    # 파일 변경 여부 판단용 (mtime, 크기) 묶음
+    token = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            token.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            token.append(None)
+    return tuple(token)
+
+
+def _read_snapshot(path):
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        metrics.add("storage_bytes_read", os.fstat(f.fileno()).st_size)
+        return json.load(f)
+
+
+def _read_journal(path):
+    records = []
+    if not path.exists():
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        metrics.add("storage_bytes_read", os.fstat(f.fileno()).st_size)
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # 기록 도중 중단된 마지막 줄은 무시
+                continue
+    return records
+
+
+def _repair_journal_tail(f):
+    # 기록 도중 중단되어 줄바꿈 없이 끝난 마지막 줄을 잘라냄
+    # (그대로 두면 다음 기록이 그 줄 뒤에 이어 붙어 온전히 저장된 기록까지 읽을 수 없게 됨)
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b"\n":
+        return
+    pos = end
+    while pos > 0:
+        start = max(0, pos - 65536)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b"\n")
+        if newline >= 0:
+            f.truncate(start + newline + 1)
+            return
+        pos = start
+    f.truncate(0)
+
+
+def _count_rows_read(rows):
+    # SQLite는 실제 디스크 읽기량 대신 레코드 JSON 문자열 길이로 집계
+    metrics.add("storage_bytes_read", sum(len(data) for (data,) in rows))
+
+
+class DuplicateKeyError(ValueError):
+    """고유해야 하는 값(아이디 등)이 이미 존재할 때 발생합니다."""
+
+
+class FileLock:
+    """
+    프로세스 간 배타 잠금입니다. (Unix: fcntl.flock, Windows: msvcrt.locking)
+    같은 프로세스 안에서는 스레드 단위로 재진입할 수 있습니다.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            f = open(self.path, "a+b")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError:
+                f.close()
+                self._thread_lock.release()
+                if blocking:
+                    raise
+                return False
+            self._file = f
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _PendingWrite:
+    __slots__ = ("record", "error", "done")
+
+    def __init__(self, record):
+        self.record = record
+        self.error = None
+        self.done = threading.Event()
+
+
+class GroupCommitter:
+    """
+    여러 세션에서 동시에 들어온 쓰기를 모아 한 번에 기록합니다. (그룹 커밋)
+    먼저 도착한 스레드가 대기 중인 쓰기를 모두 모아 write_batch로 넘기고,
+    나머지 스레드는 자기 기록이 저장될 때까지 기다리기만 합니다.
+    """
+
+    def __init__(self, write_batch):
+        self._write_batch = write_batch
+        self._lock = threading.Lock()
+        self._pending = []
+        self._flushing = False
+        self.batches = 0
+        self.records = 0
+
+    def submit(self, record):
+        return self.submit_many([record])[0]
+
+    def submit_many(self, records):
+        requests = [_PendingWrite(record) for record in records]
+        with self._lock:
+            self._pending.extend(requests)
+            leader = not self._flushing
+            self._flushing = True
+        if leader:
+            self._flush()
+        for request in requests:
+            request.done.wait()
+        for request in requests:
+            if request.error is not None:
+                raise request.error
+        return records
+
+    def _flush(self):
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._flushing = False
+                    return
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    if request.error is None:
+                        request.error = e
+            finally:
+                self.batches += 1
+                self.records += len(batch)
+                for request in batch:
+                    request.done.set()
+
+
+STAT_FIELDS = ("meal_count", "emotion_count", "mood_sum", "mood_count")
+
+
+def _stat_delta(name, record):
+    # 기록 한 건이 집계에 더하는 값 (meal_count, emotion_count, mood_sum, mood_count)
+    if name == "meals":
+        return (1, 0, 0, 0)
+    if name == "emotions":
+        # 숫자가 아닌 기분 값은 0으로 셈 (RecordColumns.group_by_user_date와 같은 기준)
+        mood = record.get("mood")
+        return (0, 1, mood if isinstance(mood, (int, float)) else 0, 1)
+    return None
+
+
+class DailyStats:
+    """
+    (사용자, 날짜)별 식사 수, 감정 기록 수, 기분 합계/개수와 사용자별 누적값을 메모리에 유지합니다.
+    기록이 추가될 때마다 증분으로 갱신되므로 조회는 항상 O(1)입니다.
+    """
+
+    def __init__(self):
+        self.days = {}
+        self.totals = {}
+
+    def add(self, name, record):
+        delta = _stat_delta(name, record)
+        if delta is not None:
+            self._accumulate(record.get("user_id"), record.get("date"), delta)
+
+    def add_groups(self, name, groups):
+        # RecordColumns.group_by_user_date() 결과((사용자, 날짜)별 기록 수와 기분 합계)를 한 번에 더함
+        for (user_id, date), (count, mood_sum) in groups.items():
+            delta = (count, 0, 0, 0) if name == "meals" else (0, count, mood_sum, count)
+            self._accumulate(user_id, date, delta)
+
+    def _accumulate(self, user_id, date, delta):
+        for table, key in ((self.days, (user_id, date)), (self.totals, user_id)):
+            current = table.get(key, (0, 0, 0, 0))
+            table[key] = tuple(a + b for a, b in zip(current, delta))
+
+    def day(self, user_id, date):
+        return dict(zip(STAT_FIELDS, self.days.get((user_id, date), (0, 0, 0, 0))))
+
+    def total(self, user_id):
+        return dict(zip(STAT_FIELDS, self.totals.get(user_id, (0, 0, 0, 0))))
+
+
+class FeedIndex:
+    """
+    게시글의 최신순/좋아요순 정렬 목록과 게시글별 좋아요 수를 메모리에 유지합니다.
+    게시글/좋아요가 추가될 때마다 정렬 위치만 옮기므로 전체를 다시 세거나 정렬하지 않고,
+    페이지 조회는 커서 위치를 이진 탐색한 뒤 limit개만 꺼냅니다.
+    - 최신순 커서: 마지막으로 본 게시글 id
+    - 좋아요순 커서: 마지막으로 본 게시글의 (좋아요 수, id)
+    """
+
+    def __init__(self):
+        self.posts = {}
+        self.recent = []
+        self.ranking = []
+        self.likes = Counter()
+        self.liked = set()
+
+    @classmethod
+    def build(cls, posts, likes):
+        # 처음 만들 때는 하나씩 끼워 넣지 않고 모아서 한 번만 정렬
+        index = cls()
+        index.posts = {post["id"]: post for post in posts}
+        index.liked = {(like.get("post_id"), like.get("user_id")) for like in likes}
+        index.liked = {key for key in index.liked if key[0] in index.posts}
+        index.likes = Counter(post_id for post_id, _ in index.liked)
+        index.recent = sorted(index.posts)
+        # 좋아요가 없는 게시글은 최신순 그대로 뒤에 붙이므로 좋아요를 받은 게시글만 정렬
+        liked_ranking = sorted((-count, -post_id) for post_id, count in index.likes.items())
+        index.ranking = liked_ranking + [(0, -post_id) for post_id in reversed(index.recent) if post_id not in index.likes]
+        return index
+
+    def add_post(self, post):
+        post_id = post["id"]
+        if post_id in self.posts:
+            return
+        self.posts[post_id] = post
+        if not self.recent or post_id > self.recent[-1]:
+            self.recent.append(post_id)
+        else:
+            bisect.insort(self.recent, post_id)
+        bisect.insort(self.ranking, (0, -post_id))
+
+    def add_like(self, like):
+        post_id, user_id = like.get("post_id"), like.get("user_id")
+        if post_id not in self.posts or (post_id, user_id) in self.liked:
+            return False
+        self.liked.add((post_id, user_id))
+        old_key = (-self.likes[post_id], -post_id)
+        del self.ranking[bisect.bisect_left(self.ranking, old_key)]
+        self.likes[post_id] += 1
+        bisect.insort(self.ranking, (-self.likes[post_id], -post_id))
+        return True
+
+    def page(self, order, cursor=None, limit=FEED_PAGE_SIZE):
+        # (게시글 목록, 다음 페이지 커서) - 마지막 페이지면 커서는 None
+        if order == "recent":
+            end = len(self.recent) if cursor is None else bisect.bisect_left(self.recent, cursor)
+            ids = self.recent[max(0, end - limit):end][::-1]
+            more = end > limit
+        else:
+            start = 0 if cursor is None else bisect.bisect_right(self.ranking, (-cursor[0], -cursor[1]))
+            ids = [-post_id for _, post_id in self.ranking[start:start + limit]]
+            more = start + limit < len(self.ranking)
+        return [self.posts[post_id] for post_id in ids], _feed_cursor(order, ids, self.likes) if more else None
+
+
+def _feed_cursor(order, ids, likes):
+    if not ids:
+        return None
+    return ids[-1] if order == "recent" else (likes[ids[-1]], ids[-1])
+
+
+class JournalStore:
+    """
+    컬렉션(meals, emotions, users)마다 스냅샷 파일(<name>.json)과 추가 전용 저널(<name>.jsonl)을 둡니다.
+    새 레코드는 저널에 한 줄만 추가하므로 기록 비용이 전체 데이터 크기와 무관하며,
+    저널이 일정 크기를 넘으면 백그라운드 스레드가 스냅샷에 병합(압축)합니다.
+    여러 서버 프로세스가 같은 data 디렉토리를 쓸 수 있도록 파일 변경은 모두 <name>.lock 잠금 안에서 일어나고,
+    id는 <name>.seq 파일의 값을 늘려 발급합니다.
+    """
+
+    # 사용자/날짜 조회를 저장소가 직접 처리하지 못하므로 캐시된 전체 목록에서 거름
+    SUPPORTS_QUERIES = False
+
+    def __init__(self, data_dir, compact_threshold=COMPACT_THRESHOLD, compact_ratio=COMPACT_RATIO):
+        self.data_dir = Path(data_dir)
+        self.compact_threshold = compact_threshold
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._file_locks = {}
+        self._committers = {}
+        self._journal_counts = {}
+        self._compacting = set()
+        self._usernames = None
+        self._users_token = None
+        self._liked = None
+        self._likes_token = None
+        self._own_tokens = {}
+
+    def _paths(self, name):
+        return (
+            self.data_dir / f"{name}.json",
+            self.data_dir / f"{name}.jsonl",
+            self.data_dir / f"{name}.jsonl.compacting",
+        )
+
+    def _columns_path(self, name):
+        return self.data_dir / f"{name}.columns.npz"
+
+    def _file_lock(self, name, kind="lock"):
+        with self._lock:
+            key = (name, kind)
+            if key not in self._file_locks:
+                self._file_locks[key] = FileLock(self.data_dir / f"{name}.{kind}")
+            return self._file_locks[key]
+
+    def mtime_token(self, name):
+        return _file_token(self._paths(name))
+
+    def _record_own_change(self, name, before):
+        # 파일 잠금 안에서 호출: 이 프로세스의 쓰기 전후 토큰을 기억해 두어 캐시가 다른 프로세스의 변경과 구분하게 함
+        with self._lock:
+            chain = self._own_tokens.setdefault(name, OrderedDict())
+            chain[before] = self.mtime_token(name)
+            while len(chain) > OWN_TOKEN_HISTORY:
+                chain.popitem(last=False)
+
+    def own_change(self, name, old, new):
+        """토큰이 old에서 new로 바뀐 것이 모두 이 프로세스의 기록 추가/압축 때문이면 True를 반환합니다."""
+        with self._lock:
+            chain = self._own_tokens.get(name, {})
+            for _ in range(len(chain) + 1):
+                if old == new:
+                    return True
+                old = chain.get(old)
+                if old is None:
+                    return False
+        return False
+
+    def _load_locked(self, name):
+        snapshot_path, journal_path, compacting_path = self._paths(name)
+        records = _read_snapshot(snapshot_path)
+        if compacting_path.exists():
+            # 압축 도중 중단된 경우 스냅샷에 이미 반영된 레코드는 건너뜀
+            seen = {r.get("id") for r in records}
+            records.extend(r for r in _read_journal(compacting_path) if r.get("id") not in seen)
+        journal = _read_journal(journal_path)
+        records.extend(journal)
+        with self._lock:
+            self._journal_counts[name] = len(journal)
+        return records
+
+    def load(self, name):
+        with self._file_lock(name):
+            return self._load_locked(name)
+
+    def load_columns(self, name):
+        """
+        load()와 같은 기록을 컬럼형(RecordColumns)으로 읽습니다.
+        스냅샷을 변환한 결과는 <name>.columns.npz에 저장해 두고, 스냅샷이 바뀌지 않았으면 JSON 대신 이 파일을 읽습니다.
+        """
+        # numpy는 실제로 컬럼형 기록이 필요할 때만 불러옴
+        from records import RecordColumns
+
+        snapshot_path, journal_path, compacting_path = self._paths(name)
+        columns_path = self._columns_path(name)
+        with self._file_lock(name):
+            token = _file_token((snapshot_path,))
+            columns = None
+            if columns_path.exists():
+                try:
+                    columns = RecordColumns.load(columns_path, token)
+                except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+                    columns = None
+            if columns is None:
+                columns = RecordColumns.from_records(name, _read_snapshot(snapshot_path))
+                columns.save(columns_path, token)
+            if compacting_path.exists():
+                seen = set(columns.column("id").tolist())
+                columns.extend([r for r in _read_journal(compacting_path) if r.get("id") not in seen])
+            journal = _read_journal(journal_path)
+            columns.extend(journal)
+        with self._lock:
+            self._journal_counts[name] = len(journal)
+        return columns
+
+    def save(self, name, records):
+        # 전체 목록을 한 번에 교체 (일괄 수정용), 저널은 스냅샷에 포함되므로 비움
+        snapshot_path, journal_path, compacting_path = self._paths(name)
+        with self._file_lock(name):
+            _write_json_atomic(snapshot_path, records)
+            for path in (journal_path, compacting_path):
+                if path.exists():
+                    path.unlink()
+            # 목록이 줄어들더라도 이미 발급한 id는 다시 쓰지 않음
+            last_id = max((r.get("id", 0) for r in records), default=0)
+            self._write_sequence(name, max(self._read_sequence(name), last_id))
+            with self._lock:
+                self._journal_counts[name] = 0
+            if name == "users":
+                self._usernames = None
+            elif name == "likes":
+                self._liked = None
+
+    def update_many(self, name, changes):
+        # {id: {필드: 값}} 형태의 변경을 스냅샷 한 번 교체로 반영
+        with self._file_lock(name):
+            records = [
+                dict(r, **changes[r.get("id")]) if r.get("id") in changes else r
+                for r in self._load_locked(name)
+            ]
+            self.save(name, records)
+
+    def _read_sequence(self, name):
+        try:
+            return int((self.data_dir / f"{name}.seq").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            # 시퀀스 파일이 없으면 기존 기록의 최대 id부터 시작
+            return max((r.get("id", 0) for r in self._load_locked(name)), default=0)
+
+    def _write_sequence(self, name, value):
+        path = self.data_dir / f"{name}.seq"
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _allocate_ids(self, name, count):
+        # 파일 잠금 안에서만 호출 - 프로세스가 여러 개여도 id가 겹치거나 줄어들지 않음
+        last_id = self._read_sequence(name)
+        self._write_sequence(name, last_id + count)
+        return range(last_id + 1, last_id + count + 1)
+
+    def next_id(self, name):
+        with self._file_lock(name):
+            return self._allocate_ids(name, 1)[0]
+
+    def _committer(self, name):
+        with self._lock:
+            if name not in self._committers:
+                self._committers[name] = GroupCommitter(lambda batch: self._write_batch(name, batch))
+            return self._committers[name]
+
+    def append(self, name, record):
+        return self._committer(name).submit(record)
+
+    def append_many(self, name, records):
+        return self._committer(name).submit_many(records)
+
+    def _reject_duplicate_usernames(self, batch):
+        # 다른 프로세스가 가입시킨 사용자가 있을 때만 아이디 목록을 다시 읽음
+        token = self.mtime_token("users")
+        if self._usernames is None or token != self._users_token:
+            self._usernames = {u.get("username") for u in self._load_locked("users")}
+        for request in batch:
+            username = request.record.get("username")
+            if username in self._usernames:
+                request.error = DuplicateKeyError(username)
+            else:
+                self._usernames.add(username)
+
+    def _reject_duplicate_likes(self, batch):
+        # 같은 사용자가 같은 게시글에 누른 좋아요는 한 번만 기록
+        token = self.mtime_token("likes")
+        if self._liked is None or token != self._likes_token:
+            self._liked = {(r.get("post_id"), r.get("user_id")) for r in self._load_locked("likes")}
+        for request in batch:
+            key = (request.record.get("post_id"), request.record.get("user_id"))
+            if key in self._liked:
+                request.error = DuplicateKeyError(key)
+            else:
+                self._liked.add(key)
+
+    def _write_batch(self, name, batch):
+        snapshot_path, journal_path, _ = self._paths(name)
+        with self._file_lock(name):
+            if name == "users":
+                self._reject_duplicate_usernames(batch)
+            elif name == "likes":
+                self._reject_duplicate_likes(batch)
+            records = [request.record for request in batch if request.error is None]
+            if not records:
+                return
+            missing = [record for record in records if "id" not in record]
+            for record, record_id in zip(missing, self._allocate_ids(name, len(missing)) if missing else ()):
+                record["id"] = record_id
+            # 모아둔 기록을 한 번의 write + fsync로 저장
+            before = self.mtime_token(name)
+            try:
+                data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+                with open(journal_path, "a+b") as f:
+                    _repair_journal_tail(f)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    journal_size = f.tell()
+                metrics.add("storage_bytes_written", len(data))
+                self._record_own_change(name, before)
+            except OSError:
+                if name == "users":
+                    self._usernames = None
+                elif name == "likes":
+                    self._liked = None
+                raise
+            if name == "users":
+                self._users_token = self.mtime_token("users")
+            elif name == "likes":
+                self._likes_token = self.mtime_token("likes")
+            try:
+                snapshot_size = snapshot_path.stat().st_size
+            except FileNotFoundError:
+                snapshot_size = 0
+        with self._lock:
+            count = self._journal_counts.get(name, 0) + len(records)
+            self._journal_counts[name] = count
+            due = count >= self.compact_threshold and journal_size >= snapshot_size * self.compact_ratio
+            if due and name not in self._compacting:
+                self._compacting.add(name)
+                threading.Thread(target=self._compact_in_background, args=(name,), daemon=True).start()
+
+    def find(self, name, user_id, date=None):
+        return [
+            r for r in self.load(name)
+            if r.get("user_id") == user_id and (date is None or r.get("date") == date)
+        ]
+
+    def daily_counts(self, name, user_id):
+        counts = Counter(r.get("date") for r in self.load(name) if r.get("user_id") == user_id)
+        return sorted(counts.items())
+
+    def _compact_in_background(self, name):
+        try:
+            self.compact(name)
+        finally:
+            with self._lock:
+                self._compacting.discard(name)
+
+    def compact(self, name):
+        snapshot_path, journal_path, compacting_path = self._paths(name)
+        compact_lock = self._file_lock(name, "compact.lock")
+        # 다른 스레드나 프로세스가 이미 압축 중이면 이번에는 건너뜀
+        if not compact_lock.acquire(blocking=False):
+            return
+        try:
+            with self._file_lock(name):
+                if not compacting_path.exists():
+                    if not journal_path.exists():
+                        return
+                    # 저널을 옮겨두면 이후 기록은 새 저널로 들어가므로 병합 중에도 쓰기가 막히지 않음
+                    before = self.mtime_token(name)
+                    os.replace(journal_path, compacting_path)
+                    self._record_own_change(name, before)
+                    with self._lock:
+                        self._journal_counts[name] = 0
+                token = _file_token((snapshot_path, compacting_path))
+
+            records = _read_snapshot(snapshot_path)
+            seen = {r.get("id") for r in records}
+            added = [r for r in _read_journal(compacting_path) if r.get("id") not in seen]
+            records.extend(added)
+            columns = None
+            columns_path = self._columns_path(name)
+            if name in COLUMNAR_NAMES and columns_path.exists():
+                from records import RecordColumns
+
+                # 다음 load_columns()가 새 스냅샷을 다시 변환하지 않도록 기존 컬럼형 스냅샷에 병합한 기록만 더해 둠
+                # (기존 파일이 이전 스냅샷의 것이 아니면 전체를 다시 변환하지 않고 load_columns()에 맡김)
+                try:
+                    columns = RecordColumns.load(columns_path, token[:1])  # 병합 전 스냅샷의 토큰
+                except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+                    columns = None
+                if columns is not None:
+                    columns.extend(added)
+            tmp_path = snapshot_path.with_name(snapshot_path.name + ".compact.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(records, ensure_ascii=False))
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._file_lock(name):
+                if _file_token((snapshot_path, compacting_path)) != token:
+                    # 병합 중에 save()로 전체 교체가 일어났다면 이번 결과는 버림
+                    tmp_path.unlink()
+                    return
+                before = self.mtime_token(name)
+                os.replace(tmp_path, snapshot_path)
+                compacting_path.unlink()
+                # 압축은 내용을 바꾸지 않으므로 캐시가 다시 읽지 않아도 됨
+                self._record_own_change(name, before)
+                if columns is not None:
+                    columns.save(columns_path, _file_token((snapshot_path,)))
+        finally:
+            compact_lock.release()
+
+
+class SqliteStore:
+    """
+    JournalStore와 같은 인터페이스를 제공하는 SQLite 저장소입니다.
+    레코드 전체는 JSON 문자열로 보관하고, 조회에 쓰이는 컬럼만 따로 빼서 인덱스를 겁니다.
+    """
+
+    SUPPORTS_QUERIES = True
+
+    # 컬렉션별 인덱스 컬럼
+    COLUMNS = {
+        "meals": ("user_id", "date"),
+        "emotions": ("user_id", "date"),
+        "users": ("username",),
+        "posts": ("user_id",),
+        "likes": ("post_id", "user_id"),
+    }
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._committers = {}
+        # Streamlit 세션은 서로 다른 스레드에서 실행되므로 연결 하나를 잠금으로 보호
+        # 다른 프로세스가 쓰는 중이면 잠금이 풀릴 때까지 최대 30초 대기
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # JSON 저장소가 기록마다 fsync 하는 것과 같게 커밋마다 WAL을 디스크에 기록 (NORMAL은 전원이 꺼지면 마지막 커밋을 잃을 수 있음)
+        # 동시에 들어온 기록은 그룹 커밋으로 한 트랜잭션에 묶이므로 fsync 횟수는 배치 수만큼만 늘어남
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            for name, columns in self.COLUMNS.items():
+                if name == "users":
+                    self._conn.execute(
+                        "CREATE TABLE IF NOT EXISTS users ("
+                        "id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, data TEXT NOT NULL)"
+                    )
+                elif name == "posts":
+                    self._conn.execute(
+                        "CREATE TABLE IF NOT EXISTS posts (id INTEGER PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL)"
+                    )
+                elif name == "likes":
+                    # 같은 사용자가 같은 게시글에 두 번 좋아요를 누를 수 없음
+                    self._conn.execute(
+                        "CREATE TABLE IF NOT EXISTS likes ("
+                        "id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, user_id INTEGER NOT NULL, data TEXT NOT NULL, "
+                        "UNIQUE (post_id, user_id))"
+                    )
+                else:
+                    self._conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} ("
+                        "id INTEGER PRIMARY KEY, user_id INTEGER, date TEXT, data TEXT NOT NULL)"
+                    )
+                    self._conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{name}_user_date ON {name} (user_id, date)"
+                    )
+            # 홈 화면 통계용 집계 테이블 (기록 추가 시 같은 트랜잭션에서 갱신)
+            stat_columns = ", ".join(f"{field} INTEGER NOT NULL DEFAULT 0" for field in STAT_FIELDS)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS daily_stats (user_id INTEGER, date TEXT, {stat_columns}, "
+                "PRIMARY KEY (user_id, date))"
+            )
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS user_stats (user_id INTEGER PRIMARY KEY, {stat_columns})"
+            )
+            # 게시글별 좋아요 수 (좋아요 추가 시 같은 트랜잭션에서 갱신) - 좋아요순 페이지 조회용 인덱스 포함
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS post_stats (post_id INTEGER PRIMARY KEY, likes INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_post_stats_likes ON post_stats (likes, post_id)")
+            # 프로세스 간에 공유되는 id 시퀀스
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            for name in self.COLUMNS:
+                self._conn.execute(
+                    f"INSERT OR IGNORE INTO sequences (name, value) SELECT ?, COALESCE(MAX(id), 0) FROM {name}",
+                    (name,),
+                )
+            (has_stats,) = self._conn.execute("SELECT EXISTS (SELECT 1 FROM user_stats)").fetchone()
+            if not has_stats:
+                # 집계 테이블이 추가되기 전에 만들어진 데이터베이스
+                self._rebuild_stats()
+            (missing_post_stats,) = self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM posts) AND NOT EXISTS (SELECT 1 FROM post_stats)"
+            ).fetchone()
+            if missing_post_stats:
+                self._rebuild_post_stats()
+
+    def _rebuild_stats(self):
+        self._conn.execute("DELETE FROM daily_stats")
+        self._conn.execute("DELETE FROM user_stats")
+        self._conn.execute(
+            f"INSERT INTO daily_stats (user_id, date, {', '.join(STAT_FIELDS)}) "
+            "SELECT user_id, date, SUM(meal_count), SUM(emotion_count), SUM(mood_sum), SUM(mood_count) FROM ("
+            "SELECT user_id, date, 1 AS meal_count, 0 AS emotion_count, 0 AS mood_sum, 0 AS mood_count FROM meals "
+            "UNION ALL "
+            "SELECT user_id, date, 0, 1, COALESCE(json_extract(data, '$.mood'), 0), 1 FROM emotions"
+            ") GROUP BY user_id, date"
+        )
+        self._conn.execute(
+            f"INSERT INTO user_stats (user_id, {', '.join(STAT_FIELDS)}) "
+            "SELECT user_id, SUM(meal_count), SUM(emotion_count), SUM(mood_sum), SUM(mood_count) "
+            "FROM daily_stats GROUP BY user_id"
+        )
+
+    def _rebuild_post_stats(self):
+        self._conn.execute("DELETE FROM post_stats")
+        self._conn.execute(
+            "INSERT INTO post_stats (post_id, likes) "
+            "SELECT posts.id, COUNT(likes.id) FROM posts LEFT JOIN likes ON likes.post_id = posts.id GROUP BY posts.id"
+        )
+
+    def _bump_stats(self, name, record):
+        if name == "posts":
+            self._conn.execute("INSERT OR IGNORE INTO post_stats (post_id, likes) VALUES (?, 0)", (record["id"],))
+            return
+        if name == "likes":
+            self._conn.execute(
+                "INSERT INTO post_stats (post_id, likes) VALUES (?, 1) "
+                "ON CONFLICT (post_id) DO UPDATE SET likes = likes + 1",
+                (record.get("post_id"),),
+            )
+            return
+        delta = _stat_delta(name, record)
+        if delta is None:
+            return
+        updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in STAT_FIELDS)
+        placeholders = ", ".join("?" for _ in STAT_FIELDS)
+        self._conn.execute(
+            f"INSERT INTO daily_stats (user_id, date, {', '.join(STAT_FIELDS)}) VALUES (?, ?, {placeholders}) "
+            f"ON CONFLICT (user_id, date) DO UPDATE SET {updates}",
+            (record.get("user_id"), record.get("date")) + delta,
+        )
+        self._conn.execute(
+            f"INSERT INTO user_stats (user_id, {', '.join(STAT_FIELDS)}) VALUES (?, {placeholders}) "
+            f"ON CONFLICT (user_id) DO UPDATE SET {updates}",
+            (record.get("user_id"),) + delta,
+        )
+
+    def _row(self, name, record):
+        return (record["id"],) + tuple(record.get(c) for c in self.COLUMNS[name]) + (
+            json.dumps(record, ensure_ascii=False),
+        )
+
+    def _insert_sql(self, name):
+        columns = ("id",) + self.COLUMNS[name] + ("data",)
+        placeholders = ", ".join("?" for _ in columns)
+        return f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def mtime_token(self, name):
+        # data_version은 다른 연결(다른 프로세스)이 커밋했을 때만 바뀌므로 이 연결의 쓰기와 섞이지 않음
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def own_change(self, name, old, new):
+        return old == new
+
+    def load(self, name):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data FROM {name} ORDER BY id").fetchall()
+        _count_rows_read(rows)
+        return [json.loads(data) for (data,) in rows]
+
+    def load_columns(self, name):
+        from records import RecordColumns
+
+        return RecordColumns.from_records(name, self.load(name))
+
+    def save(self, name, records):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {name}")
+            rows = [self._row(name, r) for r in records]
+            self._conn.executemany(self._insert_sql(name), rows)
+            metrics.add("storage_bytes_written", sum(len(row[-1]) for row in rows))
+            # 목록이 줄어들더라도 이미 발급한 id는 다시 쓰지 않음
+            self._conn.execute(
+                f"UPDATE sequences SET value = MAX(value, (SELECT COALESCE(MAX(id), 0) FROM {name})) WHERE name = ?",
+                (name,),
+            )
+            if name in ("meals", "emotions"):
+                self._rebuild_stats()
+            elif name in ("posts", "likes"):
+                self._rebuild_post_stats()
+
+    def update_many(self, name, changes):
+        with self._lock, self._conn:
+            for record_id, fields in changes.items():
+                row = self._conn.execute(f"SELECT data FROM {name} WHERE id = ?", (record_id,)).fetchone()
+                if row is None:
+                    continue
+                record = dict(json.loads(row[0]), **fields)
+                self._conn.execute(f"DELETE FROM {name} WHERE id = ?", (record_id,))
+                self._conn.execute(self._insert_sql(name), self._row(name, record))
+            if name in ("meals", "emotions"):
+                self._rebuild_stats()
+
+    def _allocate_ids(self, name, count):
+        # 트랜잭션 안에서 UPDATE가 먼저 실행되므로 쓰기 잠금을 잡은 상태로 값을 읽음
+        self._conn.execute("UPDATE sequences SET value = value + ? WHERE name = ?", (count, name))
+        (last_id,) = self._conn.execute("SELECT value FROM sequences WHERE name = ?", (name,)).fetchone()
+        return range(last_id - count + 1, last_id + 1)
+
+    def next_id(self, name):
+        with self._lock, self._conn:
+            return self._allocate_ids(name, 1)[0]
+
+    def _committer(self, name):
+        with self._lock:
+            if name not in self._committers:
+                self._committers[name] = GroupCommitter(lambda batch: self._write_batch(name, batch))
+            return self._committers[name]
+
+    def append(self, name, record):
+        return self._committer(name).submit(record)
+
+    def append_many(self, name, records):
+        return self._committer(name).submit_many(records)
+
+    def _write_batch(self, name, batch):
+        # 동시에 들어온 기록을 하나의 트랜잭션(커밋 한 번)으로 저장
+        with self._lock, self._conn:
+            missing = [request.record for request in batch if "id" not in request.record]
+            for record, record_id in zip(missing, self._allocate_ids(name, len(missing)) if missing else ()):
+                record["id"] = record_id
+            for request in batch:
+                row = self._row(name, request.record)
+                try:
+                    self._conn.execute(self._insert_sql(name), row)
+                except sqlite3.IntegrityError:
+                    # UNIQUE 제약 위반 (이미 존재하는 아이디, 이미 누른 좋아요 등) - 해당 기록만 실패 처리
+                    request.error = DuplicateKeyError(request.record.get("username", name))
+                    continue
+                metrics.add("storage_bytes_written", len(row[-1]))
+                self._bump_stats(name, request.record)
+
+    def find(self, name, user_id, date=None):
+        sql = f"SELECT data FROM {name} WHERE user_id = ?"
+        params = [user_id]
+        if date is not None:
+            sql += " AND date = ?"
+            params.append(date)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id", params).fetchall()
+        _count_rows_read(rows)
+        return [json.loads(data) for (data,) in rows]
+
+    def find_user(self, username):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def daily_stats(self, user_id, date):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(STAT_FIELDS)} FROM daily_stats WHERE user_id = ? AND date = ?",
+                (user_id, date),
+            ).fetchone()
+        return dict(zip(STAT_FIELDS, row or (0, 0, 0, 0)))
+
+    def user_stats(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(STAT_FIELDS)} FROM user_stats WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return dict(zip(STAT_FIELDS, row or (0, 0, 0, 0)))
+
+    def feed_page(self, order, cursor=None, limit=FEED_PAGE_SIZE):
+        # FeedIndex.page와 같은 커서 규칙 - 인덱스 범위 조회라 게시글 수와 무관하게 limit개만 읽음
+        if order == "recent":
+            sql = "SELECT posts.id, post_stats.likes, posts.data FROM posts JOIN post_stats ON post_stats.post_id = posts.id"
+            where, params = (" WHERE posts.id < ?", [cursor]) if cursor is not None else ("", [])
+            sql += where + " ORDER BY posts.id DESC LIMIT ?"
+        else:
+            sql = "SELECT posts.id, post_stats.likes, posts.data FROM post_stats JOIN posts ON posts.id = post_stats.post_id"
+            where, params = (" WHERE (post_stats.likes, post_stats.post_id) < (?, ?)", list(cursor)) if cursor else ("", [])
+            sql += where + " ORDER BY post_stats.likes DESC, post_stats.post_id DESC LIMIT ?"
+        with self._lock:
+            # 다음 페이지가 있는지 알기 위해 하나 더 읽음
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+        _count_rows_read([(data,) for _, _, data in rows])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        likes = {post_id: count for post_id, count, _ in rows}
+        posts = [json.loads(data) for _, _, data in rows]
+        return posts, _feed_cursor(order, [post["id"] for post in posts], likes) if more else None
+
+    def like_counts(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in post_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT post_id, likes FROM post_stats WHERE post_id IN ({placeholders})", post_ids
+            ).fetchall()
+        return dict(rows)
+
+    def liked_posts(self, user_id, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in post_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT post_id FROM likes WHERE user_id = ? AND post_id IN ({placeholders})", [user_id] + post_ids
+            ).fetchall()
+        return {post_id for (post_id,) in rows}
+
+    def daily_counts(self, name, user_id):
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT date, COUNT(*) FROM {name} WHERE user_id = ? GROUP BY date ORDER BY date",
+                (user_id,),
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedStore:
+    """
+    저장소 앞에 두는 프로세스 공용 캐시입니다.
+    같은 프로세스의 쓰기는 버전 카운터로, 다른 프로세스의 쓰기는 파일 mtime으로 감지하며
+    변경이 없으면 Streamlit 재실행 시 디스크를 읽거나 JSON을 다시 파싱하지 않습니다.
+    반환되는 목록은 캐시와 공유되므로 읽기 전용으로 사용해야 합니다.
+    """
+
+    def __init__(self, backend, max_slices=CACHE_MAX_SLICES, stat_interval=CACHE_STAT_INTERVAL):
+        self.backend = backend
+        self.max_slices = max_slices
+        self.stat_interval = stat_interval
+        self._lock = threading.RLock()
+        self._versions = {}
+        self._tokens = {}
+        self._checked_at = {}
+        self._full = {}
+        self._columns = {}
+        self._slices = OrderedDict()
+        self._user_index = None
+        self._stats = None
+        self._rollups = OrderedDict()
+        self._feed = None
+        # 디스크에 쓰는 중이라 아직 캐시에 반영되지 않은 이 프로세스의 기록 추가 수
+        self._writing = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh_token(self, name):
+        self._tokens[name] = self.backend.mtime_token(name)
+        self._checked_at[name] = time.monotonic()
+
+    def _refresh_after_write(self, name):
+        # 쓰기 전에 본 토큰에서 지금 토큰까지의 변화가 모두 이 프로세스의 쓰기일 때만 캐시를 그대로 이어 쓰고,
+        # 디스크에 쓰는 사이 다른 프로세스가 기록했다면 버전을 올려 다시 읽게 함
+        token = self.backend.mtime_token(name)
+        if not self.backend.own_change(name, self._tokens.get(name), token):
+            self._versions[name] = self._versions.get(name, 0) + 1
+        self._tokens[name] = token
+        self._checked_at[name] = time.monotonic()
+
+    def _version(self, name, force=False):
+        # 일정 간격으로만 mtime을 확인해 유휴 재실행에서는 파일 시스템에 접근하지 않음
+        now = time.monotonic()
+        if force or now - self._checked_at.get(name, float("-inf")) >= self.stat_interval:
+            token = self.backend.mtime_token(name)
+            if token != self._tokens.get(name):
+                # 이 프로세스의 압축처럼 내용이 그대로인 변경이면 캐시를 계속 씀
+                # (쓰는 중인 기록 추가가 있으면 그 기록은 아직 캐시에 없으므로 다시 읽게 함)
+                if self._writing[name] or not self.backend.own_change(name, self._tokens.get(name), token):
+                    self._versions[name] = self._versions.get(name, 0) + 1
+                self._tokens[name] = token
+            self._checked_at[name] = now
+        return self._versions.get(name, 0)
+
+    def _get_slice(self, key, compute):
+        version = self._version(key[0])
+        entry = self._slices.get(key)
+        if entry is not None and entry[0] == version:
+            self._slices.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        # 캐시에 없을 때만 실제 조회가 일어나므로 이 구간만 측정 (예: find_meals)
+        with metrics.timed(f"{key[1]}_{key[0]}"):
+            value = compute()
+        self._slices[key] = (version, value)
+        self._slices.move_to_end(key)
+        while len(self._slices) > self.max_slices:
+            self._slices.popitem(last=False)
+        return value
+
+    def load(self, name):
+        with self._lock:
+            version = self._version(name)
+            entry = self._full.get(name)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            with metrics.timed(f"load_{name}"):
+                records = self.backend.load(name)
+            self._full[name] = (version, records)
+            return records
+
+    def load_columns(self, name):
+        """
+        식사/감정 기록 전체를 컬럼형(records.RecordColumns)으로 반환합니다.
+        dict 목록보다 메모리를 몇 배 적게 쓰며, 필요한 행만 to_records(rows)로 dict로 바꿀 수 있습니다.
+        """
+        with self._lock:
+            version = self._version(name)
+            entry = self._columns.get(name)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            with metrics.timed(f"load_columns_{name}"):
+                columns = self.backend.load_columns(name)
+            self._columns[name] = (version, columns)
+            return columns
+
+    def find(self, name, user_id, date=None):
+        with self._lock:
+            if self.backend.SUPPORTS_QUERIES:
+                compute = lambda: self.backend.find(name, user_id, date)
+            elif name in COLUMNAR_NAMES:
+                # 전체 기록을 dict 목록으로 들고 있지 않고 컬럼형에서 해당 행만 꺼냄
+                def compute():
+                    columns = self.load_columns(name)
+                    return columns.to_records(columns.rows_for(user_id, date))
+            else:
+                compute = lambda: [
+                    r for r in self.load(name)
+                    if r.get("user_id") == user_id and (date is None or r.get("date") == date)
+                ]
+            return self._get_slice((name, "find", user_id, date), compute)
+
+    def daily_counts(self, name, user_id):
+        with self._lock:
+            if self.backend.SUPPORTS_QUERIES:
+                compute = lambda: self.backend.daily_counts(name, user_id)
+            else:
+                def compute():
+                    counts = Counter(r.get("date") for r in self.find(name, user_id))
+                    return sorted(counts.items())
+            return self._get_slice((name, "daily_counts", user_id), compute)
+
+    def _stats_versions(self):
+        return (self._version("meals"), self._version("emotions"))
+
+    def _daily_stats(self):
+        # 식사/감정 기록이 바뀐 경우에만 컬럼형 기록을 한 번 묶어 집계를 다시 만듦
+        versions = self._stats_versions()
+        if self._stats is None or self._stats[0] != versions:
+            stats = DailyStats()
+            for name in ("meals", "emotions"):
+                stats.add_groups(name, self.load_columns(name).group_by_user_date())
+            self._stats = (versions, stats)
+        return self._stats[1]
+
+    def daily_stats(self, user_id, date):
+        with self._lock:
+            if self.backend.SUPPORTS_QUERIES:
+                return self._get_slice(
+                    ("stats", "day", user_id, date), lambda: self.backend.daily_stats(user_id, date)
+                )
+            return self._daily_stats().day(user_id, date)
+
+    def user_stats(self, user_id):
+        with self._lock:
+            if self.backend.SUPPORTS_QUERIES:
+                return self._get_slice(("stats", "total", user_id), lambda: self.backend.user_stats(user_id))
+            return self._daily_stats().total(user_id)
+
+    def mood_rollup(self, user_id):
+        """
+        사용자의 주별/월별 기분 집계(mood_analytics.MoodRollup)를 반환합니다.
+        처음 요청할 때 사용자의 기록으로 한 번 만들고, 이후 이 프로세스의 기록 추가는 증분으로 반영합니다.
+        """
+        with self._lock:
+            versions = self._stats_versions()
+            entry = self._rollups.get(user_id)
+            if entry is not None and entry[0] == versions:
+                self._rollups.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            # numpy는 정서 관리 화면을 처음 열 때만 불러옴
+            from mood_analytics import MoodRollup
+
+            with metrics.timed("mood_rollup"):
+                rollup = MoodRollup.from_records(self.find("meals", user_id), self.find("emotions", user_id))
+            self._rollups[user_id] = (versions, rollup)
+            while len(self._rollups) > self.max_slices:
+                self._rollups.popitem(last=False)
+            return rollup
+
+    def _feed_versions(self):
+        return (self._version("posts"), self._version("likes"))
+
+    def _feed_index(self):
+        # 게시글/좋아요가 다른 곳에서 바뀐 경우에만 전체를 한 번 훑어 색인을 다시 만듦
+        versions = self._feed_versions()
+        if self._feed is None or self._feed[0] != versions:
+            self._feed = (versions, FeedIndex.build(self.load("posts"), self.load("likes")))
+        return self._feed[1]
+
+    def feed(self, order, cursor=None, limit=FEED_PAGE_SIZE):
+        """
+        커뮤니티 게시글 한 페이지와 다음 페이지 커서를 반환합니다 (order: "recent" 또는 "popular").
+        각 게시글에는 현재 좋아요 수가 "likes" 값으로 붙어 있습니다.
+        """
+        with self._lock:
+            if not self.backend.SUPPORTS_QUERIES:
+                index = self._feed_index()
+                posts, next_cursor = index.page(order, cursor, limit)
+                return [dict(post, likes=index.likes[post["id"]]) for post in posts], next_cursor
+            # 페이지 구성은 캐시하고, 좋아요 수는 자주 바뀌므로 게시글 id로 따로 조회해 붙임
+            posts, next_cursor = self._get_slice(
+                ("posts", "feed", order, cursor, limit), lambda: self.backend.feed_page(order, cursor, limit)
+            )
+            counts = self.like_counts([post["id"] for post in posts])
+            return [dict(post, likes=counts.get(post["id"], 0)) for post in posts], next_cursor
+
+    def like_counts(self, post_ids):
+        with self._lock:
+            if not self.backend.SUPPORTS_QUERIES:
+                likes = self._feed_index().likes
+                return {post_id: likes[post_id] for post_id in post_ids}
+            post_ids = tuple(post_ids)
+            return self._get_slice(("likes", "counts", post_ids), lambda: self.backend.like_counts(post_ids))
+
+    def liked_posts(self, user_id, post_ids):
+        """post_ids 중 user_id가 이미 좋아요를 누른 게시글 id 집합"""
+        with self._lock:
+            if not self.backend.SUPPORTS_QUERIES:
+                liked = self._feed_index().liked
+                return {post_id for post_id in post_ids if (post_id, user_id) in liked}
+            post_ids = tuple(post_ids)
+            return self._get_slice(
+                ("likes", "liked", user_id, post_ids), lambda: self.backend.liked_posts(user_id, post_ids)
+            )
+
+    def like_post(self, like):
+        """
+        좋아요({"post_id", "user_id", ...})를 기록합니다. 이미 누른 게시글이면 False를 반환합니다.
+        create_user와 마찬가지로 최종 중복 확인은 저장소가 쓰기 잠금 안에서 다시 합니다.
+        """
+        if like["post_id"] in self.liked_posts(like["user_id"], [like["post_id"]]):
+            return False
+        try:
+            self.append("likes", like)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def find_user(self, username):
+        with self._lock:
+            if self.backend.SUPPORTS_QUERIES:
+                return self._get_slice(
+                    ("users", "username", username), lambda: self.backend.find_user(username)
+                )
+            # 아이디 -> 사용자 색인은 사용자 목록이 바뀔 때만 다시 만들고 이후 조회는 O(1)
+            version = self._version("users")
+            if self._user_index is None or self._user_index[0] != version:
+                self._user_index = (version, {u["username"]: u for u in self.load("users")})
+            return self._user_index[1].get(username)
+
+    def create_user(self, user):
+        """
+        새 사용자를 기록하고 id를 발급합니다. 이미 존재하는 아이디라면 None을 반환합니다.
+        최종 중복 확인은 저장소가 쓰기 잠금 안에서 다시 하므로 동시에 가입해도 한 명만 성공합니다.
+        """
+        if self.find_user(user["username"]) is not None:
+            return None
+        try:
+            return self.append("users", user)
+        except DuplicateKeyError:
+            return None
+
+    def _invalidate(self, name):
+        # 식사/감정 기록 전체가 바뀌면 그에 딸린 집계 조회 결과도, 좋아요가 바뀌면 좋아요순 페이지도 함께 무효화
+        related = {"meals": (name, "stats"), "emotions": (name, "stats"), "likes": (name, "posts")}
+        for key in related.get(name, (name,)):
+            self._versions[key] = self._versions.get(key, 0) + 1
+            # stats는 식사/감정 기록에서 계산한 조회 결과라 확인할 파일(토큰)이 따로 없음
+            if key != "stats":
+                self._refresh_token(key)
+
+    def save(self, name, records):
+        if not isinstance(records, list):
+            # load_columns()로 읽은 RecordColumns도 그대로 저장할 수 있게 dict 목록으로 바꿈
+            records = list(records)
+        with self._lock, metrics.timed(f"save_{name}"):
+            self.backend.save(name, records)
+            self._invalidate(name)
+
+    def update_many(self, name, changes):
+        # 수정 시각을 남겨 아카이브로 내보낸 뒤 바뀐 기록을 구분할 수 있게 함
+        updated_at = datetime.now().isoformat()
+        changes = {record_id: dict(fields, updated_at=updated_at) for record_id, fields in changes.items()}
+        with self._lock:
+            self.backend.update_many(name, changes)
+            self._invalidate(name)
+
+    def next_id(self, name):
+        return self.backend.next_id(name)
+
+    def append(self, name, record):
+        return self.append_many(name, [record])[0]
+
+    def append_many(self, name, records):
+        with self._lock:
+            version = self._version(name, force=True)
+            stats_versions = self._stats_versions()
+            stats_valid = self._stats is not None and self._stats[0] == stats_versions
+            feed_valid = self._feed is not None and self._feed[0] == self._feed_versions()
+            self._writing[name] += 1
+        # 디스크 쓰기 동안 캐시 잠금을 잡고 있지 않아야 동시에 들어온 쓰기가 그룹 커밋으로 묶임
+        try:
+            with metrics.timed(f"append_{name}"):
+                self.backend.append_many(name, records)
+        except BaseException:
+            with self._lock:
+                self._writing[name] -= 1
+            raise
+        with self._lock:
+            self._writing[name] -= 1
+            before = self._versions.get(name, 0)
+            if before != version:
+                # 쓰는 사이 다른 스레드가 다시 읽은 목록에는 이 기록이 들어 있는지 알 수 없으므로 한 번 더 읽게 함
+                self._versions[name] = before = before + 1
+            self._refresh_after_write(name)
+            if name in ("meals", "emotions") and self._versions.get(name, 0) != before:
+                # 쓰는 사이 다른 프로세스의 기록이 섞였으면 어느 사용자의 집계가 바뀌었는지 모르므로 모두 다시 읽음
+                self._versions["stats"] = self._versions.get("stats", 0) + 1
+            # 전체 목록은 그대로 이어 붙이고, 해당 사용자의 조회 결과만 무효화
+            entry = self._full.get(name)
+            if entry is not None and entry[0] == version:
+                entry[1].extend(records)
+            entry = self._columns.get(name)
+            if entry is not None and entry[0] == version:
+                entry[1].extend(records)
+            if name == "users":
+                if self._user_index is not None and self._user_index[0] == version:
+                    self._user_index[1].update((r["username"], r) for r in records)
+                stale = [k for k in self._slices if k[0] == name]
+            elif name in ("posts", "likes"):
+                if feed_valid:
+                    add = self._feed[1].add_post if name == "posts" else self._feed[1].add_like
+                    for record in records:
+                        add(record)
+                # 새 게시글은 모든 페이지를, 좋아요는 좋아요순 페이지와 좋아요 조회 결과만 바꿈
+                if name == "posts":
+                    stale = [k for k in self._slices if k[0] == "posts"]
+                else:
+                    stale = [k for k in self._slices if k[0] == "likes" or k[:3] == ("posts", "feed", "popular")]
+            else:
+                by_user = {}
+                for record in records:
+                    if stats_valid:
+                        self._stats[1].add(name, record)
+                    by_user.setdefault(record.get("user_id"), []).append(record)
+                for user_id, user_records in by_user.items():
+                    rollup = self._rollups.get(user_id)
+                    if rollup is not None and rollup[0] == stats_versions:
+                        rollup[1].add(name, user_records)
+                user_ids = by_user.keys()
+                stale = [k for k in self._slices if k[0] in (name, "stats") and k[2] in user_ids]
+            for key in stale:
+                del self._slices[key]
+        return records
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "slices": len(self._slices)}
+
+
+def migrate_json_to_sqlite(data_dir, db_path=None):
+    """
+    data/*.json (+ 저널) 에 있는 기존 기록을 SQLite 데이터베이스로 한 번에 옮깁니다.
+    대상 테이블의 기존 내용은 덮어씁니다.
+    """
+    data_dir = Path(data_dir)
+    source = JournalStore(data_dir)
+    target = SqliteStore(db_path or data_dir / "app.db")
+    counts = {}
+    try:
+        for name in SqliteStore.COLUMNS:
+            records = source.load(name)
+            target.save(name, records)
+            counts[name] = len(records)
+    finally:
+        target.close()
+    return counts
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(data_dir, backend=None):
+    # Streamlit은 매 상호작용마다 app.py를 다시 실행하므로 저장소 객체는 모듈 단위로 공유
+    backend = backend or os.getenv("STORAGE_BACKEND", "json")
+    key = (str(Path(data_dir).resolve()), backend)
+    with _stores_lock:
+        if key not in _stores:
+            if backend == "sqlite":
+                _stores[key] = CachedStore(SqliteStore(Path(data_dir) / "app.db"))
+            elif backend == "json":
+                _stores[key] = CachedStore(JournalStore(data_dir))
+            else:
+                raise ValueError(f"지원하지 않는 저장소 백엔드입니다: {backend}")
+        return _stores[key]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 저장소 모듈은 저장소 루트에 있으므로 테스트에서 바로 임포트할 수 있게 경로에 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,141 @@
+"""
+비밀번호 해시와 로그인 시 해시 교체 테스트
+"""
+import threading
+
+import pytest
+
+import auth
+from auth import hash_password, needs_rehash, verify_password
+from storage import CachedStore, JournalStore
+from write_queue import WriteBehindQueue
+
+
+@pytest.fixture(autouse=True)
+def fast_hash(monkeypatch):
+    # 테스트에서는 반복 횟수를 줄여 빠르게 실행
+    monkeypatch.setattr(auth, "PASSWORD_HASH_ITERATIONS", 1000)
+
+
+def test_hash_and_verify():
+    stored = hash_password("비밀번호1")
+    algorithm, iterations, salt, digest = stored.split("$")
+    assert (algorithm, iterations) == ("pbkdf2_sha256", "1000")
+    assert verify_password("비밀번호1", stored)
+    assert not verify_password("비밀번호2", stored)
+    # 같은 비밀번호라도 솔트가 달라 해시가 다름
+    assert hash_password("비밀번호1") != stored
+
+
+def test_needs_rehash():
+    assert not needs_rehash(hash_password("pw"))
+    assert needs_rehash(hash_password("pw", iterations=500))
+    assert not needs_rehash(hash_password("pw", iterations=2000))
+    assert needs_rehash("pw")
+    assert needs_rehash("pbkdf2_sha256$")
+    assert needs_rehash("pbkdf2_sha256$many$salt$hash")
+
+
+def test_verify_with_changed_iterations(monkeypatch):
+    stored = hash_password("pw")
+    monkeypatch.setattr(auth, "PASSWORD_HASH_ITERATIONS", 2000)
+    # 저장된 해시의 반복 횟수로 확인하므로 설정을 바꿔도 로그인 가능
+    assert verify_password("pw", stored)
+    assert needs_rehash(stored)
+
+
+@pytest.mark.parametrize("stored", [
+    "pbkdf2_sha256$",
+    "pbkdf2_sha256$1000$c2FsdA==",
+    "pbkdf2_sha256$1000$c2FsdA==$aGFzaA==$extra",
+    "pbkdf2_sha256$many$c2FsdA==$aGFzaA==",
+    "pbkdf2_sha256$0$c2FsdA==$aGFzaA==",
+    "pbkdf2_sha256$-5$c2FsdA==$aGFzaA==",
+    "pbkdf2_sha256$1000$!!!$aGFzaA==",
+    "pbkdf2_sha256$1000$c2FsdA==$not base64",
+])
+def test_malformed_hash_is_rejected(stored):
+    assert not verify_password("pw", stored)
+    # 평문 비교로 넘어가지 않음 (저장된 문자열 그대로 입력해도 실패)
+    assert not verify_password(stored, stored)
+
+
+def test_legacy_plaintext_password():
+    assert verify_password("1234", "1234")
+    assert not verify_password("12345", "1234")
+    assert verify_password("비밀번호", "비밀번호")
+
+
+def login(store, writer, username, password):
+    # app.login_page와 같은 순서: 확인에 성공하면 필요한 경우 새 해시로 교체를 제출
+    user = store.find_user(username)
+    if user is None or not verify_password(password, user["password"]):
+        return None
+    if needs_rehash(user["password"]):
+        writer.submit_update("users", user["id"], {"password": hash_password(password)})
+    return user
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CachedStore(JournalStore(tmp_path))
+    # 해시 도입 이전에 평문으로 저장된 계정
+    store.save("users", [
+        {"id": i, "username": f"user{i}", "password": f"pw{i}", "email": f"user{i}@example.com"}
+        for i in range(1, 6)
+    ])
+    return store
+
+
+def test_legacy_user_is_upgraded_on_login(store):
+    writer = WriteBehindQueue(store)
+    try:
+        assert login(store, writer, "user1", "wrong") is None
+        assert login(store, writer, "user1", "pw1")["id"] == 1
+    finally:
+        writer.close()
+
+    user = store.find_user("user1")
+    assert user["password"].startswith("pbkdf2_sha256$")
+    assert not needs_rehash(user["password"])
+    assert "updated_at" in user
+    # 다른 필드와 다른 계정은 그대로
+    assert user["email"] == "user1@example.com"
+    assert store.find_user("user2")["password"] == "pw2"
+    # 새 해시로 다시 로그인할 수 있고 이후에는 더 교체하지 않음
+    writer = WriteBehindQueue(store)
+    try:
+        assert login(store, writer, "user1", "pw1") is not None
+        assert writer.metrics()["submitted"] == 0
+    finally:
+        writer.close()
+    assert JournalStore(store.backend.data_dir).load("users")[0]["password"] == user["password"]
+
+
+def test_upgrades_are_batched_into_one_rewrite(store):
+    calls = []
+    update_many = store.update_many
+    store.update_many = lambda name, changes: calls.append(sorted(changes)) or update_many(name, changes)
+    # 쓰기 스레드가 첫 작업을 처리하는 동안 나머지 로그인이 대기열에 쌓이게 함
+    writing, release = threading.Event(), threading.Event()
+    append_many = store.append_many
+
+    def blocked_append_many(name, records):
+        writing.set()
+        release.wait(5)
+        return append_many(name, records)
+
+    store.append_many = blocked_append_many
+    writer = WriteBehindQueue(store)
+    try:
+        writer.submit_record("meals", {"user_id": 1, "date": "2024-01-01"})
+        assert writing.wait(5)
+        for i in range(1, 6):
+            assert login(store, writer, f"user{i}", f"pw{i}") is not None
+        release.set()
+    finally:
+        writer.close()
+
+    assert calls == [[1, 2, 3, 4, 5]]
+    assert all(not needs_rehash(user["password"]) for user in store.load("users"))
+    assert writer.metrics()["failed"] == 0
@@ -0,0 +1,119 @@
+"""
+커뮤니티 피드 페이지 테스트 - JSON 저장소(FeedIndex)와 SQLite(feed_page)가 같은 페이지를 돌려줘야 함
+"""
+import random
+
+import pytest
+
+from storage import FEED_ORDERS, CachedStore, JournalStore, SqliteStore
+
+POSTS = 23
+PAGE = 5
+
+
+def make_stores(tmp_path):
+    (tmp_path / "json").mkdir()
+    return [CachedStore(JournalStore(tmp_path / "json")), CachedStore(SqliteStore(tmp_path / "app.db"))]
+
+
+def add_posts(stores, count):
+    for i in range(count):
+        post = {"user_id": i % 3 + 1, "author": f"user{i % 3 + 1}", "title": f"글 {i}", "content": ""}
+        assert len({store.append("posts", dict(post))["id"] for store in stores}) == 1
+
+
+def like(stores, post_id, user_id):
+    results = {store.like_post({"post_id": post_id, "user_id": user_id}) for store in stores}
+    assert len(results) == 1
+    return results.pop()
+
+
+def page(store, order, cursor):
+    posts, next_cursor = store.feed(order, cursor, PAGE)
+    return [(post["id"], post["likes"]) for post in posts], next_cursor
+
+
+def same_page(stores, order, cursor):
+    pages = [page(store, order, cursor) for store in stores]
+    assert pages[0] == pages[1]
+    return pages[0]
+
+
+def walk(stores, order, between=lambda: None):
+    # app.py 피드와 같이 지나온 페이지의 커서를 쌓아가며 다음 페이지로 이동
+    cursors = [None]
+    seen = []
+    while True:
+        rows, next_cursor = same_page(stores, order, cursors[-1])
+        seen.append(rows)
+        if next_cursor is None:
+            return cursors, seen
+        cursors.append(next_cursor)
+        between()
+
+
+@pytest.fixture
+def stores(tmp_path):
+    stores = make_stores(tmp_path)
+    add_posts(stores, POSTS)
+    rng = random.Random(0)
+    # 좋아요 수가 같은 게시글이 여러 개 생기도록 (같으면 최신 글이 먼저)
+    for post_id in rng.sample(range(1, POSTS + 1), 12):
+        for user_id in range(rng.randrange(1, 4)):
+            assert like(stores, post_id, user_id)
+    return stores
+
+
+def test_empty_feed(tmp_path):
+    stores = make_stores(tmp_path)
+    for order in FEED_ORDERS:
+        assert same_page(stores, order, None) == ([], None)
+
+
+@pytest.mark.parametrize("order", FEED_ORDERS)
+def test_pages_cover_every_post_once(stores, order):
+    cursors, pages = walk(stores, order)
+    rows = [row for rows in pages for row in rows]
+    assert [len(rows) for rows in pages] == [5, 5, 5, 5, 3]
+    if order == "recent":
+        assert [post_id for post_id, _ in rows] == list(range(POSTS, 0, -1))
+    else:
+        assert rows == sorted(rows, key=lambda row: (-row[1], -row[0]))
+    assert len({post_id for post_id, _ in rows}) == POSTS
+
+    # 이전 페이지로 돌아가면 (커서를 꺼내면) 같은 페이지가 다시 보임
+    while len(cursors) > 1:
+        cursors.pop()
+        pages.pop()
+        assert same_page(stores, order, cursors[-1])[0] == pages[-1]
+
+
+def test_exact_multiple_of_page_size_has_no_empty_last_page(tmp_path):
+    stores = make_stores(tmp_path)
+    add_posts(stores, PAGE * 2)
+    for order in FEED_ORDERS:
+        _, pages = walk(stores, order)
+        assert [len(rows) for rows in pages] == [PAGE, PAGE]
+
+
+@pytest.mark.parametrize("order", FEED_ORDERS)
+def test_likes_between_page_fetches(stores, order):
+    rng = random.Random(1)
+    user_ids = iter(range(100, 10 ** 6))
+
+    def like_some():
+        # 페이지를 넘기는 사이에 이미 본 글/아직 안 본 글 모두 좋아요를 받음
+        for post_id in rng.sample(range(1, POSTS + 1), 4):
+            user_id = next(user_ids)
+            assert like(stores, post_id, user_id)
+        # 이미 누른 좋아요는 두 저장소 모두 무시
+        assert not like(stores, post_id, user_id)
+
+    cursors, pages = walk(stores, order, like_some)
+    # 커서 이후만 읽으므로 최신순은 좋아요가 바뀌어도 빠지거나 겹치는 글이 없음
+    if order == "recent":
+        assert [post_id for rows in pages for post_id, _ in rows] == list(range(POSTS, 0, -1))
+    # 새로 게시글이 올라와도 두 저장소가 같은 페이지를 돌려줌
+    add_posts(stores, 2)
+    for cursor in cursors:
+        same_page(stores, order, cursor)
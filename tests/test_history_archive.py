@@ -0,0 +1,157 @@
+"""
+Parquet/Arrow 아카이브 내보내기/읽기 테스트 (pyarrow가 없으면 건너뜀)
+"""
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import history_archive
+from history_archive import HistoryArchive, export_archive, import_archive, read_archive_table, table_to_records
+from storage import CachedStore, JournalStore
+
+BUCKETS = 4
+
+
+def meal(record_id, user_id, date, **fields):
+    return dict({"id": record_id, "user_id": user_id, "date": date, "type": "점심", "mood": 3}, **fields)
+
+
+MEALS = [
+    meal(1, 1, "2024-01-05", calories=500, protein=20.5, created_at="2024-01-05T12:00:00"),
+    meal(2, 1, "2024-02-10", calories=0.1, content="샐러드"),
+    meal(3, 2, "2024-01-20", note="스키마에 없는 필드"),
+    meal(4, 5, "2024-01-07", alone=True),
+    meal(5, 1, "2024-03-01", location="외식"),
+    meal(6, 6, "2023-12-31", created_at="2023-12-31T23:59:59+09:00"),
+]
+# 앱이 예전에 받아들였던 형식의 기록
+LEGACY_MEALS = [
+    {"id": 7, "user_id": 1, "type": "저녁"},
+    {"id": 8, "user_id": None, "date": "2024-01-05"},
+    {"id": 9, "date": "2024-01-05"},
+    meal(10, 1, "2024-1-5"),
+    meal(11, "1", "2024-01-05"),
+]
+EMOTIONS = [
+    {"id": 1, "user_id": 1, "date": "2024-01-05", "mood": 4, "diary": "좋음"},
+    {"id": 2, "user_id": 2, "date": "2024-02-01", "mood": 2},
+    {"id": 3, "user_id": None, "mood": 1},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "data").mkdir()
+    store = CachedStore(JournalStore(tmp_path / "data"))
+    store.save("meals", MEALS + LEGACY_MEALS)
+    store.save("emotions", EMOTIONS)
+    return store
+
+
+def by_id(records):
+    return sorted(records, key=lambda r: r["id"])
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_round_trip(tmp_path, store, fmt):
+    root = tmp_path / "archive"
+    history_archive.ARCHIVE_BATCH_ROWS, batch_rows = 2, history_archive.ARCHIVE_BATCH_ROWS
+    try:
+        counts = export_archive(store, root, (fmt,), BUCKETS)
+    finally:
+        history_archive.ARCHIVE_BATCH_ROWS = batch_rows
+    assert counts == {"meals": len(MEALS) + len(LEGACY_MEALS), "emotions": len(EMOTIONS)}
+
+    manifest = json.loads((root / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["max_ids"] == {"meals": 11, "emotions": 3}
+    assert manifest["formats"] == [fmt]
+
+    assert by_id(table_to_records(read_archive_table(root, "meals"))) == MEALS + LEGACY_MEALS
+    assert by_id(table_to_records(read_archive_table(root, "emotions"))) == EMOTIONS
+
+    # (월, 사용자 버킷) 파티션, 알 수 없는 기록은 month=unknown
+    months = {path.name for path in (root / fmt / "meals").iterdir()}
+    assert months == {"month=2023-12", "month=2024-01", "month=2024-02", "month=2024-03", "month=unknown"}
+    buckets = {path.name for path in (root / fmt / "meals" / "month=2024-01").iterdir()}
+    assert buckets == {"user_bucket=01", "user_bucket=02"}
+    unknown = root / fmt / "meals" / "month=unknown" / "user_bucket=00" / f"part-0.{fmt}"
+    if fmt == "parquet":
+        table = history_archive.pq.read_table(unknown)
+    else:
+        table = history_archive.pa.ipc.open_file(str(unknown)).read_all()
+    assert ids(table) == [7, 8, 9, 10, 11]
+
+
+def test_import_restores_records(tmp_path, store):
+    root = tmp_path / "archive"
+    export_archive(store, root, ("parquet", "arrow"), BUCKETS)
+    (tmp_path / "restored").mkdir()
+    restored = CachedStore(JournalStore(tmp_path / "restored"))
+    assert import_archive(restored, root) == {"meals": 11, "emotions": 3}
+    assert restored.load("meals") == MEALS + LEGACY_MEALS
+    assert restored.load("emotions") == EMOTIONS
+
+
+def exported(tmp_path, store, fmt, complete_before="2024-03-01"):
+    root = tmp_path / "archive"
+    export_archive(store, root, (fmt,), BUCKETS)
+    # 내보낸 시점을 2024년 3월로 (3월 기록은 아직 완결되지 않은 달)
+    manifest_path = root / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["complete_before"] = complete_before
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    return HistoryArchive(root)
+
+
+def ids(table):
+    return sorted(table.column("id").to_pylist())
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_read_user_prunes_partitions(tmp_path, store, fmt, monkeypatch):
+    archive = exported(tmp_path, store, fmt)
+    opened = []
+    if fmt == "parquet":
+        read_table = history_archive.pq.read_table
+        monkeypatch.setattr(
+            history_archive.pq, "read_table", lambda path, **kw: opened.append(path) or read_table(path, **kw)
+        )
+
+    # 사용자 1(버킷 1)의 2024-01~2024-02: 날짜가 정상인 기록만, 3월(미완결)과 unknown 파티션은 읽지 않음
+    assert ids(archive.read_user("meals", 1, "2024-01-01", "2024-02-29")) == [1, 2]
+    # 같은 버킷의 다른 사용자(5)는 섞이지 않음
+    assert ids(archive.read_user("meals", 5)) == [4]
+    assert ids(archive.read_user("meals", 1, "2024-02-01")) == [2]
+    assert ids(archive.read_user("meals", 3)) == []
+
+    if fmt == "arrow":
+        opened = [key for key, reader in archive._readers.items()]
+        assert all(month in ("2023-12", "2024-01", "2024-02") for _, month, _ in opened)
+        assert {bucket for _, _, bucket in opened} == {1, 3}
+    else:
+        paths = {(path.parent.parent.name, path.parent.name) for path in opened}
+        assert ("month=2024-01", "user_bucket=01") in paths
+        assert all(month != "month=2024-03" and month != "month=unknown" for month, _ in paths)
+        # 사용자 3의 버킷(03)에는 파일이 없으므로 열지 않음
+        assert {bucket for _, bucket in paths} == {"user_bucket=01"}
+
+
+def test_read_user_merges_recent_and_replaced(tmp_path, store):
+    archive = exported(tmp_path, store, "arrow")
+    recent = [meal(2, 1, "2024-02-10", calories=900), meal(12, 1, "2024-01-06")]
+    table = archive.read_user("meals", 1, recent=recent, replaced_ids=[2])
+    records = by_id(table_to_records(table))
+    assert [r["id"] for r in records] == [1, 2, 12]
+    assert records[1]["calories"] == 900
+
+
+def test_manifest_without_watermark_is_not_used_by_reports(tmp_path, store):
+    from nutrition_analytics import build_user_meal_frame
+
+    archive = exported(tmp_path, store, "arrow")
+    archive.max_ids = None
+    meals = [m for m in MEALS if m["user_id"] == 1]
+    frame = build_user_meal_frame(meals * 3000, archive=archive, user_id=1)
+    assert len(frame) == 9000
@@ -0,0 +1,170 @@
+"""
+컬럼형 기록(records.RecordColumns)과 .columns.npz 스냅샷 테스트
+"""
+import json
+
+import numpy as np
+import pytest
+
+from records import RecordColumns
+from storage import CachedStore, DailyStats, JournalStore
+
+MEALS = [
+    {
+        "id": 1, "user_id": 1, "type": "점심", "time": "12:30", "date": "2024-01-05", "location": "외식",
+        "alone": True, "mood": 4, "content": "김밥", "has_photo": False, "created_at": "2024-01-05T12:40:00.123456",
+        "food_type": "샐러드", "calories": 120, "protein": 5, "carbs": 15, "fat": 3,
+    },
+    # 키가 없는 필드, null 값
+    {"id": 2, "user_id": 1, "date": "2024-01-05"},
+    {"id": 3, "user_id": 2, "date": "2024-01-06", "mood": None, "content": None, "calories": None, "alone": None},
+    # 스키마에 없는 필드
+    {"id": 4, "user_id": 2, "date": "2024-01-06", "note": {"tags": ["혼밥"]}, "updated_at": "2024-02-01T00:00:00"},
+    # 배열로 표현하지 못하는 값은 원래 모양 그대로 돌아와야 함
+    {
+        "id": 5, "user_id": 3, "date": "2024-1-7", "time": "9:05", "created_at": "2024-01-07T09:05:00+09:00",
+        "mood": 300, "alone": 1, "calories": 0.1, "protein": 1e40, "fat": "많음", "content": 42,
+    },
+    # 선택지에 없는 범주 값, 문자열이 아닌 범주 값
+    {"id": 6, "user_id": 3, "date": "2024-01-08", "type": "브런치", "location": 7, "food_type": "라면"},
+    {"id": 7, "user_id": "3", "date": "2024-01-08", "created_at": "2024-01-08T10:00:00"},
+]
+
+EMOTIONS = [
+    {"id": 1, "user_id": 1, "date": "2024-01-05", "mood": 4, "diary": "좋음"},
+    {"id": 2, "user_id": 1, "date": "2024-01-05", "mood": 2},
+    {"id": 3, "user_id": 1, "date": "2024-01-05"},
+    # 기분 값이 extras로 가는 기록 (범위 밖 정수, 실수, null)
+    {"id": 4, "user_id": 1, "date": "2024-01-05", "mood": 1000},
+    {"id": 5, "user_id": 2, "date": "2024-01-06", "mood": 3.5},
+    {"id": 6, "user_id": 2, "date": "2024-01-06", "mood": None},
+    # 날짜/사용자를 배열로 표현하지 못하는 기록
+    {"id": 7, "user_id": 2, "date": "2024-1-6", "mood": 5},
+    {"id": 8, "user_id": None, "date": "2024-01-06", "mood": 1},
+    {"id": 9, "date": "2024-01-06", "mood": 2},
+]
+
+
+def assert_same_records(actual, expected):
+    assert actual == expected
+    for got, want in zip(actual, expected):
+        # 1과 1.0, True와 1처럼 ==로는 같은 값도 타입까지 같아야 함
+        assert [type(got[key]) for key in want] == [type(value) for value in want.values()]
+
+
+@pytest.mark.parametrize("name, records", [("meals", MEALS), ("emotions", EMOTIONS)])
+def test_round_trip(name, records):
+    columns = RecordColumns.from_records(name, records)
+    assert len(columns) == len(records)
+    assert_same_records(columns.to_records(), records)
+    assert_same_records(list(columns), records)
+    assert_same_records(columns.to_records([4, 1]), [records[4], records[1]])
+
+
+def test_extend_keeps_row_positions_of_extras():
+    columns = RecordColumns.from_records("meals", MEALS[:3])
+    columns.extend(MEALS[3:])
+    columns.extend([])
+    assert_same_records(columns.to_records(), MEALS)
+
+
+def test_categorical_columns_share_codes():
+    columns = RecordColumns.from_records("meals", MEALS)
+    # 정해진 선택지는 항상 같은 코드, 처음 보는 값은 뒤에 추가
+    assert columns.vocabularies["type"].values[:4] == ["아침", "점심", "저녁", "간식"]
+    assert columns.column("type")[0] == 1
+    assert "브런치" in columns.vocabularies["type"].values
+    # 문자열이 아닌 값은 범주로 등록하지 않고 extras에 보관
+    assert 7 not in columns.vocabularies["location"].values
+    assert columns.column("location")[5] == -1
+    records = columns.to_records()
+    assert records[0]["type"] is records[0]["type"]
+    assert records[5]["location"] == 7
+
+
+def test_rows_for():
+    columns = RecordColumns.from_records("meals", MEALS)
+    assert columns.rows_for(1).tolist() == [0, 1]
+    assert columns.rows_for(2, "2024-01-06").tolist() == [2, 3]
+    # 배열로 표현하지 못한 날짜는 extras의 원래 문자열로 찾음
+    assert columns.rows_for(3, "2024-1-7").tolist() == [4]
+    assert columns.rows_for(3, "2024-01-07").tolist() == []
+
+
+def test_npz_round_trip(tmp_path):
+    path = tmp_path / "meals.columns.npz"
+    RecordColumns.from_records("meals", MEALS).save(path, ((1, 2),))
+    loaded = RecordColumns.load(path, ((1, 2),))
+    assert_same_records(loaded.to_records(), MEALS)
+    # 불러온 뒤에도 기존 범주 코드를 이어서 사용
+    loaded.extend([{"id": 8, "user_id": 4, "date": "2024-01-09", "type": "브런치"}])
+    assert loaded.to_records()[-1]["type"] == "브런치"
+    assert loaded.vocabularies["type"].values.count("브런치") == 1
+    assert RecordColumns.load(path, ((1, 3),)) is None
+
+
+def daily_stats_from_dicts(meals, emotions):
+    stats = DailyStats()
+    for name, records in (("meals", meals), ("emotions", emotions)):
+        for record in records:
+            stats.add(name, record)
+    return stats
+
+
+def test_group_by_user_date_matches_dict_stats():
+    expected = daily_stats_from_dicts(MEALS, EMOTIONS)
+    stats = DailyStats()
+    for name, records in (("meals", MEALS), ("emotions", EMOTIONS)):
+        stats.add_groups(name, RecordColumns.from_records(name, records).group_by_user_date())
+    assert stats.days == expected.days
+    assert stats.totals == expected.totals
+    # 기분 값이 extras에 있는 기록도 개수와 합계에 함께 들어감
+    assert stats.day(1, "2024-01-05") == {"meal_count": 2, "emotion_count": 4, "mood_sum": 1006, "mood_count": 4}
+    assert stats.day(2, "2024-01-06")["mood_sum"] == 3.5
+
+
+def write_store(data_dir):
+    backend = JournalStore(data_dir)
+    backend.save("meals", MEALS)
+    return backend
+
+
+def test_load_columns_writes_and_reuses_sidecar(tmp_path):
+    backend = write_store(tmp_path)
+    assert_same_records(backend.load_columns("meals").to_records(), MEALS)
+    sidecar = tmp_path / "meals.columns.npz"
+    assert sidecar.exists()
+    written = sidecar.stat().st_mtime_ns
+    assert_same_records(JournalStore(tmp_path).load_columns("meals").to_records(), MEALS)
+    assert sidecar.stat().st_mtime_ns == written
+
+
+def test_stale_sidecar_falls_back_to_json(tmp_path):
+    backend = write_store(tmp_path)
+    backend.load_columns("meals")
+    # 다른 프로세스가 스냅샷을 바꾼 경우 (예전 스냅샷의 .npz가 남아 있음)
+    changed = MEALS[:2] + [dict(MEALS[2], content="수정됨")]
+    JournalStore(tmp_path).save("meals", changed)
+    assert_same_records(backend.load_columns("meals").to_records(), changed)
+    assert_same_records(CachedStore(JournalStore(tmp_path)).load_columns("meals").to_records(), changed)
+
+
+@pytest.mark.parametrize("content", [b"", b"not a zip file", b"PK\x03\x04broken"])
+def test_corrupt_sidecar_falls_back_to_json(tmp_path, content):
+    backend = write_store(tmp_path)
+    backend.load_columns("meals")
+    sidecar = tmp_path / "meals.columns.npz"
+    sidecar.write_bytes(content)
+    assert_same_records(JournalStore(tmp_path).load_columns("meals").to_records(), MEALS)
+    # 다시 만든 .npz는 온전해야 함
+    with np.load(sidecar) as data:
+        assert json.loads(data["meta"].item())["size"] == len(MEALS)
+
+
+def test_sidecar_with_journal_records(tmp_path):
+    backend = write_store(tmp_path)
+    backend.load_columns("meals")
+    extra = [{"user_id": 9, "date": "2024-02-01", "mood": 127}, {"user_id": 9, "date": "2024-02-01", "x": None}]
+    backend.append_many("meals", extra)
+    records = JournalStore(tmp_path).load_columns("meals").to_records()
+    assert_same_records(records, MEALS + extra)
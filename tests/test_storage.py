@@ -0,0 +1,319 @@
+"""
+저장소 동시성/복구 테스트
+
+    pip install pytest
+    python -m pytest tests
+"""
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import storage
+from storage import CachedStore, JournalStore, SqliteStore
+
+WRITERS = 4
+RECORDS_PER_WRITER = 50
+
+
+def make_backend(kind, data_dir, **options):
+    if kind == "sqlite":
+        return SqliteStore(data_dir / "app.db")
+    return JournalStore(data_dir, **options)
+
+
+def meal(writer, i):
+    return {"user_id": writer, "date": "2024-01-01", "content": f"{writer}-{i}"}
+
+
+def append_records(kind, data_dir, writer):
+    # 프로세스마다 저장소를 따로 열어 같은 디렉토리에 기록 (한 번에 여러 건씩 섞어서)
+    store = make_backend(kind, data_dir, compact_threshold=20, compact_ratio=0)
+    for i in range(0, RECORDS_PER_WRITER, 5):
+        store.append_many("meals", [meal(writer, j) for j in range(i, i + 5)])
+    return writer
+
+
+def assert_all_written(records):
+    assert len(records) == WRITERS * RECORDS_PER_WRITER
+    assert len({r["id"] for r in records}) == len(records)
+    expected = {f"{w}-{i}" for w in range(WRITERS) for i in range(RECORDS_PER_WRITER)}
+    assert {r["content"] for r in records} == expected
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_concurrent_appends_from_threads(tmp_path, kind):
+    # 작은 압축 기준으로 기록 도중 백그라운드 압축도 함께 일어나게 함
+    store = CachedStore(make_backend(kind, tmp_path, compact_threshold=20, compact_ratio=0))
+    store.load("meals")
+
+    def write(writer):
+        for i in range(RECORDS_PER_WRITER):
+            store.append("meals", meal(writer, i))
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        list(pool.map(write, range(WRITERS)))
+
+    assert_all_written(store.load("meals"))
+    assert_all_written(make_backend(kind, tmp_path).load("meals"))
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_concurrent_appends_from_processes(tmp_path, kind):
+    store = CachedStore(make_backend(kind, tmp_path))
+    # 다른 프로세스가 쓰기 전에 캐시를 채워 두어 나중에 변경을 알아차리는지도 확인
+    assert store.load("meals") == []
+
+    with ProcessPoolExecutor(WRITERS) as pool:
+        list(pool.map(append_records, [kind] * WRITERS, [tmp_path] * WRITERS, range(WRITERS)))
+
+    # 파일 토큰 확인 간격 동안은 캐시를 그대로 쓰므로 간격을 없앰
+    store.stat_interval = 0
+    assert_all_written(store.load("meals"))
+    # 이 프로세스가 이어서 쓴 기록도 다른 프로세스의 기록과 id가 겹치지 않아야 함
+    store.append("meals", meal(WRITERS, 0))
+    records = make_backend(kind, tmp_path).load("meals")
+    assert len({r["id"] for r in records}) == WRITERS * RECORDS_PER_WRITER + 1
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_cache_keeps_records_another_process_writes_during_an_append(tmp_path, kind):
+    backend = make_backend(kind, tmp_path)
+    store = CachedStore(backend, stat_interval=0)
+    store.append("meals", meal(0, 0))
+    assert len(store.find("meals", 1)) == 0
+    # 다른 프로세스(별도 연결/파일 핸들)가 이 프로세스의 쓰기 직전에 기록한 상황
+    other = make_backend(kind, tmp_path)
+    append_many = backend.append_many
+
+    def append_after_other(name, records):
+        other.append_many(name, [meal(1, 0)])
+        return append_many(name, records)
+
+    backend.append_many = append_after_other
+    store.append("meals", meal(0, 1))
+
+    assert {r["content"] for r in store.load("meals")} == {"0-0", "0-1", "1-0"}
+    assert [r["content"] for r in store.find("meals", 1)] == ["1-0"]
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_cache_reloaded_during_an_append_keeps_the_appended_records(tmp_path, kind):
+    backend = make_backend(kind, tmp_path)
+    store = CachedStore(backend, stat_interval=0)
+    store.append("meals", meal(0, 0))
+    assert len(store.load("meals")) == 1
+    writing, release = threading.Event(), threading.Event()
+    append_many = backend.append_many
+
+    reloaded = []
+
+    def blocked_append_many(name, records):
+        if records[0]["user_id"] == 1:
+            writing.set()
+            release.wait(5)
+            return append_many(name, records)
+        result = append_many(name, records)
+        # 다른 스레드가 이 기록이 저장된 직후, 캐시에 반영되기 전에 목록을 다시 읽음
+        reloaded.extend(store.load("meals"))
+        return result
+
+    backend.append_many = blocked_append_many
+    slow = threading.Thread(target=store.append, args=("meals", meal(1, 0)))
+    slow.start()
+    try:
+        assert writing.wait(5)
+        # 느린 기록이 끝나기 전에 다른 스레드의 기록이 먼저 저장됨
+        store.append("meals", meal(2, 0))
+        assert "1-0" not in {r["content"] for r in reloaded}
+    finally:
+        release.set()
+        slow.join()
+
+    assert sorted(r["content"] for r in store.load("meals")) == ["0-0", "1-0", "2-0"]
+    assert [r["content"] for r in store.find("meals", 1)] == ["1-0"]
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_append_refreshes_only_the_writers_stats(tmp_path, kind):
+    backend = make_backend(kind, tmp_path)
+    store = CachedStore(backend)
+    store.append_many("meals", [meal(0, 0), meal(1, 0)])
+    tokens = []
+    mtime_token = backend.mtime_token
+    backend.mtime_token = lambda name: tokens.append(name) or mtime_token(name)
+
+    assert store.daily_stats(0, "2024-01-01")["meal_count"] == 1
+    assert store.user_stats(1)["meal_count"] == 1
+    misses = store.misses
+    store.append("meals", meal(0, 1))
+    store.append("emotions", dict(meal(0, 2), mood=4))
+    # 다른 사용자의 집계는 캐시 그대로, 기록한 사용자의 집계만 새로 읽음
+    assert store.user_stats(1)["meal_count"] == 1
+    if kind == "sqlite":
+        assert store.misses == misses
+    assert store.daily_stats(0, "2024-01-01") == {"meal_count": 2, "emotion_count": 1, "mood_sum": 4, "mood_count": 1}
+    store.save("emotions", [])
+    assert store.daily_stats(0, "2024-01-01")["emotion_count"] == 0
+    # 집계는 따로 저장된 파일이 없으므로 stats 토큰은 확인하지 않음 (SQLite는 조회할 때만)
+    if kind == "json":
+        assert "stats" not in tokens
+
+
+@pytest.mark.parametrize("kind", ["json", "sqlite"])
+def test_stats_include_records_another_process_writes_during_an_append(tmp_path, kind):
+    backend = make_backend(kind, tmp_path)
+    store = CachedStore(backend)
+    store.append("meals", meal(0, 0))
+    assert store.daily_stats(1, "2024-01-01")["meal_count"] == 0
+    other = make_backend(kind, tmp_path)
+    append_many = backend.append_many
+
+    def append_after_other(name, records):
+        other.append_many(name, [meal(1, 0)])
+        return append_many(name, records)
+
+    backend.append_many = append_after_other
+    store.append("meals", meal(0, 1))
+
+    assert store.daily_stats(1, "2024-01-01")["meal_count"] == 1
+    assert store.user_stats(0)["meal_count"] == 2
+
+
+def test_torn_journal_tail_is_dropped_before_append(tmp_path):
+    store = JournalStore(tmp_path)
+    store.append_many("meals", [meal(0, 0), meal(0, 1)])
+    journal = tmp_path / "meals.jsonl"
+    # 기록 도중 프로세스가 죽어 마지막 줄이 잘린 상태
+    with open(journal, "ab") as f:
+        f.write(json.dumps(meal(0, 2), ensure_ascii=False).encode("utf-8")[:-7])
+
+    assert [r["content"] for r in JournalStore(tmp_path).load("meals")] == ["0-0", "0-1"]
+
+    reopened = JournalStore(tmp_path)
+    reopened.append("meals", meal(0, 3))
+    records = JournalStore(tmp_path).load("meals")
+    assert [r["content"] for r in records] == ["0-0", "0-1", "0-3"]
+    assert journal.read_bytes().endswith(b"\n")
+    # 잘린 줄은 한 번만 잘라내고 이후 기록은 그대로 이어 붙음
+    reopened.append("meals", meal(0, 4))
+    assert len(journal.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_torn_journal_without_newline_is_truncated(tmp_path):
+    journal = tmp_path / "meals.jsonl"
+    journal.write_bytes(b'{"id": 1, "user_id"')
+    store = JournalStore(tmp_path)
+    store.append("meals", meal(0, 0))
+    assert [r["content"] for r in store.load("meals")] == ["0-0"]
+
+
+def run_compaction_during(monkeypatch, store, action):
+    # 압축이 파일 잠금을 놓고 스냅샷과 저널을 병합하는 사이에 action을 실행
+    read_journal = storage._read_journal
+    fired = []
+
+    def read_journal_then_act(path):
+        if path.name.endswith(".compacting") and not fired:
+            fired.append(True)
+            action()
+        return read_journal(path)
+
+    monkeypatch.setattr(storage, "_read_journal", read_journal_then_act)
+    store.compact("meals")
+    monkeypatch.setattr(storage, "_read_journal", read_journal)
+    assert fired
+
+
+def test_save_during_compaction_wins(tmp_path, monkeypatch):
+    backend = JournalStore(tmp_path, compact_threshold=10 ** 9)
+    store = CachedStore(backend)
+    store.save("meals", [dict(meal(0, i), id=i + 1) for i in range(3)])
+    store.append_many("meals", [meal(1, i) for i in range(3)])
+    replaced = [dict(meal(2, 0), id=100)]
+
+    run_compaction_during(monkeypatch, backend, lambda: store.save("meals", replaced))
+
+    # save()로 교체된 목록 위에 압축 결과를 덮어쓰면 안 됨
+    assert backend.load("meals") == replaced
+    assert JournalStore(tmp_path).load("meals") == replaced
+    assert store.load("meals") == replaced
+    assert not (tmp_path / "meals.jsonl.compacting").exists()
+    assert not list(tmp_path.glob("*.compact.tmp"))
+
+
+def test_appends_during_compaction_are_kept(tmp_path, monkeypatch):
+    backend = JournalStore(tmp_path, compact_threshold=10 ** 9)
+    store = CachedStore(backend)
+    store.append_many("meals", [meal(0, i) for i in range(3)])
+    store.load_columns("meals")
+
+    run_compaction_during(monkeypatch, backend, lambda: store.append("meals", meal(1, 0)))
+
+    expected = ["0-0", "0-1", "0-2", "1-0"]
+    assert [r["content"] for r in JournalStore(tmp_path).load("meals")] == expected
+    assert [r["content"] for r in store.load("meals")] == expected
+    assert [r["content"] for r in store.load_columns("meals").to_records()] == expected
+    # 압축된 기록은 스냅샷으로, 압축 중에 들어온 기록은 새 저널로
+    assert len(json.loads((tmp_path / "meals.json").read_text(encoding="utf-8"))) == 3
+    assert len((tmp_path / "meals.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+
+
+@pytest.mark.parametrize("columns", [False, True])
+def test_compaction_does_not_invalidate_the_cache(tmp_path, columns):
+    backend = JournalStore(tmp_path, compact_threshold=10 ** 9)
+    store = CachedStore(backend, stat_interval=0)
+    store.append_many("meals", [meal(i % 2, i) for i in range(6)])
+    store.append_many("emotions", [dict(meal(0, 0), mood=3)])
+
+    def read_all():
+        records = store.load_columns("meals").to_records() if columns else store.load("meals")
+        return records, store.find("meals", 0), store.daily_stats(0, "2024-01-01"), store.mood_rollup(0)
+
+    before = read_all()
+    misses = store.misses
+    backend.compact("meals")
+    # 압축 후에도 같은 내용을 캐시에서 그대로 돌려줌
+    assert read_all()[:3] == before[:3]
+    assert store.misses == misses
+
+    # 압축 중에 다른 프로세스가 쓴 기록은 놓치지 않음
+    JournalStore(tmp_path).append("meals", meal(0, 99))
+    backend.compact("meals")
+    assert len(read_all()[1]) == 4
+    assert store.misses > misses
+
+
+def test_save_racing_with_background_compaction(tmp_path):
+    backend = JournalStore(tmp_path, compact_threshold=5, compact_ratio=0)
+    store = CachedStore(backend)
+    stop = threading.Event()
+    errors = []
+
+    def keep_appending():
+        try:
+            i = 0
+            while not stop.is_set():
+                store.append_many("meals", [meal(1, i + j) for j in range(5)])
+                i += 5
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=keep_appending)
+    writer.start()
+    try:
+        for round_ in range(20):
+            store.save("meals", [dict(meal(0, round_), id=10 ** 6 + round_)])
+    finally:
+        stop.set()
+        writer.join()
+    backend.compact("meals")
+
+    assert not errors
+    records = JournalStore(tmp_path).load("meals")
+    # 마지막 save() 이후의 기록만 남고, 같은 기록이 두 번 나오지 않음
+    assert records[0]["id"] == 10 ** 6 + 19
+    assert len({r["id"] for r in records}) == len(records)
+    assert all(r["user_id"] == 1 for r in records[1:])
+    assert store.load("meals") == records
@@ -0,0 +1,215 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+# 대기열에 쌓아둘 수 있는 최대 작업 수 - 가득 차면 제출하는 쪽이 기다림(backpressure)
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "1000"))
+
+# 대기열이 가득 찼을 때 최대 몇 초까지 기다릴지
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", "5.0"))
+
+# 한 번에 모아서 저장할 최대 작업 수
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    """대기열이 가득 차서 제한 시간 안에 작업을 넣지 못했을 때 발생합니다."""
+
+
+class WriteBehindQueue:
+    """
+    식사/감정 기록, 기록 수정과 사진 파일 저장을 백그라운드 스레드에서 처리하는 쓰기 대기열입니다.
+    제출 즉시 Future를 돌려주며, Future는 디스크에 실제로 저장(fsync)된 뒤 완료됩니다.
+    스레드는 대기 중인 작업을 모아서 컬렉션별로 한 번에 저장합니다.
+    """
+
+    def __init__(self, store, maxsize=WRITE_QUEUE_SIZE, batch_size=WRITE_BATCH_SIZE, timeout=WRITE_QUEUE_TIMEOUT):
+        self.store = store
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending_files = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._metrics = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "flushes": 0,
+            "max_depth": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("쓰기 대기열이 이미 종료되었습니다.")
+        try:
+            self._queue.put(item, timeout=self.timeout)
+        except queue.Full:
+            raise WriteQueueFull("저장 대기 중인 작업이 너무 많습니다. 잠시 후 다시 시도하세요.") from None
+        with self._lock:
+            self._metrics["submitted"] += 1
+            self._metrics["max_depth"] = max(self._metrics["max_depth"], self._queue.qsize())
+        return item[-1]
+
+    def submit_record(self, name, record):
+        # 저장이 끝나면 id가 채워진 record로 완료되는 Future 반환
+        return self._put(("record", name, record, Future()))
+
+    def submit_update(self, name, record_id, fields):
+        # 같은 배치에 모인 수정은 컬렉션별로 update_many 한 번에 저장 (JSON 저장소는 스냅샷을 통째로 다시 씀)
+        return self._put(("update", name, (record_id, fields), Future()))
+
+    def submit_file(self, path, data):
+        path = Path(path)
+        with self._lock:
+            self._pending_files[path] = data
+        try:
+            return self._put(("file", path, data, Future()))
+        except (WriteQueueFull, RuntimeError):
+            # 대기열에 넣지 못한 파일이 저장 대기 중으로 남으면 다시 올려도 저장되지 않음
+            with self._lock:
+                if self._pending_files.get(path) is data:
+                    del self._pending_files[path]
+            raise
+
+    def pending_file(self, path):
+        # 아직 디스크에 쓰이지 않은 파일 내용 (없으면 None)
+        with self._lock:
+            return self._pending_files.get(Path(path))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            # 이미 쌓여 있는 작업을 최대 batch_size개까지 함께 꺼냄
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        written = failed = 0
+
+        # 식사 기록이 사진 경로를 참조하므로 파일을 먼저 저장
+        for kind, path, data, future in batch:
+            if kind != "file":
+                continue
+            try:
+                _write_file_atomic(path, data)
+                future.set_result(path)
+                written += 1
+            except OSError as e:
+                future.set_exception(e)
+                failed += 1
+            finally:
+                with self._lock:
+                    if self._pending_files.get(path) is data:
+                        del self._pending_files[path]
+
+        groups = {}
+        for kind, name, record, future in batch:
+            if kind == "record":
+                groups.setdefault(name, []).append((record, future))
+        for name, items in groups.items():
+            try:
+                self.store.append_many(name, [record for record, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                failed += len(items)
+            else:
+                for record, future in items:
+                    future.set_result(record)
+                written += len(items)
+
+        # 새 기록을 수정하는 경우도 있으므로 추가한 뒤에 수정 (같은 기록의 수정은 나중 것이 우선)
+        updates = {}
+        for kind, name, change, future in batch:
+            if kind == "update":
+                record_id, fields = change
+                changes, futures = updates.setdefault(name, ({}, []))
+                changes.setdefault(record_id, {}).update(fields)
+                futures.append(future)
+        for name, (changes, futures) in updates.items():
+            try:
+                self.store.update_many(name, changes)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                failed += len(futures)
+            else:
+                for future in futures:
+                    future.set_result(None)
+                written += len(futures)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            m = self._metrics
+            m["written"] += written
+            m["failed"] += failed
+            m["flushes"] += 1
+            m["last_flush_ms"] = elapsed_ms
+            m["max_flush_ms"] = max(m["max_flush_ms"], elapsed_ms)
+            m["total_flush_ms"] += elapsed_ms
+
+    def metrics(self):
+        with self._lock:
+            m = dict(self._metrics)
+        m["depth"] = self._queue.qsize()
+        m["avg_flush_ms"] = m["total_flush_ms"] / m["flushes"] if m["flushes"] else 0.0
+        return m
+
+    def close(self, timeout=None):
+        """새 작업을 받지 않고 대기 중인 작업을 모두 저장한 뒤 스레드를 종료합니다."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+def _write_file_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_write_queue(store):
+    # 저장소 하나당 쓰기 스레드 하나, 프로세스 종료 시 남은 작업을 모두 저장
+    with _writers_lock:
+        if id(store) not in _writers:
+            writer = WriteBehindQueue(store)
+            atexit.register(writer.close)
+            _writers[id(store)] = writer
+        return _writers[id(store)]